@@ -0,0 +1,96 @@
+"""Realistic yt-dlp payloads for benchmarks."""
+
+from typing import Any
+
+
+def make_info_dict(formats: int = 120, thumbnails: int = 40) -> dict[str, Any]:
+    """Build an info dict shaped like a YouTube extraction result."""
+    video_id = "dQw4w9WgXcQ"
+
+    return {
+        "id": video_id,
+        "title": "Rick Astley - Never Gonna Give You Up (Official Music Video)",
+        "description": "The official video for “Never Gonna Give You Up” by Rick Astley. "
+        * 20,
+        "uploader": "Rick Astley",
+        "uploader_id": "@RickAstleyYT",
+        "channel_id": "UCuAXFkgsw1L7xaCfnd5JJOw",
+        "duration": 213,
+        "view_count": 1_600_000_000,
+        "like_count": 18_000_000,
+        "age_limit": 0,
+        "webpage_url": f"https://www.youtube.com/watch?v={video_id}",
+        "extractor": "youtube",
+        "extractor_key": "Youtube",
+        "tags": ["rick astley", "never gonna give you up", "rickroll"] * 5,
+        "categories": ["Music"],
+        "timestamp": 1256453463,
+        "availability": "public",
+        "format_id": "137+140",
+        "thumbnails": [
+            {
+                "url": f"https://i.ytimg.com/vi/{video_id}/{index}.jpg",
+                "preference": -index,
+                "id": str(index),
+                "height": 90 + index,
+                "width": 120 + index,
+                "resolution": f"{120 + index}x{90 + index}",
+            }
+            for index in range(thumbnails)
+        ],
+        "formats": [
+            {
+                "format_id": str(100 + index),
+                "format_note": "1080p",
+                "ext": "mp4",
+                "protocol": "https",
+                "acodec": "none",
+                "vcodec": "avc1.640028",
+                "url": (
+                    "https://rr1---sn-abc.googlevideo.com/videoplayback?expire=1760000000"
+                    f"&itag={100 + index}&source=youtube&requiressl=yes&mime=video%2Fmp4"
+                    "&sig=" + "A" * 120
+                ),
+                "width": 1920,
+                "height": 1080,
+                "fps": 25,
+                "tbr": 1500.5 + index,
+                "filesize": 80_000_000 + index,
+                "http_headers": {
+                    "User-Agent": "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36",
+                    "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9",
+                    "Accept-Language": "en-us,en;q=0.5",
+                    "Sec-Fetch-Mode": "navigate",
+                },
+                "downloader_options": {"http_chunk_size": 10485760},
+            }
+            for index in range(formats)
+        ],
+    }
+
+
+def make_progress(
+    info_dict: dict[str, Any],
+    downloaded_bytes: int,
+    total_bytes: int,
+    status: str = "downloading",
+) -> dict[str, Any]:
+    """Build a progress hook payload as passed by yt-dlp's downloaders."""
+    return {
+        "status": status,
+        "downloaded_bytes": downloaded_bytes,
+        "total_bytes": total_bytes,
+        "tmpfilename": "/tmp/tmpabc/video.f137.mp4.part",
+        "filename": "/tmp/tmpabc/video.f137.mp4",
+        "eta": 12,
+        "speed": 5_000_000.0,
+        "elapsed": 3.2,
+        "ctx_id": None,
+        "info_dict": info_dict,
+        "_percent_str": f"{downloaded_bytes / total_bytes * 100:5.1f}%",
+        "_speed_str": "4.77MiB/s",
+        "_eta_str": "00:12",
+        "_total_bytes_str": "76.29MiB",
+        "_downloaded_bytes_str": "10.00MiB",
+        "_elapsed_str": "00:03",
+    }
@@ -0,0 +1,79 @@
+"""
+Compare the bytes written to Valkey by the progress hook against writing the full progress on every tick.
+
+Usage: python -m benchmarks.progress_writes
+"""
+
+import json
+
+from glide_sync import Batch
+
+from src.progress import ValkeyProgressHook
+
+from ._data import make_info_dict, make_progress
+
+TICKS = 2_000
+TOTAL_BYTES = 80_000_000
+
+
+class CountingClient:
+    """Valkey client counting the payload bytes of executed batches."""
+
+    def __init__(self):
+        self.commands = 0
+        self.bytes = 0
+
+    def exec(self, batch: Batch, raise_on_error: bool):
+        for _, args in batch.commands:
+            self.commands += 1
+            self.bytes += sum(
+                len(arg) if isinstance(arg, bytes) else len(str(arg)) for arg in args
+            )
+
+
+def _ticks(info_dict):
+    for tick in range(TICKS):
+        yield make_progress(info_dict, TOTAL_BYTES * tick // TICKS, TOTAL_BYTES)
+
+    yield make_progress(info_dict, TOTAL_BYTES, TOTAL_BYTES, status="finished")
+
+
+def full_payload_bytes(info_dict) -> int:
+    """Bytes written when the whole progress is stored as the info record on every tick."""
+    identifiers = 3
+    total = 0
+
+    for progress in _ticks(info_dict):
+        total += len(json.dumps(progress)) * identifiers
+
+    return total
+
+
+def hook_bytes(info_dict) -> tuple[int, int]:
+    client = CountingClient()
+    hook = ValkeyProgressHook(client)  # type: ignore[arg-type]
+
+    for progress in _ticks(info_dict):
+        hook("invocation", "https://www.youtube.com/watch?v=dQw4w9WgXcQ", progress)
+
+    hook.close()
+
+    return client.bytes, client.commands
+
+
+def main():
+    info_dict = make_info_dict()
+
+    baseline = full_payload_bytes(info_dict)
+    written, commands = hook_bytes(info_dict)
+
+    print(f"ticks:                 {TICKS + 1}")
+    print(f"info record per tick:  {baseline / 1_000_000:10.2f} MB")
+    print(
+        f"info record on change: {written / 1_000_000:10.2f} MB ({commands} commands)"
+    )
+    print(f"reduction:             {baseline / written:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Compare JSON encoding speed of progress and info payloads across the available serializers.
+
+Usage: python -m benchmarks.serialization
+"""
+
+import timeit
+
+from src.restate_yt_dlp.serde import (
+    MsgspecSerializer,
+    OrjsonSerializer,
+    Serializer,
+    StdlibSerializer,
+)
+
+from ._data import make_info_dict, make_progress
+
+ROUNDS = 200
+
+
+def _serializers() -> list[Serializer]:
+    serializers: list[Serializer] = [StdlibSerializer()]
+
+    for serializer in (MsgspecSerializer, OrjsonSerializer):
+        try:
+            serializers.append(serializer())
+        except ImportError:
+            continue
+
+    return serializers
+
+
+def main():
+    info_dict = make_info_dict()
+    progress = make_progress(info_dict, 40_000_000, 80_000_000)
+    compact = {k: v for k, v in progress.items() if k != "info_dict"}
+
+    payloads = {
+        "compact progress": compact,
+        "progress with info": progress,
+    }
+
+    for label, payload in payloads.items():
+        print(f"{label}:")
+
+        baseline = None
+
+        for serializer in _serializers():
+            seconds = timeit.timeit(
+                lambda serializer=serializer, payload=payload: serializer.dumps(
+                    payload
+                ),
+                number=ROUNDS,
+            )
+            per_call = seconds / ROUNDS * 1_000_000
+            baseline = baseline or per_call
+
+            print(
+                f"  {serializer.name:>8}: {per_call:10.1f} µs/call"
+                f"  ({baseline / per_call:.1f}x)"
+            )
+
+
+if __name__ == "__main__":
+    main()
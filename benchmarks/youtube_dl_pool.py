@@ -0,0 +1,51 @@
+"""
+Compare constructing a YoutubeDL per request against reusing pooled instances.
+
+Usage: python -m benchmarks.youtube_dl_pool
+"""
+
+import timeit
+
+import yt_dlp
+
+from src.restate_yt_dlp.pool import YoutubeDLPool
+
+ROUNDS = 50
+
+
+def _params(request: int) -> dict:
+    return {
+        "quiet": True,
+        "format": "bestvideo*+bestaudio/best",
+        "paths": {"home": f"/tmp/restate-yt-dlp/{request}"},
+        "progress_hooks": [lambda progress: None],
+    }
+
+
+def main():
+    requests = iter(range(2 * ROUNDS))
+
+    constructed = timeit.timeit(
+        lambda: yt_dlp.YoutubeDL(_params(next(requests))).close(),  # type: ignore[arg-type]
+        number=ROUNDS,
+    )
+
+    pool = YoutubeDLPool()
+
+    def reuse():
+        with pool.acquire(_params(next(requests))):  # type: ignore[arg-type]
+            pass
+
+    pooled = timeit.timeit(reuse, number=ROUNDS)
+    pool.clear()
+
+    print(f"requests:    {ROUNDS}")
+    print(f"constructed: {constructed / ROUNDS * 1000:10.3f} ms/request")
+    print(
+        f"pooled:      {pooled / ROUNDS * 1000:10.3f} ms/request ({pool.stats().misses} constructed)"
+    )
+    print(f"speedup:     {constructed / pooled:10.1f}x")
+
+
+if __name__ == "__main__":
+    main()
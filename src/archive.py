@@ -0,0 +1,45 @@
+import logging
+
+from glide_sync import ExpirySet, ExpiryType, TGlideClient
+
+_logger = logging.getLogger(__name__)
+
+
+class ValkeyDownloadArchive:
+    """
+    Download archive shared between workers through Valkey.
+
+    Every record is a key of its own, so records expire individually after the TTL
+    (videos are downloaded again once their record expired).
+    """
+
+    KEY_PREFIX = "yt-dlp:download-archive"
+
+    def __init__(
+        self,
+        client: TGlideClient,
+        ttl: int | None = 30 * 86400,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            client: Valkey client.
+            ttl: Seconds after which records expire (never if None).
+        """
+
+        self.client = client
+        self.ttl = ttl
+        self.logger = logger
+
+    def __contains__(self, key: str) -> bool:
+        return self.client.exists([self._make_key(key)]) > 0
+
+    def add(self, key: str):
+        self.client.set(
+            self._make_key(key),
+            "1",
+            expiry=ExpirySet(ExpiryType.SEC, self.ttl) if self.ttl else None,
+        )
+
+    def _make_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
@@ -0,0 +1,54 @@
+import logging
+
+from glide_sync import ExpirySet, ExpiryType, TGlideClient
+
+_logger = logging.getLogger(__name__)
+
+
+class ValkeyInfoCache:
+    """Extraction result cache shared between workers through Valkey."""
+
+    KEY_PREFIX = "yt-dlp:info-cache"
+
+    def __init__(
+        self,
+        client: TGlideClient,
+        ttl: int = 3600,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            client: Valkey client.
+            ttl: Lifetime of entries in seconds.
+        """
+
+        self.client = client
+        self.ttl = ttl
+        self.logger = logger
+
+    def get(self, key: str) -> bytes | None:
+        return self.client.get(self._make_key(key))
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(int(ttl), self.ttl)
+
+        if ttl <= 0:
+            return
+
+        self.client.set(
+            self._make_key(key),
+            value,
+            expiry=ExpirySet(ExpiryType.SEC, ttl),
+        )
+
+    def expires_in(self, key: str) -> float | None:
+        ttl = self.client.ttl(self._make_key(key))
+
+        # Negative if the key is missing (-2) or has no expiry (-1)
+        return float(ttl) if ttl > 0 else None
+
+    def delete(self, key: str):
+        self.client.delete([self._make_key(key)])
+
+    def _make_key(self, key: str) -> str:
+        return f"{self.KEY_PREFIX}:{key}"
@@ -1,7 +1,12 @@
 from __future__ import annotations
 
+import atexit
 import logging
-from typing import TYPE_CHECKING, cast
+import multiprocessing.util
+import os
+from collections.abc import Callable
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Literal, cast
 
 import obstore
 import pydantic_obstore
@@ -12,24 +17,54 @@ import workstate.obstore
 from glide_sync import (
     GlideClient,
     GlideClientConfiguration,
+    GlideClusterClient,
+    GlideClusterClientConfiguration,
     NodeAddress,
+    ReadFrom,
     ServerCredentials,
+    TGlideClient,
 )
 from pydantic import BaseModel, Field, RedisDsn
 from pydantic_restate import WorkerSettings
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
+from .archive import ValkeyDownloadArchive
+from .cache import ValkeyInfoCache
 from .logger import Logger
 from .params import Params
-from .progress import ValkeyProgressHook
+from .progress import KeyTTL, ValkeyProgressHook, ValkeyProgressSink
 from .restate_yt_dlp import Executor, create_service
-from .restate_yt_dlp.executor import ProgressHook
+from .restate_yt_dlp.archive import DownloadArchive
+from .restate_yt_dlp.cache import InfoCache, MemoryInfoCache, TieredInfoCache
+from .restate_yt_dlp.execution import ExecutionBackend
+from .restate_yt_dlp.executor import DirectoryPersister, ProgressHook
+from .restate_yt_dlp.metrics import StatsReporter, StatsSource
+from .restate_yt_dlp.pool import YoutubeDLPool
 from .restate_yt_dlp.restate import Options as RestateOptions
+from .restate_yt_dlp.restate import executor_functions
+from .restate_yt_dlp.scheduler import (
+    LocalSchedulerBackend,
+    Scheduler,
+    SchedulerBackend,
+    SiteLimit,
+)
+from .restate_yt_dlp.scratch import ScratchDirectories
+from .restate_yt_dlp.singleflight import LocalSingleFlight, SingleFlight
+from .restate_yt_dlp.storage import (
+    ObstoreCheckpointStore,
+    ObstoreDownloadArchive,
+    ObstorePersister,
+    StorePool,
+)
+from .scheduler import ValkeySchedulerBackend
+from .singleflight import ValkeySingleFlight
 
 if TYPE_CHECKING:
     from obstore.store import ClientConfig
     from yt_dlp import _Params
 
+    from .restate_yt_dlp.network import ConnectionPool
+
 
 class ObstoreSettings(pydantic_obstore.Config):
     url: str | None = None
@@ -39,12 +74,350 @@ class Restate(RestateOptions, WorkerSettings):
     pass
 
 
+class UploadSettings(BaseModel):
+    persister: Literal["workstate", "obstore"] = Field(
+        default="workstate",
+        description="Implementation uploading downloaded files",
+    )
+    streaming: bool = Field(
+        default=False,
+        description="Upload files while the download is still running (requires the obstore persister)",
+    )
+    max_files: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of files uploaded concurrently (obstore persister only)",
+    )
+    chunk_size: int = Field(
+        default=8 * 1024 * 1024,
+        ge=5 * 1024 * 1024,
+        description="Part size of multipart uploads in bytes (obstore persister only)",
+    )
+    max_concurrency: int = Field(
+        default=12,
+        ge=1,
+        description="Maximum number of parts of a file uploaded concurrently (obstore persister only)",
+    )
+    max_stores: int = Field(
+        default=32,
+        ge=1,
+        description="Maximum number of object store clients kept for reuse (obstore persister only)",
+    )
+    store_idle_timeout: float = Field(
+        default=300.0,
+        ge=0,
+        description="Seconds after which unused object store clients are dropped (obstore persister only)",
+    )
+    blobs_prefix: str | None = Field(
+        default=None,
+        description="Store files once per content under this prefix and write a manifest (blobs.json) to output locations (obstore persister only)",
+    )
+
+
+class ValkeyProgressSettings(BaseModel):
+    min_interval: float = Field(
+        default=0.0,
+        ge=0,
+        description="Minimum number of seconds between progress writes of the same download (enables rate-limited mode)",
+    )
+    min_bytes: int = Field(
+        default=0,
+        ge=0,
+        description="Minimum number of downloaded bytes between progress writes of the same download (enables rate-limited mode)",
+    )
+    max_buffer: int = Field(
+        default=10_000,
+        ge=1,
+        description="Maximum number of progress updates buffered in memory (the oldest non-terminal ones are dropped when full, final states never are)",
+    )
+    max_batch: int = Field(
+        default=1_000,
+        ge=1,
+        description="Maximum number of progress updates written in a single round-trip",
+    )
+    max_info_size: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum size of the info record in bytes (larger records are stripped of heavy fields or skipped)",
+    )
+    events: Literal["stream", "pubsub"] | None = Field(
+        default=None,
+        description="Push progress events of each invocation to a Valkey Stream or pub/sub channel",
+    )
+    stream_maxlen: int = Field(
+        default=1_000,
+        ge=1,
+        description="Approximate maximum number of entries kept in progress event streams",
+    )
+
+
+class ValkeyTTLSettings(BaseModel):
+    info: int | None = Field(
+        default=None,
+        ge=1,
+        description="Expiry of info keys in seconds (never expire if not set)",
+    )
+    progress: int | None = Field(
+        default=None,
+        ge=1,
+        description="Expiry of progress keys in seconds (never expire if not set)",
+    )
+    downloaded_bytes: int | None = Field(
+        default=None,
+        ge=1,
+        description="Expiry of downloaded bytes keys in seconds (never expire if not set)",
+    )
+    linger: int | None = Field(
+        default=None,
+        ge=1,
+        description="Expiry of all keys in seconds once a download finished or failed",
+    )
+
+
 class ValkeySettings(BaseModel):
     dsn: RedisDsn = Field(description="Valkey connection string")
     request_timeout: int | None = Field(
         default=None,
         description="Valkey request timeout",
     )
+    cluster: bool = Field(
+        default=False,
+        description="Connect to Valkey in cluster mode",
+    )
+    nodes: list[str] = Field(
+        default=[],
+        description="Additional cluster seed nodes (host:port) besides the host of the DSN",
+        examples=[["valkey-1:6379", "valkey-2:6379"]],
+    )
+    read_from: Literal["primary", "prefer_replica"] = Field(
+        default="primary",
+        description="Which cluster nodes to read from",
+    )
+    hash_tags: bool | None = Field(
+        default=None,
+        description="Tag progress keys with the invocation id so every key written by an update shares a cluster slot (enabled in cluster mode by default)",
+    )
+    progress: ValkeyProgressSettings = Field(
+        default_factory=ValkeyProgressSettings,
+        description="Progress reporting settings",
+    )
+    ttl: ValkeyTTLSettings = Field(
+        default_factory=ValkeyTTLSettings,
+        description="Expiry of progress keys",
+    )
+
+
+class InfoCacheSettings(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Cache extraction results",
+    )
+    ttl: int = Field(
+        default=3600,
+        ge=1,
+        description="Lifetime of cached results in seconds (capped by the expiry of their media URLs)",
+    )
+    margin: int = Field(
+        default=300,
+        ge=0,
+        description="Do not use cached results whose media URLs expire within this many seconds",
+    )
+    max_entries: int = Field(
+        default=1_000,
+        ge=1,
+        description="Maximum number of results cached in memory",
+    )
+    max_bytes: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum total size of results cached in memory (unlimited if not set)",
+    )
+    shared: bool = Field(
+        default=False,
+        description="Share cached results between workers through Valkey",
+    )
+
+
+class ScratchSettings(BaseModel):
+    dir: Path | None = Field(
+        default=None,
+        description="Directory of downloads surviving retries (temporary directories are used if not set)",
+    )
+    max_age: int = Field(
+        default=86400,
+        ge=1,
+        description="Seconds after which abandoned downloads are removed",
+    )
+    max_bytes: int | None = Field(
+        default=None,
+        ge=1,
+        description="Total size of downloads above which the least recently used abandoned ones are removed",
+    )
+
+
+class CheckpointSettings(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Checkpoint partial downloads to the object store so retries on other nodes can resume them",
+    )
+    prefix: str = Field(
+        default="checkpoints",
+        description="Prefix of checkpoints in the object store",
+    )
+    interval: float = Field(
+        default=60.0,
+        gt=0,
+        description="Minimum number of seconds between checkpoints of a download",
+    )
+
+
+class SingleFlightSettings(BaseModel):
+    mode: Literal["local", "valkey"] | None = Field(
+        default=None,
+        description="Deduplicate concurrent identical downloads within this worker (local) or across workers (valkey)",
+    )
+    lease: float = Field(
+        default=30.0,
+        gt=0,
+        description="Seconds after which downloads of crashed workers are taken over (valkey mode only)",
+    )
+    poll_interval: float = Field(
+        default=1.0,
+        gt=0,
+        description="Seconds between checks of waiting downloads for the outcome (valkey mode only)",
+    )
+    result_ttl: int = Field(
+        default=60,
+        ge=1,
+        description="Seconds the result of a download is kept for the identical downloads waiting for it (valkey mode only)",
+    )
+    max_wait: float = Field(
+        default=600.0,
+        gt=0,
+        description="Seconds after which downloads waiting for an identical download fail (and are retried)",
+    )
+
+
+class ArchiveSettings(BaseModel):
+    backend: Literal["valkey", "obstore"] | None = Field(
+        default=None,
+        description="Record downloaded videos in an archive shared between workers (used by requests skipping existing outputs)",
+    )
+    prefix: str = Field(
+        default="archive",
+        description="Prefix of the archive in the object store (obstore backend only)",
+    )
+    ttl: int | None = Field(
+        default=30 * 86400,
+        ge=1,
+        description="Seconds after which archive records expire, so the archive stays bounded (valkey backend only, never if not set)",
+    )
+
+
+class YoutubeDLPoolSettings(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Reuse configured YoutubeDL instances across requests with the same options",
+    )
+    max_size: int = Field(
+        default=16,
+        ge=1,
+        description="Maximum number of idle YoutubeDL instances kept",
+    )
+    idle_timeout: float = Field(
+        default=300.0,
+        gt=0,
+        description="Seconds after which idle YoutubeDL instances are closed",
+    )
+
+
+class ConnectionPoolSettings(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Share HTTP connections between yt-dlp executions",
+    )
+    max_hosts: int = Field(
+        default=64,
+        ge=1,
+        description="Maximum number of hosts connections are kept for",
+    )
+    max_connections_per_host: int = Field(
+        default=10,
+        ge=1,
+        description="Maximum number of idle connections kept per host",
+    )
+    idle_timeout: float = Field(
+        default=90.0,
+        gt=0,
+        description="Seconds after which connections to unused hosts are closed",
+    )
+
+
+class DNSCacheSettings(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Cache name resolution results of the shared connections (requires shared connections)",
+    )
+    ttl: float = Field(
+        default=60.0,
+        gt=0,
+        description="Seconds name resolution results are reused for",
+    )
+    max_entries: int = Field(
+        default=1024,
+        ge=1,
+        description="Maximum number of cached name resolution results",
+    )
+
+
+class SchedulerSettings(BaseModel):
+    mode: Literal["local", "valkey"] | None = Field(
+        default=None,
+        description="Limit requests per site within this worker (local) or across workers (valkey)",
+    )
+    sites: dict[str, SiteLimit] = Field(
+        default_factory=dict,
+        description="Limits by domain (eg. youtube.com) or extractor key (eg. Youtube)",
+    )
+    default: SiteLimit | None = Field(
+        default=None,
+        description="Limit of every other host (unlimited if not set)",
+    )
+    max_wait: float = Field(
+        default=60.0,
+        gt=0,
+        description="Seconds after which waiting requests fail (and are retried)",
+    )
+    poll_interval: float = Field(
+        default=1.0,
+        gt=0,
+        description="Maximum number of seconds between attempts to start a waiting request",
+    )
+    lease: float = Field(
+        default=3600.0,
+        gt=0,
+        description="Seconds after which slots of requests in flight expire (valkey mode only)",
+    )
+
+
+class BatchSettings(BaseModel):
+    max_concurrency: int = Field(
+        default=16,
+        ge=1,
+        description="Maximum number of URLs of an extractInfoBatch request extracted in parallel",
+    )
+
+
+class MetricsSettings(BaseModel):
+    enabled: bool = Field(
+        default=False,
+        description="Log the metrics of the worker components periodically",
+    )
+    interval: float = Field(
+        default=60.0,
+        gt=0,
+        description="Seconds between metric logs",
+    )
 
 
 class Settings(BaseSettings):
@@ -52,15 +425,87 @@ class Settings(BaseSettings):
 
     obstore: ObstoreSettings = Field(default_factory=ObstoreSettings)
 
+    upload: UploadSettings = Field(
+        default_factory=UploadSettings,
+        description="Upload settings",
+    )
+
     yt_dlp_defaults: Params = {}
 
     valkey: ValkeySettings | None = Field(default=None, description="Valkey settings")
 
+    scratch: ScratchSettings = Field(
+        default_factory=ScratchSettings,
+        description="Download directory settings",
+    )
+
+    checkpoint: CheckpointSettings = Field(
+        default_factory=CheckpointSettings,
+        description="Checkpoint settings",
+    )
+
+    info_cache: InfoCacheSettings = Field(
+        default_factory=InfoCacheSettings,
+        description="Extraction result cache settings",
+    )
+
+    singleflight: SingleFlightSettings = Field(
+        default_factory=SingleFlightSettings,
+        description="Download deduplication settings",
+    )
+
+    archive: ArchiveSettings = Field(
+        default_factory=ArchiveSettings,
+        description="Download archive settings",
+    )
+
+    ydl_pool: YoutubeDLPoolSettings = Field(
+        default_factory=YoutubeDLPoolSettings,
+        description="YoutubeDL instance reuse settings",
+    )
+
+    connections: ConnectionPoolSettings = Field(
+        default_factory=ConnectionPoolSettings,
+        description="Shared HTTP connection settings",
+    )
+
+    dns_cache: DNSCacheSettings = Field(
+        default_factory=DNSCacheSettings,
+        description="DNS cache settings",
+    )
+
+    scheduler: SchedulerSettings = Field(
+        default_factory=SchedulerSettings,
+        description="Per-site request limit settings",
+    )
+
+    batch: BatchSettings = Field(
+        default_factory=BatchSettings,
+        description="Batch extraction settings",
+    )
+
+    metrics: MetricsSettings = Field(
+        default_factory=MetricsSettings,
+        description="Metrics settings",
+    )
+
     restate: Restate = Field(default_factory=Restate, description="Restate settings")
 
 
 settings = Settings()
 
+_exit_callbacks: list[Callable[[], None]] = []
+
+
+def _on_exit(callback: Callable[[], None]):
+    atexit.register(callback)
+    _exit_callbacks.append(callback)
+
+
+# Components reporting metrics, by name
+metric_sources: dict[str, StatsSource] = {}
+
+
 # logging.basicConfig(level=logging.INFO)
 structlog.stdlib.recreate_defaults(log_level=logging.INFO)
 
@@ -76,13 +521,37 @@ if settings.obstore.client_options:
 if settings.obstore.url:
     store = obstore.store.from_url(settings.obstore.url, client_options=client_options)
 
-persister = workstate.obstore.DirectoryPersister(
-    store,
-    client_options=client_options,
-    logger=structlog.get_logger("workstate"),
-)
+persister: DirectoryPersister
+
+if settings.upload.persister == "obstore":
+    stores = StorePool(
+        client_options,
+        max_size=settings.upload.max_stores,
+        idle_timeout=settings.upload.store_idle_timeout,
+    )
+    obstore_persister = ObstorePersister(
+        store,
+        client_options=client_options,
+        chunk_size=settings.upload.chunk_size,
+        max_concurrency=settings.upload.max_concurrency,
+        max_files=settings.upload.max_files,
+        stores=stores,
+        blobs_prefix=settings.upload.blobs_prefix,
+        logger=structlog.get_logger("storage"),
+    )
+
+    metric_sources["uploads"] = obstore_persister
+    metric_sources["stores"] = stores
+    persister = obstore_persister
+else:
+    persister = workstate.obstore.DirectoryPersister(
+        store,
+        client_options=client_options,
+        logger=structlog.get_logger("workstate"),
+    )
 
 progress_hook: ProgressHook | None = None
+valkey_client: TGlideClient | None = None
 
 if settings.valkey:
     structlog.get_logger().info("Initializing valkey progress hook")
@@ -101,18 +570,216 @@ if settings.valkey:
         if database_candidate.isdigit():
             database = int(database_candidate)
 
-    config = GlideClientConfiguration(
-        [
-            NodeAddress(valkey.dsn.host, valkey.dsn.port or 6379),
-        ],
-        request_timeout=valkey.request_timeout,
-        credentials=credentials,
-        database_id=database,
+    if valkey.cluster and database:
+        raise ValueError("Valkey cluster mode only supports database 0")
+
+    addresses = [NodeAddress(valkey.dsn.host, valkey.dsn.port or 6379)]
+
+    for node in valkey.nodes:
+        host, separator, port = node.rpartition(":")
+        addresses.append(
+            NodeAddress(host, int(port)) if separator else NodeAddress(node, 6379)
+        )
+
+    client: TGlideClient
+
+    if valkey.cluster:
+        client = GlideClusterClient.create(
+            GlideClusterClientConfiguration(
+                addresses,
+                request_timeout=valkey.request_timeout,
+                credentials=credentials,
+                read_from=ReadFrom[valkey.read_from.upper()],
+            )
+        )
+    else:
+        client = GlideClient.create(
+            GlideClientConfiguration(
+                addresses,
+                request_timeout=valkey.request_timeout,
+                credentials=credentials,
+                database_id=database,
+            )
+        )
+
+    progress_sink = ValkeyProgressSink(
+        client,
+        max_buffer=valkey.progress.max_buffer,
+        max_batch=valkey.progress.max_batch,
+        logger=structlog.get_logger("progress"),
+    )
+
+    _on_exit(progress_sink.close)
+    metric_sources["progress"] = progress_sink
+
+    valkey_progress_hook = ValkeyProgressHook(
+        client,
+        min_interval=valkey.progress.min_interval,
+        min_bytes=valkey.progress.min_bytes,
+        sink=progress_sink,
+        ttl=KeyTTL(**valkey.ttl.model_dump()),
+        max_info_size=valkey.progress.max_info_size,
+        events=valkey.progress.events,
+        stream_maxlen=valkey.progress.stream_maxlen,
+        hash_tags=valkey.hash_tags,
+        logger=structlog.get_logger("progress"),
+    )
+
+    _on_exit(valkey_progress_hook.close)
+
+    progress_hook = valkey_progress_hook
+    valkey_client = client
+
+info_cache: InfoCache | None = None
+
+if settings.info_cache.enabled:
+    cache_settings = settings.info_cache
+
+    memory_cache = MemoryInfoCache(
+        ttl=cache_settings.ttl,
+        max_entries=cache_settings.max_entries,
+        max_bytes=cache_settings.max_bytes,
+        logger=structlog.get_logger("cache"),
+    )
+
+    metric_sources["info_cache"] = memory_cache
+    info_cache = memory_cache
+
+    if cache_settings.shared:
+        if valkey_client is None:
+            raise ValueError("Sharing the info cache requires Valkey settings")
+
+        info_cache = TieredInfoCache(
+            info_cache,
+            ValkeyInfoCache(
+                valkey_client,
+                ttl=cache_settings.ttl,
+                logger=structlog.get_logger("cache"),
+            ),
+            logger=structlog.get_logger("cache"),
+        )
+
+checkpoints: ObstoreCheckpointStore | None = None
+
+if settings.checkpoint.enabled:
+    if store is None:
+        raise ValueError("Checkpointing requires an object store (OBSTORE__URL)")
+
+    checkpoints = ObstoreCheckpointStore(
+        store,
+        prefix=settings.checkpoint.prefix,
+        logger=structlog.get_logger("checkpoint"),
+    )
+
+singleflight: SingleFlight | None = None
+
+if settings.singleflight.mode == "local":
+    singleflight = LocalSingleFlight(
+        max_wait=settings.singleflight.max_wait,
+        logger=structlog.get_logger("singleflight"),
+    )
+elif settings.singleflight.mode == "valkey":
+    if valkey_client is None:
+        raise ValueError(
+            "Deduplicating downloads across workers requires Valkey settings"
+        )
+
+    singleflight = ValkeySingleFlight(
+        valkey_client,
+        lease=settings.singleflight.lease,
+        poll_interval=settings.singleflight.poll_interval,
+        result_ttl=settings.singleflight.result_ttl,
+        max_wait=settings.singleflight.max_wait,
+        logger=structlog.get_logger("singleflight"),
     )
 
-    client = GlideClient.create(config)
+archive: DownloadArchive | None = None
 
-    progress_hook = ValkeyProgressHook(client)
+if settings.archive.backend == "valkey":
+    if valkey_client is None:
+        raise ValueError("The Valkey download archive requires Valkey settings")
+
+    archive = ValkeyDownloadArchive(
+        valkey_client,
+        ttl=settings.archive.ttl,
+        logger=structlog.get_logger("archive"),
+    )
+elif settings.archive.backend == "obstore":
+    if store is None:
+        raise ValueError(
+            "The object store download archive requires an object store (OBSTORE__URL)"
+        )
+
+    archive = ObstoreDownloadArchive(store, prefix=settings.archive.prefix)
+
+connections: ConnectionPool | None = None
+
+if settings.dns_cache.enabled and not settings.connections.enabled:
+    raise ValueError("The DNS cache requires shared connections (CONNECTIONS__ENABLED)")
+
+if settings.connections.enabled:
+    try:
+        # Builds on private yt-dlp internals: only imported when enabled
+        from .restate_yt_dlp.network import ConnectionPool, DNSCache
+    except ImportError:
+        structlog.get_logger("connections").warning(
+            "Sharing connections is not supported by this yt-dlp version",
+            exc_info=True,
+        )
+    else:
+        dns_cache: DNSCache | None = None
+
+        if settings.dns_cache.enabled:
+            dns_cache = DNSCache(
+                ttl=settings.dns_cache.ttl,
+                max_entries=settings.dns_cache.max_entries,
+            )
+            metric_sources["dns_cache"] = dns_cache
+
+        connections = ConnectionPool(
+            max_hosts=settings.connections.max_hosts,
+            max_connections_per_host=settings.connections.max_connections_per_host,
+            idle_timeout=settings.connections.idle_timeout,
+            dns_cache=dns_cache,
+            logger=structlog.get_logger("connections"),
+        )
+        _on_exit(connections.close)
+        metric_sources["connections"] = connections
+
+scheduler: Scheduler | None = None
+
+if settings.scheduler.mode is not None:
+    scheduler_backend: SchedulerBackend
+
+    if settings.scheduler.mode == "valkey":
+        if valkey_client is None:
+            raise ValueError("The Valkey scheduler requires Valkey settings")
+
+        scheduler_backend = ValkeySchedulerBackend(
+            valkey_client, lease=settings.scheduler.lease
+        )
+    else:
+        scheduler_backend = LocalSchedulerBackend()
+
+    scheduler = Scheduler(
+        scheduler_backend,
+        sites=settings.scheduler.sites,
+        default=settings.scheduler.default,
+        max_wait=settings.scheduler.max_wait,
+        poll_interval=settings.scheduler.poll_interval,
+        logger=structlog.get_logger("scheduler"),
+    )
+    metric_sources["scheduler"] = scheduler
+
+ydl_pool: YoutubeDLPool | None = None
+
+if settings.ydl_pool.enabled:
+    ydl_pool = YoutubeDLPool(
+        max_size=settings.ydl_pool.max_size,
+        idle_timeout=settings.ydl_pool.idle_timeout,
+        logger=structlog.get_logger("ydl_pool"),
+    )
+    metric_sources["ydl_pool"] = ydl_pool
 
 executor = Executor(
     persister,
@@ -121,9 +788,69 @@ executor = Executor(
         settings.yt_dlp_defaults | {"logger": Logger(structlog.get_logger("yt-dlp"))},
     ),
     progress_hook=progress_hook,
+    info_cache=info_cache,
+    info_cache_margin=settings.info_cache.margin,
+    stream_uploads=settings.upload.streaming,
+    max_uploads=settings.upload.max_files,
+    scratch=(
+        ScratchDirectories(
+            settings.scratch.dir,
+            max_age=settings.scratch.max_age,
+            max_bytes=settings.scratch.max_bytes,
+            logger=structlog.get_logger("scratch"),
+        )
+        if settings.scratch.dir
+        else None
+    ),
+    checkpoints=checkpoints,
+    checkpoint_interval=settings.checkpoint.interval,
+    singleflight=singleflight,
+    archive=archive,
+    ydl_pool=ydl_pool,
+    connections=connections,
+    scheduler=scheduler,
+    max_batch_concurrency=settings.batch.max_concurrency,
     logger=structlog.get_logger("executor"),
 )
 
-service = create_service(executor, settings.restate)
+
+def init_worker() -> dict[str, Callable[..., Any]]:
+    """
+    Return the functions of a worker process in process execution mode.
+
+    Worker processes are spawned: importing this module builds their own executor
+    (with its own clients, background threads and in-memory caches).
+    """
+
+    # Pool workers do not run atexit callbacks on exit, only the finalizers of multiprocessing
+    for callback in _exit_callbacks:
+        multiprocessing.util.Finalize(None, callback, exitpriority=10)
+
+    if metrics is not None:
+        # Handler slots are tracked by the process serving requests
+        metrics.sources = metric_sources.copy()
+
+    return executor_functions(executor)
+
+
+backend = ExecutionBackend(
+    settings.restate.execution,
+    worker_initializer=init_worker,
+    logger=structlog.get_logger("execution"),
+)
+
+service = create_service(executor, settings.restate, backend)
+
+metrics: StatsReporter | None = None
+
+if settings.metrics.enabled:
+    # Also started by worker processes (importing this module), reporting their own components
+    metrics = StatsReporter(
+        metric_sources | {"execution": backend},
+        interval=settings.metrics.interval,
+        logger=structlog.get_logger("metrics").bind(pid=os.getpid()),
+    )
+    metrics.start()
+    _on_exit(metrics.close)
 
 app = restate.app(services=[service], identity_keys=settings.restate.identity_keys)
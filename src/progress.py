@@ -1,9 +1,266 @@
-import json
+import functools
+import logging
+import threading
+import time
+from collections import deque
+from collections.abc import Callable
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import Any, Literal
 
-from glide_sync import Batch, GlideClient
+from glide_sync import (
+    Batch,
+    ClusterBatch,
+    ExpirySet,
+    ExpiryType,
+    GlideClusterClient,
+    StreamAddOptions,
+    TGlideClient,
+    TrimByMaxLen,
+)
 
-from .restate_yt_dlp import Progress
+from .restate_yt_dlp import Progress, serde
+
+_logger = logging.getLogger(__name__)
+
+TERMINAL_STATUSES = frozenset(["finished", "error"])
+
+
+type AnyBatch = Batch | ClusterBatch
+type BatchWriter = Callable[[AnyBatch], None]
+
+
+@dataclass(frozen=True)
+class ProgressSinkStats:
+    """Point-in-time counters of a progress sink."""
+
+    queued: int
+    submitted: int
+    dropped: int
+    flushed: int
+    failed: int
+    batches: int
+
+
+class ValkeyProgressSink:
+    """
+    Writes progress updates to Valkey from a background thread.
+
+    Updates are buffered in a bounded in-memory queue and written in a single pipeline per round-trip, regardless of which download they belong to,
+    so callers never wait on Valkey.
+
+    When the queue is full, the oldest non-terminal update is dropped.
+    Terminal updates (the final state of a download) are never dropped.
+    """
+
+    def __init__(
+        self,
+        client: TGlideClient,
+        max_buffer: int = 10_000,
+        max_batch: int = 1_000,
+        logger: logging.Logger = _logger,
+    ):
+        self.client = client
+        self.max_buffer = max_buffer
+        self.max_batch = max_batch
+        self.logger = logger
+
+        # Writes and whether they are terminal
+        self._queue: deque[tuple[BatchWriter, bool]] = deque()
+        self._condition = threading.Condition()
+        self._closed = False
+        self._writing = 0
+
+        self._submitted = 0
+        self._dropped = 0
+        self._flushed = 0
+        self._failed = 0
+        self._batches = 0
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="valkey-progress-sink",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def submit(self, write: BatchWriter, terminal: bool = False):
+        """
+        Queue an update without blocking.
+
+        Args:
+            terminal: The update is the final state of a download: it is written even if the buffer is full.
+        """
+        with self._condition:
+            self._submitted += 1
+
+            # When only terminal updates are queued, terminal ones exceed the bound rather than being lost
+            if (
+                len(self._queue) >= self.max_buffer
+                and not self._evict()
+                and not terminal
+            ):
+                self._dropped += 1
+                return
+
+            self._queue.append((write, terminal))
+            self._condition.notify_all()
+
+    def stats(self) -> ProgressSinkStats:
+        with self._condition:
+            return ProgressSinkStats(
+                queued=len(self._queue),
+                submitted=self._submitted,
+                dropped=self._dropped,
+                flushed=self._flushed,
+                failed=self._failed,
+                batches=self._batches,
+            )
+
+    def drain(self, timeout: float | None = None) -> bool:
+        """Wait until every queued update is written (or dropped). Returns False on timeout."""
+        with self._condition:
+            return self._condition.wait_for(
+                lambda: not self._queue and not self._writing,
+                timeout,
+            )
+
+    def close(self, timeout: float | None = None):
+        """Write the remaining updates and stop the background thread."""
+        with self._condition:
+            self._closed = True
+            self._condition.notify_all()
+
+        self._thread.join(timeout)
+
+    def _evict(self) -> bool:
+        """Drop the oldest non-terminal update. Must be called with the lock held."""
+        for index, (_, terminal) in enumerate(self._queue):
+            if not terminal:
+                del self._queue[index]
+                self._dropped += 1
+                return True
+
+        return False
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while not self._queue and not self._closed:
+                    self._condition.wait()
+
+                if not self._queue:
+                    return
+
+                writes = [
+                    self._queue.popleft()[0]
+                    for _ in range(min(self.max_batch, len(self._queue)))
+                ]
+                self._writing = len(writes)
+
+            self._exec(writes)
+
+    def _exec(self, writes: list[BatchWriter]):
+        # Non-atomic cluster batches are split by slot and pipelined to each node
+        pipeline: AnyBatch = (
+            ClusterBatch(is_atomic=False)
+            if isinstance(self.client, GlideClusterClient)
+            else Batch(is_atomic=False)
+        )
+        prepared = 0
+        failed = 0
+
+        for write in writes:
+            try:
+                write(pipeline)
+                prepared += 1
+            except Exception:
+                failed += 1
+                self.logger.exception("Failed to prepare download progress")
+
+        try:
+            if prepared:
+                self.client.exec(pipeline, False)
+        except Exception:
+            failed += prepared
+            prepared = 0
+            self.logger.exception("Failed to write download progress")
+
+        with self._condition:
+            self._flushed += prepared
+            self._failed += failed
+            self._batches += 1 if prepared else 0
+            self._writing = 0
+            self._condition.notify_all()
+
+
+@dataclass(frozen=True)
+class KeyTTL:
+    """Expiry (in seconds) of each key family; None means the keys never expire."""
+
+    info: int | None = None
+    progress: int | None = None
+    downloaded_bytes: int | None = None
+
+    # Expiry applied to every key family once a download reached a final state
+    linger: int | None = None
+
+    def for_terminal(self) -> "KeyTTL":
+        if self.linger is None:
+            return self
+
+        return KeyTTL(
+            info=self.linger,
+            progress=self.linger,
+            downloaded_bytes=self.linger,
+            linger=self.linger,
+        )
+
+
+def _expiry(ttl: int | None) -> ExpirySet | None:
+    return ExpirySet(ExpiryType.SEC, ttl) if ttl else None
+
+
+@dataclass
+class _WrittenProgress:
+    """Last progress of a single invocation handed to the sink."""
+
+    written_at: float
+    downloaded_bytes: dict[str, int] = field(default_factory=dict)
+
+
+@dataclass
+class _PendingProgress:
+    """Coalesced progress of a single invocation waiting to be written."""
+
+    url: str
+    progress: dict[str, Any]
+    video_id: str | None = None
+    info: Progress | None = None
+    downloaded_bytes: dict[str, int] = field(default_factory=dict)
+
+    def is_due(
+        self,
+        now: float,
+        written: _WrittenProgress | None,
+        min_interval: float,
+        min_bytes: int,
+    ) -> bool:
+        if written is None:
+            return True
+
+        if now - written.written_at < min_interval:
+            return False
+
+        delta = max(
+            (
+                downloaded - written.downloaded_bytes.get(filename, 0)
+                for filename, downloaded in self.downloaded_bytes.items()
+            ),
+            default=0,
+        )
+
+        return delta >= min_bytes
 
 
 class ValkeyProgressHook:
@@ -12,6 +269,7 @@ class ValkeyProgressHook:
     INFO_KEY = "info"
     PROGRESS_KEY = "progress"
     DOWNLOADED_BYTES_KEY = "downloaded-bytes"
+    EVENTS_KEY = "events"
 
     # Fields to extract for progress updates
     PROGRESS_FIELDS = frozenset(
@@ -33,30 +291,315 @@ class ValkeyProgressHook:
         ]
     )
 
-    def __init__(self, client: GlideClient):
+    # Info dict fields dropped when the info record exceeds the size limit
+    HEAVY_INFO_FIELDS = frozenset(
+        [
+            "formats",
+            "requested_formats",
+            "requested_downloads",
+            "thumbnails",
+            "subtitles",
+            "automatic_captions",
+            "requested_subtitles",
+            "comments",
+            "heatmap",
+            "chapters",
+            "fragments",
+            "entries",
+            "description",
+        ]
+    )
+
+    def __init__(
+        self,
+        client: TGlideClient,
+        min_interval: float = 0.0,
+        min_bytes: int = 0,
+        sink: ValkeyProgressSink | None = None,
+        ttl: KeyTTL | None = None,
+        max_info_size: int | None = None,
+        events: Literal["stream", "pubsub"] | None = None,
+        stream_maxlen: int = 1_000,
+        hash_tags: bool | None = None,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            client: Valkey client.
+            min_interval: Minimum number of seconds between two writes of the same invocation.
+            min_bytes: Minimum number of newly downloaded bytes between two writes of the same invocation.
+            sink: Sink writing updates in the background (one is created for the client if not given).
+            ttl: Expiry of the written keys (keys never expire by default).
+            max_info_size: Maximum size of the info record in bytes.
+                Larger records are stripped of their heavy fields (formats, thumbnails, etc.)
+                or skipped entirely if they are still too large.
+            events: Also push compact progress events of each invocation
+                to a Valkey Stream (trimmed to roughly stream_maxlen entries) or a pub/sub channel,
+                so consumers can subscribe instead of polling.
+                The key/channel name is "yt-dlp:download:events:by-invocation-id:<invocation id>"
+                (tagged like the other keys with hash tags).
+            stream_maxlen: Approximate maximum length of event streams.
+            hash_tags: Prefix the identifier part of keys with the invocation id as a hash tag
+                (eg. "yt-dlp:download:progress:{<invocation id>}:by-url:<url>"),
+                so every key written by an update lands in the same cluster slot
+                and is pipelined to a single node.
+                Keys by URL or video id are then per invocation (find them with SCAN).
+                Enabled by default for cluster clients.
+
+        Updates are always written through the sink, so the download thread never waits on Valkey.
+
+        Setting either limit enables rate-limited mode:
+        progress is coalesced in memory and handed to the sink by a background flusher.
+        Final (finished/error) updates are never coalesced: they are handed to the sink right away.
+
+        Call close_invocation once the download of an invocation ended (successfully or not)
+        to write its pending progress and release its state.
+        """
         self.client = client
+        self.sink = sink or ValkeyProgressSink(client, logger=logger)
+        self._owns_sink = sink is None
+        self.ttl = ttl or KeyTTL()
+        self.max_info_size = max_info_size
+        self.events = events
+        self.hash_tags = (
+            hash_tags
+            if hash_tags is not None
+            else isinstance(client, GlideClusterClient)
+        )
+        self.stream_maxlen = stream_maxlen
+        self.min_interval = min_interval
+        self.min_bytes = min_bytes
+        self.logger = logger
+
+        self._pending: dict[str, _PendingProgress] = {}
+        self._written: dict[str, _WrittenProgress] = {}
+        self._info_fingerprints: dict[str, tuple[int, str | None, str | None]] = {}
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._closed = False
+        self._flusher: threading.Thread | None = None
+
+        if self.rate_limited:
+            self._flusher = threading.Thread(
+                target=self._run_flusher,
+                name="valkey-progress-flusher",
+                daemon=True,
+            )
+            self._flusher.start()
+
+    @property
+    def rate_limited(self) -> bool:
+        return self.min_interval > 0 or self.min_bytes > 0
 
-    def _make_key(self, key_type: str, identifier_type: str, identifier: str) -> str:
+    def _make_key(
+        self,
+        key_type: str,
+        identifier_type: str,
+        identifier: str,
+        invocation_id: str,
+    ) -> str:
         """Generate a Redis key with consistent pattern."""
+        if self.hash_tags:
+            # Tagged before the identifier: the first braces of a key are its hash tag (URLs may contain some)
+            return f"{self.KEY_PREFIX}:{key_type}:{{{invocation_id}}}:{identifier_type}:{identifier}"
+
         return f"{self.KEY_PREFIX}:{key_type}:{identifier_type}:{identifier}"
 
     def __call__(self, invocation_id: str, url: str, progress: Progress):
-        id = progress.get("info_dict", {}).get("id", None)
+        video_id = progress.get("info_dict", {}).get("id", None)
+        compact = {k: progress[k] for k in self.PROGRESS_FIELDS if k in progress}
+        terminal = progress.get("status") in TERMINAL_STATUSES
 
-        partial_progress = {
-            k: progress[k] for k in self.PROGRESS_FIELDS if k in progress
-        }
+        filename = progress.get("filename", None)
+        downloaded_bytes = (
+            {filename: progress.get("downloaded_bytes", 0)} if filename else {}
+        )
 
-        info_json = json.dumps(progress)
-        progress_json = json.dumps(partial_progress)
+        with self._lock:
+            info = self._take_info(invocation_id, progress, terminal)
 
-        filename = progress.get("filename", None)
-        if filename:
-            filename = Path(filename).name
+            if not self.rate_limited:
+                self._submit(
+                    invocation_id,
+                    _PendingProgress(url, compact, video_id, info, downloaded_bytes),
+                    terminal,
+                )
+
+                return
+
+            pending = self._pending.get(invocation_id)
+
+            if pending is None:
+                pending = _PendingProgress(url, compact)
+
+                if invocation_id not in self._written:
+                    # Report the start of a download right away
+                    self._wakeup.set()
+            else:
+                pending.progress = compact
+
+            pending.video_id = video_id or pending.video_id
+            pending.downloaded_bytes.update(downloaded_bytes)
+
+            if info is not None:
+                pending.info = info
+
+            if terminal:
+                # Written right away: the next file of the invocation must not replace the final state of this one
+                self._pending.pop(invocation_id, None)
+                self._mark_written(invocation_id, pending, time.monotonic())
+                self._submit(invocation_id, pending, terminal)
+            else:
+                self._pending[invocation_id] = pending
+
+    def close_invocation(self, invocation_id: str):
+        """
+        Write the pending progress of an invocation and release its state.
+
+        Call once its download ended, including when yt-dlp raised without reporting an error status.
+        """
+        with self._lock:
+            pending = self._pending.pop(invocation_id, None)
+            self._written.pop(invocation_id, None)
+            self._info_fingerprints.pop(invocation_id, None)
+
+            if pending is not None:
+                self._submit(invocation_id, pending, terminal=False)
+
+    def _take_info(
+        self,
+        invocation_id: str,
+        progress: Progress,
+        terminal: bool,
+    ) -> Progress | None:
+        """
+        Return a snapshot of the progress to store as the info record if it needs to be (re)written.
+
+        The info dict is effectively constant during a download,
+        so it is only written when a new one shows up (eg. the next format of a merged download)
+        and once more with the final state.
+
+        Must be called with the lock held.
+        """
+        info_dict = progress.get("info_dict", {})
+        fingerprint = (id(info_dict), info_dict.get("id"), info_dict.get("format_id"))
+
+        if terminal:
+            self._info_fingerprints.pop(invocation_id, None)
+        elif self._info_fingerprints.get(invocation_id) != fingerprint:
+            self._info_fingerprints[invocation_id] = fingerprint
+        else:
+            return None
+
+        # Take a shallow snapshot: yt-dlp keeps mutating its dicts after the hook returns
+        snapshot = Progress(**progress)
+        if "info_dict" in snapshot:
+            snapshot["info_dict"] = dict(snapshot["info_dict"])
+
+        return snapshot
+
+    def flush(self, timeout: float | None = None):
+        """Write every pending update regardless of the rate limits."""
+        self._flush(force=True)
+        self.sink.drain(timeout)
+
+    def close(self):
+        """Stop the background flusher and write every pending update."""
+        self._closed = True
+        self._wakeup.set()
+
+        if self._flusher:
+            self._flusher.join()
+
+        self.flush()
+
+        if self._owns_sink:
+            self.sink.close()
+
+    def _run_flusher(self):
+        # Wake up often enough to honor the interval without busy looping
+        tick = self.min_interval if self.min_interval > 0 else 0.5
+
+        while not self._closed:
+            self._wakeup.wait(tick)
+            self._wakeup.clear()
+
+            try:
+                self._flush()
+            except Exception:
+                self.logger.exception("Failed to flush download progress")
+
+    def _flush(self, force: bool = False):
+        now = time.monotonic()
+
+        with self._lock:
+            for invocation_id, pending in list(self._pending.items()):
+                if not (
+                    force
+                    or pending.is_due(
+                        now,
+                        self._written.get(invocation_id),
+                        self.min_interval,
+                        self.min_bytes,
+                    )
+                ):
+                    continue
+
+                del self._pending[invocation_id]
+                self._mark_written(invocation_id, pending, now)
+                self._submit(invocation_id, pending, terminal=False)
 
-        downloaded_bytes = str(progress.get("downloaded_bytes", 0))
+    def _mark_written(self, invocation_id: str, pending: _PendingProgress, now: float):
+        """Must be called with the lock held."""
+        written = self._written.get(invocation_id)
 
-        pipeline = Batch(is_atomic=False)
+        if written is None:
+            written = self._written[invocation_id] = _WrittenProgress(now)
+
+        written.written_at = now
+        written.downloaded_bytes.update(pending.downloaded_bytes)
+
+    def _submit(self, invocation_id: str, pending: _PendingProgress, terminal: bool):
+        """
+        Hand an update to the sink.
+
+        Must be called with the lock held, so updates of an invocation are written in order.
+        """
+        self.sink.submit(
+            functools.partial(
+                self._write,
+                invocation_id=invocation_id,
+                url=pending.url,
+                video_id=pending.video_id,
+                progress=pending.progress,
+                downloaded_bytes=pending.downloaded_bytes,
+                info=pending.info,
+                terminal=terminal,
+            ),
+            terminal=terminal,
+        )
+
+    def _write(
+        self,
+        pipeline: AnyBatch,
+        *,
+        invocation_id: str,
+        url: str,
+        video_id: str | None,
+        progress: dict[str, Any],
+        downloaded_bytes: dict[str, int],
+        info: Progress | None,
+        terminal: bool,
+    ):
+        info_json = self._encode_info(info) if info is not None else None
+        progress_json = serde.dumps(progress)
+
+        ttl = self.ttl.for_terminal() if terminal else self.ttl
+
+        downloaded = {
+            Path(filename).name: str(value)
+            for filename, value in downloaded_bytes.items()
+        }
 
         # Store data by different identifiers
         identifiers = [
@@ -64,24 +607,102 @@ class ValkeyProgressHook:
             ("by-invocation-id", invocation_id),
         ]
 
-        if id:
-            identifiers.append(("by-id", id))
+        if video_id:
+            identifiers.append(("by-id", video_id))
 
         for identifier_type, identifier in identifiers:
+            if info_json is not None:
+                pipeline.set(
+                    self._make_key(
+                        self.INFO_KEY, identifier_type, identifier, invocation_id
+                    ),
+                    info_json,
+                    expiry=_expiry(ttl.info),
+                )
+
             pipeline.set(
-                self._make_key(self.INFO_KEY, identifier_type, identifier), info_json
-            )
-            pipeline.set(
-                self._make_key(self.PROGRESS_KEY, identifier_type, identifier),
+                self._make_key(
+                    self.PROGRESS_KEY, identifier_type, identifier, invocation_id
+                ),
                 progress_json,
+                expiry=_expiry(ttl.progress),
             )
 
-            if filename:
-                pipeline.hset(
-                    self._make_key(
-                        self.DOWNLOADED_BYTES_KEY, identifier_type, identifier
-                    ),
-                    {filename: downloaded_bytes},
+            if downloaded:
+                key = self._make_key(
+                    self.DOWNLOADED_BYTES_KEY,
+                    identifier_type,
+                    identifier,
+                    invocation_id,
                 )
 
-        self.client.exec(pipeline, False)
+                pipeline.hset(key, downloaded)
+
+                if ttl.downloaded_bytes:
+                    pipeline.expire(key, ttl.downloaded_bytes)
+
+        if self.events:
+            self._publish(pipeline, invocation_id, url, video_id, progress_json, ttl)
+
+    def _publish(
+        self,
+        pipeline: AnyBatch,
+        invocation_id: str,
+        url: str,
+        video_id: str | None,
+        progress_json: bytes,
+        ttl: KeyTTL,
+    ):
+        key = self._make_key(
+            self.EVENTS_KEY, "by-invocation-id", invocation_id, invocation_id
+        )
+
+        event = {
+            "invocation_id": invocation_id,
+            "url": url,
+            "id": video_id or "",
+            "progress": progress_json,
+        }
+
+        if self.events == "pubsub":
+            pipeline.publish(
+                serde.dumps(event | {"progress": progress_json.decode()}).decode(), key
+            )
+
+            return
+
+        pipeline.xadd(
+            key,
+            list(event.items()),
+            StreamAddOptions(
+                trim=TrimByMaxLen(exact=False, threshold=self.stream_maxlen),
+            ),
+        )
+
+        if ttl.progress:
+            pipeline.expire(key, ttl.progress)
+
+    def _encode_info(self, info: Progress) -> bytes | None:
+        """Encode the info record, shrinking (or skipping) it when it exceeds the size limit."""
+        info_json = serde.dumps(info)
+
+        if self.max_info_size is None or len(info_json) <= self.max_info_size:
+            return info_json
+
+        info_dict = info.get("info_dict", {})
+        compact = Progress(**info)
+        compact["info_dict"] = {
+            k: v for k, v in info_dict.items() if k not in self.HEAVY_INFO_FIELDS
+        } | {"_truncated": True}
+
+        info_json = serde.dumps(compact)
+
+        if len(info_json) <= self.max_info_size:
+            return info_json
+
+        self.logger.warning(
+            "Skipping info record exceeding the size limit",
+            extra={"id": info_dict.get("id"), "size": len(info_json)},
+        )
+
+        return None
@@ -1,7 +1,10 @@
+from .execution import ExecutionBackend, ExecutionOptions, ExecutionStats
 from .executor import Executor
+from .metrics import StatsReporter
 from .options import RequestOptions
 from .progress import Progress
 from .restate import (
+    ConcurrencyOptions,
     HandlerOptions,
     Options,
     ServiceOptions,
@@ -10,9 +13,14 @@ from .restate import (
 )
 
 __all__ = [
+    "ExecutionBackend",
+    "ExecutionOptions",
+    "ExecutionStats",
     "Executor",
+    "StatsReporter",
     "RequestOptions",
     "Progress",
+    "ConcurrencyOptions",
     "HandlerOptions",
     "Options",
     "ServiceOptions",
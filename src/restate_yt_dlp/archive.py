@@ -0,0 +1,85 @@
+"""Shared download archives, so already downloaded videos are skipped by every worker."""
+
+from __future__ import annotations
+
+import logging
+from typing import Protocol
+
+_logger = logging.getLogger(__name__)
+
+
+class DownloadArchive(Protocol):
+    """Set of archive keys of downloaded videos (a set works for a single worker)."""
+
+    def __contains__(self, key: str) -> bool: ...
+
+    def add(self, key: str): ...
+
+
+class ScopedArchive:
+    """
+    View of an archive for a single output location, passed to yt-dlp as download_archive.
+
+    yt-dlp records videos once downloaded: records are kept pending
+    until commit is called (eg. once the files are uploaded).
+    Videos yt-dlp skipped because the archive already recorded them are tracked as hits.
+    """
+
+    def __init__(
+        self,
+        archive: DownloadArchive,
+        scope: str,
+        logger: logging.Logger | logging.LoggerAdapter = _logger,
+    ):
+        """
+        Args:
+            archive: Shared archive.
+            scope: Output location the archived videos were downloaded to.
+        """
+
+        self.archive = archive
+        self.scope = scope
+        self.logger = logger
+
+        self._pending: list[str] = []
+        self._hits: list[str] = []
+
+    def __bool__(self) -> bool:
+        # yt-dlp skips checking empty archives
+        return True
+
+    def __contains__(self, id: str) -> bool:
+        if id in self._pending:
+            return True
+
+        try:
+            found = self._key(id) in self.archive
+        except Exception:
+            self.logger.exception("Failed to check download archive")
+            return False
+
+        if found:
+            self._hits.append(id)
+
+        return found
+
+    @property
+    def skipped(self) -> bool:
+        """Whether yt-dlp found videos in the archive and recorded none (so nothing was downloaded)."""
+
+        return bool(self._hits) and not self._pending
+
+    def add(self, id: str):
+        if id not in self._pending:
+            self._pending.append(id)
+
+    def commit(self):
+        """Record the videos downloaded so far in the archive."""
+
+        for id in self._pending:
+            self.archive.add(self._key(id))
+
+        self._pending.clear()
+
+    def _key(self, id: str) -> str:
+        return f"{self.scope} {id}"
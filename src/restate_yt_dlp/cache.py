@@ -0,0 +1,278 @@
+"""Caching of extraction results."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Mapping
+from dataclasses import dataclass
+from typing import Any, Protocol
+from urllib.parse import parse_qs, urlsplit
+
+from .fingerprint import normalize_url, params_fingerprint
+
+_logger = logging.getLogger(__name__)
+
+# Query parameters carrying the (unix timestamp) expiry of signed media URLs
+_EXPIRY_PARAMS = ("expire", "expires")
+
+
+class InfoCache(Protocol):
+    """Storage of encoded extraction results."""
+
+    def get(self, key: str) -> bytes | None: ...
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        """
+        Store a value.
+
+        Args:
+            ttl: Upper bound of the entry lifetime in seconds (the cache may expire it sooner).
+        """
+        ...
+
+    def expires_in(self, key: str) -> float | None:
+        """Return the remaining lifetime of an entry in seconds (None if it is missing or unknown)."""
+        ...
+
+    def delete(self, key: str): ...
+
+
+def cache_key(url: str, params: Mapping[str, Any]) -> str:
+    """Return the cache key of extracting url with params."""
+
+    key = f"{normalize_url(url)}\n{params_fingerprint(params)}"
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+def media_expiry(info: Mapping[str, Any]) -> float | None:
+    """
+    Return the earliest expiry (unix timestamp) of the signed media URLs in an info dict.
+
+    Returns:
+        None if none of the URLs carry an expiry.
+    """
+
+    urls: list[str] = []
+
+    if isinstance(info.get("url"), str):
+        urls.append(info["url"])
+
+    for key in ("formats", "requested_formats"):
+        for fmt in info.get(key) or []:
+            if isinstance(fmt, Mapping) and isinstance(fmt.get("url"), str):
+                urls.append(fmt["url"])
+
+    expiry: float | None = None
+
+    for url in urls:
+        query = parse_qs(urlsplit(url).query)
+
+        for param in _EXPIRY_PARAMS:
+            for value in query.get(param, []):
+                if value.isdigit():
+                    expiry = min(expiry or float("inf"), float(value))
+
+    return expiry
+
+
+@dataclass(frozen=True)
+class InfoCacheStats:
+    """Point-in-time metrics of an in-memory cache."""
+
+    entries: int
+    bytes: int
+    hits: int
+    misses: int
+    evictions: int
+
+    @property
+    def hit_ratio(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+
+class MemoryInfoCache:
+    """
+    In-process LRU cache with a TTL.
+
+    Entries are evicted (least recently used first) when either limit is exceeded.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 3600.0,
+        max_entries: int = 1_000,
+        max_bytes: int | None = None,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            ttl: Lifetime of entries in seconds.
+            max_entries: Maximum number of entries.
+            max_bytes: Maximum total size of entries (unlimited if not set).
+        """
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.logger = logger
+
+        self._entries: OrderedDict[str, tuple[float, bytes]] = OrderedDict()
+        self._bytes = 0
+        self._lock = threading.Lock()
+
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, key: str) -> bytes | None:
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is None:
+                self._misses += 1
+                return None
+
+            expires_at, value = entry
+
+            if expires_at <= time.monotonic():
+                self._remove(key)
+                self._misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._hits += 1
+
+            return value
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        ttl = self.ttl if ttl is None else min(ttl, self.ttl)
+
+        if ttl <= 0 or (self.max_bytes is not None and len(value) > self.max_bytes):
+            return
+
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = (time.monotonic() + ttl, value)
+            self._bytes += len(value)
+
+            while len(self._entries) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                self._remove(next(iter(self._entries)))
+                self._evictions += 1
+
+    def expires_in(self, key: str) -> float | None:
+        with self._lock:
+            entry = self._entries.get(key)
+
+        if entry is None:
+            return None
+
+        remaining = entry[0] - time.monotonic()
+
+        return remaining if remaining > 0 else None
+
+    def delete(self, key: str):
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+    def stats(self) -> InfoCacheStats:
+        with self._lock:
+            return InfoCacheStats(
+                entries=len(self._entries),
+                bytes=self._bytes,
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+    def _remove(self, key: str):
+        _, value = self._entries.pop(key)
+        self._bytes -= len(value)
+
+
+class TieredInfoCache:
+    """
+    Chain of caches looked up in order (eg. in-process first, shared second).
+
+    Hits in a later tier are copied to the earlier ones for the remaining lifetime of the entry.
+    """
+
+    def __init__(self, *tiers: InfoCache, logger: logging.Logger = _logger):
+        self.tiers = tiers
+        self.logger = logger
+
+    def get(self, key: str) -> bytes | None:
+        for index, tier in enumerate(self.tiers):
+            try:
+                value = tier.get(key)
+            except Exception:
+                self.logger.exception("Failed to read from cache tier")
+                continue
+
+            if value is not None:
+                if index:
+                    self._backfill(key, value, tier, self.tiers[:index])
+
+                return value
+
+        return None
+
+    def set(self, key: str, value: bytes, ttl: float | None = None):
+        for tier in self.tiers:
+            try:
+                tier.set(key, value, ttl)
+            except Exception:
+                self.logger.exception("Failed to write to cache tier")
+
+    def expires_in(self, key: str) -> float | None:
+        for tier in self.tiers:
+            try:
+                ttl = tier.expires_in(key)
+            except Exception:
+                self.logger.exception("Failed to read from cache tier")
+                continue
+
+            if ttl is not None:
+                return ttl
+
+        return None
+
+    def delete(self, key: str):
+        for tier in self.tiers:
+            try:
+                tier.delete(key)
+            except Exception:
+                self.logger.exception("Failed to delete from cache tier")
+
+    def _backfill(
+        self,
+        key: str,
+        value: bytes,
+        tier: InfoCache,
+        earlier: tuple[InfoCache, ...],
+    ):
+        try:
+            ttl = tier.expires_in(key)
+        except Exception:
+            self.logger.exception("Failed to read from cache tier")
+            return
+
+        if ttl is None:
+            # Expired in the meantime
+            return
+
+        for cache in earlier:
+            try:
+                cache.set(key, value, ttl)
+            except Exception:
+                self.logger.exception("Failed to write to cache tier")
@@ -0,0 +1,253 @@
+"""Checkpointing partial downloads, so retries on other nodes can resume them."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import TYPE_CHECKING, Protocol, TypedDict
+
+if TYPE_CHECKING:
+    from .progress import Progress
+
+_logger = logging.getLogger(__name__)
+
+_READ_SIZE = 8 * 1024 * 1024
+
+
+class FileCheckpoint(TypedDict):
+    # Offsets and sizes of the uploaded chunks of the partial file
+    chunks: list[tuple[int, int]]
+    # Contents of yt-dlp's fragment state (.ytdl) file
+    ytdl: str | None
+
+
+class CheckpointStore(Protocol):
+    """Storage of checkpoints of partial downloads, keyed by invocation id."""
+
+    def load(self, id: str) -> dict[str, FileCheckpoint]: ...
+
+    def save(self, id: str, files: dict[str, FileCheckpoint]): ...
+
+    def write_chunk(self, id: str, path: str, offset: int, data: Iterator[bytes]): ...
+
+    def read_chunk(self, id: str, path: str, offset: int) -> Iterator[bytes]: ...
+
+    def delete(self, id: str): ...
+
+
+class Checkpointer:
+    """
+    Checkpoints the partial files of a single download.
+
+    Register progress_hook as a yt-dlp progress hook: it takes a consistent snapshot
+    (partial file size and fragment state) while a download is in progress
+    and uploads it in the background.
+    """
+
+    def __init__(
+        self,
+        store: CheckpointStore,
+        id: str,
+        root: Path,
+        interval: float = 60.0,
+        logger: logging.Logger | logging.LoggerAdapter = _logger,
+    ):
+        """
+        Args:
+            store: Checkpoint store.
+            id: Invocation id.
+            root: Download directory.
+            interval: Minimum number of seconds between checkpoints.
+        """
+
+        self.store = store
+        self.id = id
+        self.root = root.resolve()
+        self.interval = interval
+        self.logger = logger
+
+        self._files: dict[str, FileCheckpoint] = {}
+        self._checkpointed_at = time.monotonic()
+
+        self._pending: tuple[str, int, str | None] | None = None
+        self._condition = threading.Condition()
+        self._closed = False
+        self._thread: threading.Thread | None = None
+
+    def restore(self):
+        """Restore checkpointed partial files that are missing (or shorter) locally."""
+
+        self._files = self.store.load(self.id)
+
+        for path, checkpoint in self._files.items():
+            file = self.root / path
+            size = sum(chunk_size for _, chunk_size in checkpoint["chunks"])
+
+            if file.exists() and file.stat().st_size >= size:
+                continue
+
+            file.parent.mkdir(parents=True, exist_ok=True)
+
+            with file.open("wb") as out:
+                for offset, _ in checkpoint["chunks"]:
+                    for buffer in self.store.read_chunk(self.id, path, offset):
+                        out.write(buffer)
+
+            if checkpoint["ytdl"] is not None:
+                _ytdl_path(file).write_text(checkpoint["ytdl"])
+
+            self.logger.info(
+                "Restored partial download from checkpoint",
+                extra={"path": path, "bytes": size},
+            )
+
+    def progress_hook(self, progress: Progress):
+        if progress.get("status") != "downloading":
+            return
+
+        tmpfilename = progress.get("tmpfilename")
+        if not tmpfilename:
+            return
+
+        now = time.monotonic()
+        if now - self._checkpointed_at < self.interval:
+            return
+
+        self._checkpointed_at = now
+
+        # Progress hooks run between fragments (unless fragments are downloaded concurrently):
+        # the partial file holds exactly the fragments recorded in the fragment state.
+        file = Path(tmpfilename).resolve()
+
+        try:
+            path = file.relative_to(self.root).as_posix()
+            size = file.stat().st_size
+        except (ValueError, FileNotFoundError):
+            return
+
+        ytdl_file = _ytdl_path(Path(progress.get("filename") or file))
+        ytdl = ytdl_file.read_text() if ytdl_file.exists() else None
+
+        with self._condition:
+            # Only the latest snapshot matters
+            self._pending = (path, size, ytdl)
+            self._condition.notify()
+
+        if self._thread is None:
+            self._thread = threading.Thread(
+                target=self._run,
+                name="restate-yt-dlp-checkpoint",
+                daemon=True,
+            )
+            self._thread.start()
+
+    def close(self):
+        """Stop checkpointing once the latest snapshot is uploaded."""
+
+        with self._condition:
+            self._closed = True
+            self._condition.notify()
+
+        if self._thread is not None:
+            self._thread.join()
+
+    def discard(self):
+        """Stop checkpointing and delete the checkpoints (eg. once the download completed)."""
+
+        self.close()
+
+        try:
+            self.store.delete(self.id)
+        except Exception:
+            self.logger.exception("Failed to delete checkpoints")
+
+    def _run(self):
+        while True:
+            with self._condition:
+                while self._pending is None and not self._closed:
+                    self._condition.wait()
+
+                snapshot, self._pending = self._pending, None
+
+            if snapshot is None:
+                return
+
+            try:
+                self._checkpoint(*snapshot)
+            except Exception:
+                self.logger.exception("Failed to checkpoint partial download")
+
+    def _checkpoint(self, path: str, size: int, ytdl: str | None):
+        checkpoint = self._files.get(path)
+        uploaded = (
+            sum(chunk_size for _, chunk_size in checkpoint["chunks"])
+            if checkpoint
+            else 0
+        )
+
+        if checkpoint is None or size < uploaded:
+            # New file or yt-dlp started over
+            checkpoint = FileCheckpoint(chunks=[], ytdl=None)
+            uploaded = 0
+
+        if size > uploaded:
+            chunk = _RangeReader(self.root / path, uploaded, size - uploaded)
+
+            self.store.write_chunk(self.id, path, uploaded, iter(chunk))
+
+            if chunk.read < size - uploaded:
+                # Shrank since the snapshot (yt-dlp started over): the chunk does not match the fragment state
+                self._files.pop(path, None)
+                self.store.save(self.id, self._files)
+
+                self.logger.info(
+                    "Partial download shrank, dropped its checkpoint",
+                    extra={"path": path},
+                )
+                return
+
+            checkpoint["chunks"].append((uploaded, chunk.read))
+
+        checkpoint["ytdl"] = ytdl
+        self._files[path] = checkpoint
+
+        self.store.save(self.id, self._files)
+
+        self.logger.debug(
+            "Checkpointed partial download",
+            extra={"path": path, "bytes": size, "uploaded": size - uploaded},
+        )
+
+
+def _ytdl_path(file: Path) -> Path:
+    """Return the fragment state file of a (partial) download."""
+
+    name = file.name.removesuffix(".part")
+
+    return file.with_name(f"{name}.ytdl")
+
+
+class _RangeReader:
+    """Reads a range of a file, counting the bytes actually read."""
+
+    def __init__(self, file: Path, offset: int, size: int):
+        self.file = file
+        self.offset = offset
+        self.size = size
+        self.read = 0
+
+    def __iter__(self) -> Iterator[bytes]:
+        with self.file.open("rb") as f:
+            f.seek(self.offset)
+
+            while self.read < self.size:
+                data = f.read(min(_READ_SIZE, self.size - self.read))
+
+                if not data:
+                    break
+
+                self.read += len(data)
+                yield data
@@ -0,0 +1,256 @@
+from __future__ import annotations
+
+import asyncio
+import concurrent.futures
+import contextvars
+import functools
+import logging
+import multiprocessing
+import threading
+import time
+from collections.abc import Callable, Coroutine, Mapping
+from dataclasses import dataclass
+from typing import Any, Literal
+
+from pydantic import BaseModel, Field
+
+_logger = logging.getLogger(__name__)
+
+
+class ExecutionOptions(BaseModel):
+    """Options for the backend running blocking executor calls."""
+
+    mode: Literal["inline", "thread", "process"] = Field(
+        default="thread",
+        description=(
+            "Where blocking calls run: "
+            "'inline' the default event loop executor, where the Restate SDK runs synchronous actions anyway "
+            "(same as without an execution backend, only adding the handler limits and metrics), "
+            "'thread' a dedicated thread pool, "
+            "'process' a pool of worker processes (each building its own executor)"
+        ),
+    )
+    max_workers: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of pool workers (defaults to the pool's own default)",
+    )
+
+
+@dataclass(frozen=True)
+class ExecutionStats:
+    """Point-in-time metrics of a single handler's execution slots."""
+
+    max_concurrency: int | None
+    running: int
+    queued: int
+    max_queued: int
+    completed: int
+    failed: int
+    wait_seconds_total: float
+    wait_seconds_max: float
+
+    @property
+    def wait_seconds_avg(self) -> float:
+        started = self.running + self.completed + self.failed
+        return self.wait_seconds_total / started if started else 0.0
+
+
+class _Limiter:
+    def __init__(self, max_concurrency: int | None):
+        self.max_concurrency = max_concurrency
+        self.semaphore = asyncio.Semaphore(max_concurrency) if max_concurrency else None
+        self.running = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self.wait_seconds_total = 0.0
+        self.wait_seconds_max = 0.0
+
+    def stats(self) -> ExecutionStats:
+        return ExecutionStats(
+            max_concurrency=self.max_concurrency,
+            running=self.running,
+            queued=self.queued,
+            max_queued=self.max_queued,
+            completed=self.completed,
+            failed=self.failed,
+            wait_seconds_total=self.wait_seconds_total,
+            wait_seconds_max=self.wait_seconds_max,
+        )
+
+
+type WorkerInitializer = Callable[[], Mapping[str, Callable[..., Any]]]
+
+# Functions built by the worker initializer of a worker process
+_worker_functions: dict[str, Callable[..., Any]] = {}
+
+
+def _init_worker(initializer: WorkerInitializer):
+    _worker_functions.update(initializer())
+
+
+def _call_worker(name: str, args: tuple[Any, ...], kwargs: dict[str, Any]) -> Any:
+    try:
+        fn = _worker_functions[name]
+    except KeyError:
+        raise RuntimeError(
+            f"Function {name!r} is not built by the worker initializer"
+        ) from None
+
+    return fn(*args, **kwargs)
+
+
+class ExecutionBackend:
+    """
+    Runs blocking executor calls off the event loop with per-handler concurrency limits.
+
+    Calls waiting for a free slot are counted as queued,
+    so queue depth and wait time reflect the configured limits.
+
+    Worker processes are spawned rather than forked: forking a process running threads
+    (eg. background writers and Valkey clients) leaves the children with broken copies of them.
+    Instead, every worker process calls the worker initializer, which builds its own functions
+    (and the clients, threads and in-memory caches they use, which are therefore per worker process).
+    """
+
+    def __init__(
+        self,
+        options: ExecutionOptions | None = None,
+        worker_initializer: WorkerInitializer | None = None,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            options: Backend options.
+            worker_initializer: Module-level (picklable) function returning the functions
+                by their registered names, called once in every worker process (required in process mode).
+        """
+
+        self.options = options or ExecutionOptions()
+
+        if self.options.mode == "process" and worker_initializer is None:
+            raise ValueError("Process mode requires a worker initializer")
+
+        self.worker_initializer = worker_initializer
+        self.logger = logger
+        self._functions: dict[str, Callable[..., Any]] = {}
+        self._limiters: dict[str, _Limiter] = {}
+        self._pool: concurrent.futures.Executor | None = None
+        self._pool_lock = threading.Lock()
+
+    def wrap[**P, T](
+        self,
+        name: str,
+        fn: Callable[P, T],
+        max_concurrency: int | None = None,
+    ) -> Callable[P, Coroutine[Any, Any, T]]:
+        """
+        Wrap a blocking function into a coroutine function running on this backend.
+
+        The wrapper keeps the signature of the original function
+        (so Restate can still derive a serde from the return type).
+        """
+
+        if name in self._functions:
+            raise ValueError(f"Function {name!r} is already registered")
+
+        if self._pool is not None:
+            raise RuntimeError("Cannot register functions after the pool has started")
+
+        self._functions[name] = fn
+        self._limiters[name] = _Limiter(max_concurrency)
+
+        @functools.wraps(fn)
+        async def wrapper(*args: P.args, **kwargs: P.kwargs) -> T:
+            return await self._run(name, args, kwargs)
+
+        return wrapper
+
+    def stats(self) -> dict[str, ExecutionStats]:
+        """Return a snapshot of the execution metrics of every registered function."""
+
+        return {name: limiter.stats() for name, limiter in self._limiters.items()}
+
+    def shutdown(self, wait: bool = True):
+        with self._pool_lock:
+            if self._pool is not None:
+                self._pool.shutdown(wait=wait)
+                self._pool = None
+
+    def _get_pool(self) -> concurrent.futures.Executor | None:
+        if self.options.mode == "inline":
+            return None
+
+        with self._pool_lock:
+            if self._pool is None:
+                if self.options.mode == "process":
+                    self._pool = concurrent.futures.ProcessPoolExecutor(
+                        max_workers=self.options.max_workers,
+                        mp_context=multiprocessing.get_context("spawn"),
+                        initializer=_init_worker,
+                        initargs=(self.worker_initializer,),
+                    )
+                else:
+                    self._pool = concurrent.futures.ThreadPoolExecutor(
+                        max_workers=self.options.max_workers,
+                        thread_name_prefix="restate-yt-dlp",
+                    )
+
+            return self._pool
+
+    async def _run(self, name: str, args: tuple[Any, ...], kwargs: dict[str, Any]):
+        limiter = self._limiters[name]
+
+        queued_at = time.monotonic()
+
+        if limiter.semaphore:
+            if limiter.semaphore.locked():
+                limiter.queued += 1
+                limiter.max_queued = max(limiter.max_queued, limiter.queued)
+
+                try:
+                    await limiter.semaphore.acquire()
+                finally:
+                    limiter.queued -= 1
+            else:
+                await limiter.semaphore.acquire()
+
+        wait = time.monotonic() - queued_at
+
+        limiter.running += 1
+        limiter.wait_seconds_total += wait
+        limiter.wait_seconds_max = max(limiter.wait_seconds_max, wait)
+
+        self.logger.debug(
+            "Execution slot acquired",
+            extra={"function": name, "wait_seconds": wait, "queued": limiter.queued},
+        )
+
+        try:
+            result = await self._submit(name, args, kwargs)
+        except BaseException:
+            limiter.failed += 1
+            raise
+        else:
+            limiter.completed += 1
+        finally:
+            limiter.running -= 1
+            if limiter.semaphore:
+                limiter.semaphore.release()
+
+        return result
+
+    async def _submit(self, name: str, args: tuple[Any, ...], kwargs: dict[str, Any]):
+        loop = asyncio.get_running_loop()
+        pool = self._get_pool()
+
+        if isinstance(pool, concurrent.futures.ProcessPoolExecutor):
+            call = functools.partial(_call_worker, name, args, kwargs)
+        else:
+            # Keep context variables (eg. Restate's replay state) visible to the call
+            ctx = contextvars.copy_context()
+            call = functools.partial(ctx.run, self._functions[name], *args, **kwargs)
+
+        return await loop.run_in_executor(pool, call)
@@ -1,7 +1,15 @@
 from __future__ import annotations
 
+import concurrent.futures
+import functools
+import hashlib
 import logging
+import re
 import tempfile
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import AbstractContextManager, contextmanager, nullcontext
 from functools import cached_property
 from pathlib import Path, PurePath, PurePosixPath
 from typing import (
@@ -13,11 +21,20 @@ from typing import (
     Required,
     TypedDict,
     cast,
+    runtime_checkable,
 )
 
 import pathspec
 import yt_dlp
-from pydantic import AnyUrl, BaseModel, ConfigDict, DirectoryPath, Field
+from pydantic import (
+    AnyUrl,
+    BaseModel,
+    ConfigDict,
+    DirectoryPath,
+    Field,
+    FilePath,
+    field_validator,
+)
 from restate.exceptions import TerminalError
 from yt_dlp.networking.exceptions import HTTPError, TransportError
 from yt_dlp.utils import (
@@ -27,12 +44,26 @@ from yt_dlp.utils import (
     UnsupportedError,
 )
 
+from . import serde
+from .archive import DownloadArchive, ScopedArchive
+from .cache import InfoCache, cache_key, media_expiry
+from .checkpoint import Checkpointer, CheckpointStore
+from .manifest import DownloadedFile, describe_file, list_files
 from .options import RequestOptions
+from .pool import YoutubeDLPool
 from .progress import Progress
+from .projection import compile_fields, project, validate_field
+from .scheduler import Scheduler, SiteBusyError
+from .scratch import ScratchDirectories
+from .singleflight import SingleFlight, download_key
+from .streaming import StreamingUploader
 
 if TYPE_CHECKING:
     from yt_dlp import _Params
 
+    # Imported on demand by users: it builds on private yt-dlp internals
+    from .network import ConnectionPool
+
 _logger = logging.getLogger(__name__)
 
 
@@ -56,6 +87,78 @@ class DownloadRequest(BaseModel):
     url: str = Field(description="URL to download")
     output: DownloadRequestOutput
     options: RequestOptions | None = Field(default=None, description="Download options")
+    info: dict[str, Any] | None = Field(
+        default=None,
+        description=(
+            "Previously extracted info dict (requested with fields ['*']) to download from without extracting the URL again "
+            "(the URL is extracted again when its media URLs have expired)"
+        ),
+    )
+    cache: Literal["use", "bypass"] = Field(
+        default="use",
+        description="Whether to download from a cached extraction result (if the result cache is enabled)",
+    )
+    skip_existing: bool = Field(
+        default=False,
+        description=(
+            "Skip the download when a previous successful download to the same output location left a marker there "
+            "and skip videos recorded in the download archive (if enabled)"
+        ),
+    )
+
+
+class DownloadPlaylistRequest(BaseModel):
+    """Request for downloading every entry of a playlist in parallel child downloads."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "examples": [
+                {
+                    "url": "https://www.youtube.com/playlist?list=PLBCF2DAC6FFB574DE",
+                    "output": {
+                        "location": "s3://bucket/playlistid/",
+                    },
+                    "concurrency": 4,
+                },
+            ]
+        }
+    )
+
+    url: str = Field(description="URL of the playlist to download")
+    output: DownloadRequestOutput = Field(
+        description="Output destination (every entry is downloaded to <location>/<entry id>/)"
+    )
+    options: RequestOptions | None = Field(
+        default=None, description="Options of the extraction and every download"
+    )
+    concurrency: int = Field(
+        default=4,
+        ge=1,
+        description="Maximum number of entries downloaded in parallel",
+    )
+    cache: Literal["use", "bypass"] = Field(
+        default="use",
+        description="Passed to every download",
+    )
+    skip_existing: bool = Field(
+        default=False,
+        description="Passed to every download",
+    )
+
+    def entry_request(self, entry: PlaylistEntry) -> DownloadRequest:
+        """Return the request downloading a single entry."""
+
+        return DownloadRequest(
+            url=entry["url"],
+            output=self.output.model_copy(
+                update={
+                    "location": _join_location(self.output.location, entry_dir(entry))
+                }
+            ),
+            options=self.options,
+            cache=self.cache,
+            skip_existing=self.skip_existing,
+        )
 
 
 class ExtractInfoRequest(BaseModel):
@@ -68,12 +171,91 @@ class ExtractInfoRequest(BaseModel):
                     "url": "https://www.youtube.com/watch?v=_fjbR0qKT8w",
                     "options": {},
                 },
+                {
+                    "url": "https://www.youtube.com/watch?v=_fjbR0qKT8w",
+                    "fields": ["id", "title", "formats.format_id", "formats.url"],
+                },
             ]
         }
     )
 
     url: str = Field(description="URL to extract information from")
     options: RequestOptions | None = Field(default=None)
+    fields: list[str] | None = Field(
+        default=None,
+        min_length=1,
+        description=(
+            "Fields of the info dict to return as dotted paths (eg. 'formats.format_id'), "
+            "'*' returns the full info dict (defaults to the fields of ExtractInfoResponse)"
+        ),
+        examples=[["id", "title", "duration"], ["*"]],
+    )
+    cache: Literal["use", "bypass", "refresh"] = Field(
+        default="use",
+        description=(
+            "How to use the result cache: "
+            "'use' returns cached results, "
+            "'bypass' neither reads nor writes the cache, "
+            "'refresh' extracts again and overwrites the cached result"
+        ),
+    )
+
+    @field_validator("fields")
+    @classmethod
+    def _validate_fields(cls, fields: list[str] | None) -> list[str] | None:
+        if fields is not None:
+            for field in fields:
+                validate_field(field)
+
+        return fields
+
+
+class ExtractInfoBatchRequest(BaseModel):
+    """Request for extracting information of many URLs with the same options."""
+
+    model_config = ConfigDict(
+        json_schema_extra={
+            "examples": [
+                {
+                    "urls": [
+                        "https://www.youtube.com/watch?v=_fjbR0qKT8w",
+                        "https://www.youtube.com/watch?v=jNQXAC9IVRw",
+                    ],
+                    "fields": ["id", "title", "duration"],
+                    "concurrency": 8,
+                },
+            ]
+        }
+    )
+
+    urls: list[str] = Field(
+        min_length=1,
+        description="URLs to extract information from",
+    )
+    options: RequestOptions | None = Field(default=None)
+    fields: list[str] | None = Field(
+        default=None,
+        min_length=1,
+        description="Fields of the info dicts to return (see ExtractInfoRequest)",
+    )
+    cache: Literal["use", "bypass", "refresh"] = Field(
+        default="use",
+        description="How to use the result cache (see ExtractInfoRequest)",
+    )
+    concurrency: int = Field(
+        default=8,
+        ge=1,
+        description="Maximum number of URLs extracted in parallel (capped by the server)",
+    )
+
+    @field_validator("fields")
+    @classmethod
+    def _validate_fields(cls, fields: list[str] | None) -> list[str] | None:
+        if fields is not None:
+            for field in fields:
+                validate_field(field)
+
+        return fields
 
 
 class ExtractInfoResponse(TypedDict, total=False):
@@ -104,6 +286,57 @@ class ExtractInfoResponse(TypedDict, total=False):
     url: str | None
 
 
+DEFAULT_EXTRACT_INFO_FIELDS = tuple(ExtractInfoResponse.__annotations__)
+
+
+class ExtractInfoBatchResult(TypedDict, total=False):
+    url: Required[str]
+    info: ExtractInfoResponse
+    # Message of the error extracting the URL
+    error: str
+    # Whether extracting the URL again may succeed
+    retryable: bool
+
+
+class ExtractInfoBatchResponse(TypedDict):
+    # In the order of the requested URLs
+    results: list[ExtractInfoBatchResult]
+
+
+class PlaylistEntry(TypedDict):
+    id: str | None
+    url: str
+    title: str | None
+
+
+class ExtractPlaylistResponse(TypedDict):
+    id: str | None
+    title: str | None
+    entries: list[PlaylistEntry]
+
+
+class DownloadResponse(TypedDict, total=False):
+    id: str | None
+    title: str | None
+    duration: int | float | None
+    files: Required[list[DownloadedFile]]
+    # Whether the download was skipped because its output already existed
+    # (files are only listed when skipped by the download marker, not by the download archive)
+    skipped: bool
+
+
+class PlaylistEntryResult(PlaylistEntry, total=False):
+    download: DownloadResponse
+    # Message of the terminal error of the download
+    error: str
+
+
+class DownloadPlaylistResponse(TypedDict):
+    id: str | None
+    title: str | None
+    entries: list[PlaylistEntryResult]
+
+
 class DownloadRequestOutput(BaseModel):
     location: AnyUrl | PurePosixPath = Field(
         description="Output destination for downloaded content",
@@ -113,6 +346,15 @@ class DownloadRequestOutput(BaseModel):
     filter: IncludeExcludeFilter | None = Field(
         default=None, description="Filter for which files to upload using glob patterns"
     )
+    manifest: PurePosixPath | None = Field(
+        default=None,
+        description="Also write the returned manifest of the uploaded files to this path relative to the location",
+        examples=["manifest.json"],
+    )
+    checksums: bool = Field(
+        default=False,
+        description="Include the SHA-256 checksum of every file in the manifest (reads every file once more)",
+    )
 
 
 class IncludeExcludeFilter(BaseModel):
@@ -180,40 +422,174 @@ class DirectoryPersister(Protocol):
     ): ...
 
 
+@runtime_checkable
+class FilePersister(Protocol):
+    def persist_file(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        src: FilePath,
+        path: PurePosixPath,
+    ):
+        """Persist a single file at path relative to ref."""
+        ...
+
+
+@runtime_checkable
+class MarkerPersister(Protocol):
+    def read_bytes(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        path: PurePosixPath,
+    ) -> bytes | None:
+        """Return the contents of the file at path relative to ref (if it exists)."""
+        ...
+
+    def persist_bytes(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        data: bytes,
+        path: PurePosixPath,
+    ):
+        """Persist data as a file at path relative to ref."""
+        ...
+
+
+# Manifest written to the output location once a download completed (when skipping existing outputs)
+DOWNLOAD_MARKER = PurePosixPath(".restate-yt-dlp.json")
+
+
 type ProgressHook = Callable[[str, str, Progress], None]
 
 
+@runtime_checkable
+class InvocationProgressHook(Protocol):
+    """Progress hook keeping state per invocation."""
+
+    def __call__(self, invocation_id: str, url: str, progress: Progress) -> None: ...
+
+    def close_invocation(self, invocation_id: str):
+        """Release the state of an invocation once its download ended."""
+        ...
+
+
 class Executor:
     def __init__(
         self,
         persister: DirectoryPersister,
         defaults: _Params | None = None,
         progress_hook: ProgressHook | None = None,
+        info_cache: InfoCache | None = None,
+        info_cache_margin: float = 300.0,
+        stream_uploads: bool = False,
+        max_uploads: int = 4,
+        scratch: ScratchDirectories | None = None,
+        checkpoints: CheckpointStore | None = None,
+        checkpoint_interval: float = 60.0,
+        singleflight: SingleFlight | None = None,
+        archive: DownloadArchive | None = None,
+        ydl_pool: YoutubeDLPool | None = None,
+        connections: ConnectionPool | None = None,
+        scheduler: Scheduler | None = None,
+        max_batch_concurrency: int = 16,
         logger: logging.Logger = _logger,
     ):
+        """
+        Args:
+            info_cache: Cache of extraction results (disabled if not set).
+            info_cache_margin: Extracted info (cached or passed to download) is not reused when its media URLs expire within this many seconds.
+            stream_uploads: Upload files while the download is still running (requires a FilePersister).
+            max_uploads: Maximum number of files uploaded concurrently when streaming uploads.
+            scratch: Download into directories that survive retries (temporary directories are used if not set).
+            checkpoints: Checkpoint partial downloads so that retries on other nodes can resume them.
+            checkpoint_interval: Minimum number of seconds between checkpoints of a download.
+            singleflight: Deduplicate concurrent downloads of the same URL with the same options to the same location.
+            archive: Download archive shared by workers, used by requests skipping existing outputs.
+            ydl_pool: Reuse configured YoutubeDL instances across requests with the same options.
+            connections: Send HTTP requests of every execution through shared connections.
+            scheduler: Start requests within the rate and concurrency limits of their sites.
+            max_batch_concurrency: Maximum number of URLs of a batch extracted in parallel (caps the concurrency of requests).
+        """
+
+        if stream_uploads and not isinstance(persister, FilePersister):
+            raise TypeError(
+                "Streaming uploads require a persister implementing FilePersister"
+            )
+
         self.persister = persister
         self.defaults: _Params = defaults.copy() if defaults else {}
         self.progress_hook = progress_hook
+        self.info_cache = info_cache
+        self.info_cache_margin = info_cache_margin
+        self.stream_uploads = stream_uploads
+        self.max_uploads = max_uploads
+        self.scratch = scratch
+        self.checkpoints = checkpoints
+        self.checkpoint_interval = checkpoint_interval
+        self.singleflight = singleflight
+        self.archive = archive
+        self.ydl_pool = ydl_pool
+        self.connections = connections
+        self.scheduler = scheduler
+        self.max_batch_concurrency = max_batch_concurrency
         self.logger = logger
 
     def download(
         self,
         id: str,
         request: DownloadRequest,
-    ):
+    ) -> DownloadResponse:
         logger = logging.LoggerAdapter(
             self.logger,
             {"id": id, "url": request.url},
             merge_extra=True,
         )
 
+        try:
+            if self.singleflight is None:
+                return self._download(id, request, logger)
+
+            key = download_key(
+                request.url,
+                {
+                    **self.defaults,
+                    **(
+                        request.options.model_dump(exclude_none=True)
+                        if request.options
+                        else {}
+                    ),
+                },
+                request.output.model_dump_json(),
+            )
+
+            # Identical downloads in flight (eg. retried upstream) wait for the first one
+            return self.singleflight.run(
+                key, functools.partial(self._download, id, request, logger)
+            )
+        finally:
+            if isinstance(self.progress_hook, InvocationProgressHook):
+                # yt-dlp does not report every failure as an error status
+                self.progress_hook.close_invocation(id)
+
+    def _download(
+        self,
+        id: str,
+        request: DownloadRequest,
+        logger: logging.LoggerAdapter,
+    ) -> DownloadResponse:
         def progress_hook(progress: Progress):
             if self.progress_hook:
                 self.progress_hook(id, request.url, progress)
 
+        if request.skip_existing:
+            existing = self._read_marker(request, logger)
+
+            if existing is not None:
+                logger.info("Output already exists, skipping download")
+                return existing
+
         logger.info("Downloading video")
 
-        with tempfile.TemporaryDirectory() as tmpdir:
+        with self._download_dir(id) as tmpdir:
             params = cast(
                 "_Params",
                 {
@@ -228,16 +604,267 @@ class Executor:
                 },
             )
 
-            yt_dlp.YoutubeDL(params).download(request.url)
+            info = request.info
+
+            if info is not None and not self._is_reusable_info(info):
+                logger.info("Extracted video info is not reusable")
+                info = None
+
+            if info is None and self.info_cache is not None and request.cache == "use":
+                info = self._get_cached_info(cache_key(request.url, params), logger)
+
+            archive: ScopedArchive | None = None
+
+            if request.skip_existing and self.archive is not None:
+                archive = ScopedArchive(
+                    self.archive, str(request.output.location), logger=logger
+                )
+                params["download_archive"] = archive
+
+            checkpointer: Checkpointer | None = None
+
+            if self.checkpoints is not None:
+                if params.get("concurrent_fragment_downloads", 1) > 1:
+                    # Progress hooks are no longer called between fragments
+                    logger.warning(
+                        "Checkpointing is not supported with concurrent fragment downloads"
+                    )
+                else:
+                    checkpointer = Checkpointer(
+                        self.checkpoints,
+                        id,
+                        Path(tmpdir),
+                        interval=self.checkpoint_interval,
+                        logger=logger,
+                    )
+
+                    # Resume from where a previous attempt (possibly on another node) left off
+                    checkpointer.restore()
+
+                    params["progress_hooks"] = [
+                        *params["progress_hooks"],
+                        checkpointer.progress_hook,
+                    ]
+
+            uploader: StreamingUploader | None = None
+
+            if self.stream_uploads:
+                uploader = StreamingUploader(
+                    cast(FilePersister, self.persister),
+                    request.output.location,
+                    Path(tmpdir),
+                    request.output.filter,
+                    checksums=request.output.checksums,
+                    max_workers=self.max_uploads,
+                    logger=logger,
+                )
+
+                # Upload every video as soon as yt-dlp is done with it
+                params["post_hooks"] = [*params.get("post_hooks", []), uploader.submit]
+
+            try:
+                with self._scheduled(request.url), self._youtube_dl(params) as ydl:
+                    # Same as ydl.download, which only returns the return code
+                    force_generic_extractor = ydl.params.get(
+                        "force_generic_extractor", False
+                    )
+
+                    if info is not None:
+                        try:
+                            info = ydl.process_ie_result(info, download=True)
+                        except DownloadError as err:
+                            # Eg. media URLs rejected despite their expiry
+                            logger.warning(
+                                "Downloading from extracted video info failed, extracting again",
+                                exc_info=err,
+                            )
+
+                            info = ydl.extract_info(
+                                request.url,
+                                download=True,
+                                force_generic_extractor=force_generic_extractor,
+                            )
+                    else:
+                        info = ydl.extract_info(
+                            request.url,
+                            download=True,
+                            force_generic_extractor=force_generic_extractor,
+                        )
+            except BaseException:
+                if uploader is not None:
+                    uploader.abort()
+
+                if checkpointer is not None:
+                    checkpointer.close()
+
+                raise
 
             logger.info("Downloading video completed")
 
-            self.persister.persist(
-                request.output.location,
-                Path(tmpdir),
-                request.output.filter,
+            if checkpointer is not None:
+                checkpointer.close()
+
+            if archive is not None and archive.skipped:
+                # yt-dlp returns no info (or the unprocessed info) and downloads nothing:
+                # the marker and manifest of the download that recorded the video are kept
+                logger.info(
+                    "Video is recorded in the download archive, skipped download"
+                )
+
+                if uploader is not None:
+                    uploader.finish()
+
+                if checkpointer is not None:
+                    checkpointer.discard()
+
+                info = info or {}
+
+                return DownloadResponse(
+                    id=info.get("id"),
+                    title=info.get("title"),
+                    duration=info.get("duration"),
+                    files=[],
+                    skipped=True,
+                )
+
+            files: list[DownloadedFile]
+
+            if uploader is not None:
+                uploader.finish()
+                files = uploader.files
+            else:
+                # Describe files before persisting (persisters may move them)
+                files = [
+                    describe_file(file, path, request.output.checksums)
+                    for file, path in list_files(Path(tmpdir), request.output.filter)
+                ]
+
+                self.persister.persist(
+                    request.output.location,
+                    Path(tmpdir),
+                    request.output.filter,
+                )
+
+            if checkpointer is not None:
+                checkpointer.discard()
+
+            info = info or {}
+            response = DownloadResponse(
+                id=info.get("id"),
+                title=info.get("title"),
+                duration=info.get("duration"),
+                files=sorted(files, key=lambda file: file["path"]),
             )
 
+            if request.output.manifest is not None:
+                self._persist_bytes(
+                    request.output.location,
+                    serde.dumps(response),
+                    request.output.manifest,
+                )
+
+            # Also without skip_existing: later requests skipping existing outputs find them
+            self._complete(request, response, archive, logger)
+
+            return response
+
+    def _persist_bytes(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        data: bytes,
+        path: PurePosixPath,
+    ):
+        if isinstance(self.persister, MarkerPersister):
+            self.persister.persist_bytes(ref, data, path)
+            return
+
+        with tempfile.TemporaryDirectory() as tmpdir:
+            file = Path(tmpdir, path)
+            file.parent.mkdir(parents=True, exist_ok=True)
+            file.write_bytes(data)
+
+            self.persister.persist(ref, Path(tmpdir))
+
+    def _read_marker(
+        self,
+        request: DownloadRequest,
+        logger: logging.LoggerAdapter,
+    ) -> DownloadResponse | None:
+        if not isinstance(self.persister, MarkerPersister):
+            # Only videos recorded in the download archive (if any) are skipped
+            logger.warning(
+                "Persister does not support download markers, existing outputs are not detected",
+                extra={"archive": self.archive is not None},
+            )
+            return None
+
+        try:
+            marker = self.persister.read_bytes(request.output.location, DOWNLOAD_MARKER)
+        except Exception:
+            logger.exception("Failed to read download marker")
+            return None
+
+        if marker is None:
+            return None
+
+        return cast(DownloadResponse, {**serde.loads(marker), "skipped": True})
+
+    def _complete(
+        self,
+        request: DownloadRequest,
+        response: DownloadResponse,
+        archive: ScopedArchive | None,
+        logger: logging.LoggerAdapter,
+    ):
+        """Record a completed download (failures only cost a download next time)."""
+
+        if archive is not None:
+            try:
+                archive.commit()
+            except Exception:
+                logger.exception("Failed to record videos in the download archive")
+
+        if isinstance(self.persister, MarkerPersister):
+            try:
+                self.persister.persist_bytes(
+                    request.output.location, serde.dumps(response), DOWNLOAD_MARKER
+                )
+            except Exception:
+                logger.exception("Failed to write download marker")
+
+    def _scheduled(self, url: str) -> AbstractContextManager[None]:
+        if self.scheduler is None:
+            return nullcontext()
+
+        return self.scheduler.slot(url)
+
+    @contextmanager
+    def _youtube_dl(self, params: _Params) -> Iterator[yt_dlp.YoutubeDL]:
+        if self.ydl_pool is None:
+            ydl = yt_dlp.YoutubeDL(params)
+
+            if self.connections is not None:
+                self.connections.install(ydl)
+
+            yield ydl
+        else:
+            with self.ydl_pool.acquire(params) as ydl:
+                # Pooled instances keep the installed handlers
+                if self.connections is not None:
+                    self.connections.install(ydl)
+
+                yield ydl
+
+    @contextmanager
+    def _download_dir(self, id: str) -> Iterator[str]:
+        if self.scratch is None:
+            with tempfile.TemporaryDirectory() as tmpdir:
+                yield tmpdir
+        else:
+            # Keep partial downloads of failed attempts for the retry (see continuedl)
+            with self.scratch.open(id) as path:
+                yield str(path)
+
     def extract_info(
         self,
         id: str,
@@ -263,31 +890,309 @@ class Executor:
             },
         )
 
+        info = self._extract_info(request.url, params, request.cache, logger)
+
+        # Prune before the result is journaled and sent back to the caller
+        return project(
+            info,
+            compile_fields(request.fields or DEFAULT_EXTRACT_INFO_FIELDS),
+        )
+
+    def extract_info_batch(
+        self,
+        id: str,
+        request: ExtractInfoBatchRequest,
+    ) -> ExtractInfoBatchResponse:
+        logger = logging.LoggerAdapter(
+            self.logger,
+            {"id": id},
+            merge_extra=True,
+        )
+
+        logger.info("Extracting video info in batch", extra={"urls": len(request.urls)})
+
+        params = cast(
+            "_Params",
+            {
+                **self.defaults.copy(),
+                **(
+                    request.options.model_dump(exclude_none=True)
+                    if request.options
+                    else {}
+                ),
+            },
+        )
+        fields = compile_fields(request.fields or DEFAULT_EXTRACT_INFO_FIELDS)
+
+        # YoutubeDL is not thread-safe: without a pool,
+        # every worker configures its own once for the whole batch
+        local = threading.local()
+        instances: list[yt_dlp.YoutubeDL] = []
+
+        def extract(url: str) -> ExtractInfoBatchResult:
+            if self.ydl_pool is None and not hasattr(local, "ydl"):
+                local.ydl = yt_dlp.YoutubeDL(cast("_Params", dict(params)))
+                instances.append(local.ydl)
+
+                if self.connections is not None:
+                    self.connections.install(local.ydl)
+
+            url_logger = logging.LoggerAdapter(logger, {"url": url}, merge_extra=True)
+
+            try:
+                info = self._extract_info(
+                    url,
+                    params,
+                    request.cache,
+                    url_logger,
+                    ydl=getattr(local, "ydl", None),
+                )
+            except TerminalError as err:
+                return ExtractInfoBatchResult(
+                    url=url, error=err.message, retryable=False
+                )
+            except (DownloadError, ExtractorError, SiteBusyError) as err:
+                # Errors classified as retryable by is_retryable_error (or waiting for the site)
+                return ExtractInfoBatchResult(url=url, error=str(err), retryable=True)
+
+            return ExtractInfoBatchResult(url=url, info=project(info, fields))
+
         try:
-            info = yt_dlp.YoutubeDL(params).extract_info(request.url, download=False)
-        except (DownloadError, ExtractorError) as err:
-            if is_retryable_error(err):
-                # Re-raise retryable errors - Restate will retry them
-                raise
-            else:
-                # Wrap non-retryable errors in TerminalError
-                # Extract the actual error message
-                actual_exception = getattr(err, "exc_info", [None, None])[1]
-                error_msg = str(actual_exception) if actual_exception else str(err)
-
-                raise TerminalError(error_msg, status_code=422) from err
-
-        except Exception as err:
-            # Catch any other unexpected errors
-            # Be conservative - treat unknown errors as non-retryable
-            raise TerminalError(
-                f"Unexpected error during download: {type(err).__name__}: {err}",
-            )
+            with concurrent.futures.ThreadPoolExecutor(
+                # Every worker runs its own YoutubeDL: callers do not choose the thread count
+                max_workers=min(
+                    request.concurrency, self.max_batch_concurrency, len(request.urls)
+                ),
+                thread_name_prefix="restate-yt-dlp-extract",
+            ) as pool:
+                results = list(pool.map(extract, request.urls))
+        finally:
+            # Release the sockets and cookie jars of the workers' instances
+            for ydl in instances:
+                ydl.close()
+
+        logger.info(
+            "Extracting video info in batch completed",
+            extra={
+                "urls": len(results),
+                "failed": sum("error" in result for result in results),
+            },
+        )
+
+        return ExtractInfoBatchResponse(results=results)
+
+    def _extract_info(
+        self,
+        url: str,
+        params: _Params,
+        cache: Literal["use", "bypass", "refresh"],
+        logger: logging.LoggerAdapter,
+        ydl: yt_dlp.YoutubeDL | None = None,
+    ) -> dict[str, Any]:
+        key: str | None = None
+        info: dict[str, Any] | None = None
+
+        if self.info_cache is not None and cache != "bypass":
+            key = cache_key(url, params)
+
+            if cache == "use":
+                info = self._get_cached_info(key, logger)
 
-        logger.info("Extracting video info completed")
+        if info is None:
+            info = self._extract(url, params, ydl)
+
+            logger.info("Extracting video info completed")
+
+            if key is not None:
+                self._cache_info(key, info, logger)
+
+        return info
+
+    def extract_playlist(
+        self,
+        id: str,
+        request: DownloadPlaylistRequest,
+    ) -> ExtractPlaylistResponse:
+        logger = logging.LoggerAdapter(
+            self.logger,
+            {"id": id, "url": request.url},
+            merge_extra=True,
+        )
+
+        logger.info("Extracting playlist entries")
+
+        params = cast(
+            "_Params",
+            {
+                **self.defaults.copy(),
+                **(
+                    request.options.model_dump(exclude_none=True)
+                    if request.options
+                    else {}
+                ),
+                # Only list the entries: they are extracted by their own downloads
+                "extract_flat": "in_playlist",
+            },
+        )
+
+        info = self._extract(request.url, params)
+
+        if info.get("_type") in ("playlist", "multi_video"):
+            entries = [
+                PlaylistEntry(
+                    id=entry.get("id"),
+                    url=entry.get("webpage_url") or entry["url"],
+                    title=entry.get("title"),
+                )
+                for entry in info.get("entries") or []
+                if entry and (entry.get("webpage_url") or entry.get("url"))
+            ]
+        else:
+            # Not a playlist: download it as a single entry
+            entries = [
+                PlaylistEntry(
+                    id=info.get("id"),
+                    url=request.url,
+                    title=info.get("title"),
+                )
+            ]
+
+        logger.info(
+            "Extracting playlist entries completed",
+            extra={"entries": len(entries)},
+        )
+
+        return ExtractPlaylistResponse(
+            id=info.get("id"),
+            title=info.get("title"),
+            entries=entries,
+        )
+
+    def _extract(
+        self,
+        url: str,
+        params: _Params,
+        ydl: yt_dlp.YoutubeDL | None = None,
+    ) -> dict[str, Any]:
+        # Outside of the error handling: running out of time waiting for the site is retryable
+        with self._scheduled(url):
+            try:
+                if ydl is not None:
+                    return ydl.extract_info(url, download=False)
+
+                with self._youtube_dl(params) as instance:
+                    return instance.extract_info(url, download=False)
+            except (DownloadError, ExtractorError) as err:
+                if is_retryable_error(err):
+                    # Re-raise retryable errors - Restate will retry them
+                    raise
+                else:
+                    # Wrap non-retryable errors in TerminalError
+                    # Extract the actual error message
+                    actual_exception = getattr(err, "exc_info", [None, None])[1]
+                    error_msg = str(actual_exception) if actual_exception else str(err)
+
+                    raise TerminalError(error_msg, status_code=422) from err
+
+            except Exception as err:
+                # Catch any other unexpected errors
+                # Be conservative - treat unknown errors as non-retryable
+                raise TerminalError(
+                    f"Unexpected error during download: {type(err).__name__}: {err}",
+                ) from err
+
+    def _get_cached_info(
+        self,
+        key: str,
+        logger: logging.LoggerAdapter,
+    ) -> dict[str, Any] | None:
+        assert self.info_cache is not None
+
+        try:
+            cached = self.info_cache.get(key)
+        except Exception:
+            logger.exception("Failed to read cached video info")
+            return None
+
+        if cached is None:
+            return None
+
+        try:
+            info = serde.loads(cached)
+        except ValueError:
+            info = None
+
+        if not isinstance(info, dict):
+            # Eg. written by an incompatible version: a miss, replaced by the next extraction
+            logger.warning("Discarding undecodable cached video info")
+
+            try:
+                self.info_cache.delete(key)
+            except Exception:
+                logger.exception("Failed to delete cached video info")
+
+            return None
+
+        if not self._is_reusable_info(info):
+            logger.info("Cached video info has expired media URLs")
+            return None
+
+        logger.info("Using cached video info")
 
         return info
 
+    def _is_reusable_info(self, info: dict[str, Any]) -> bool:
+        """Check whether an info dict can be processed again (has media URLs which do not expire soon)."""
+
+        if "formats" not in info and "url" not in info:
+            return False
+
+        expiry = media_expiry(info)
+
+        return expiry is None or expiry - self.info_cache_margin > time.time()
+
+    def _cache_info(
+        self,
+        key: str,
+        info: dict[str, Any],
+        logger: logging.LoggerAdapter,
+    ):
+        assert self.info_cache is not None
+
+        ttl: float | None = None
+
+        # Do not keep results around longer than their media URLs are valid
+        expiry = media_expiry(info)
+        if expiry is not None:
+            ttl = expiry - self.info_cache_margin - time.time()
+
+            if ttl <= 0:
+                return
+
+        try:
+            self.info_cache.set(key, serde.dumps(info), ttl)
+        except Exception:
+            logger.exception("Failed to cache video info")
+
+
+def entry_dir(entry: PlaylistEntry) -> str:
+    """Return the directory name of a playlist entry (relative to the playlist output)."""
+
+    # Leading dots would escape the playlist output (eg. "..")
+    name = re.sub(r"[^\w.-]", "_", entry["id"] or "").lstrip(".")
+
+    return name or hashlib.sha256(entry["url"].encode()).hexdigest()[:16]
+
+
+def _join_location(
+    location: AnyUrl | PurePosixPath,
+    path: str,
+) -> AnyUrl | PurePosixPath:
+    if isinstance(location, AnyUrl):
+        return AnyUrl(f"{str(location).rstrip('/')}/{path}/")
+
+    return location / path
+
 
 def is_retryable_error(err):
     """
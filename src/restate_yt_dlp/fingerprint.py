@@ -0,0 +1,78 @@
+"""Stable identifiers for URLs and yt-dlp parameters."""
+
+import hashlib
+import json
+from collections.abc import Mapping
+from typing import Any
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+# Parameters that do not influence extraction results,
+# including those set by the executor to objects which cannot be serialized
+VOLATILE_PARAMS = frozenset(
+    [
+        "logger",
+        "progress_hooks",
+        "postprocessor_hooks",
+        "post_hooks",
+        "paths",
+        "download_archive",
+    ]
+)
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def normalize_url(url: str) -> str:
+    """
+    Normalize a URL so that equivalent spellings map to the same string.
+
+    Lowercases the scheme and host, drops default ports, fragments and utm_* tracking
+    parameters, and sorts the query string.
+    """
+
+    parts = urlsplit(url.strip())
+
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    query = sorted(
+        (key, value)
+        for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if not key.startswith("utm_")
+    )
+
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+def params_fingerprint(params: Mapping[str, Any]) -> str:
+    """
+    Return a hash of the yt-dlp parameters that influence results.
+
+    Raises:
+        ValueError: A parameter that influences results cannot be serialized to JSON
+            (its representation, eg. the address of a function, would differ between processes).
+    """
+
+    relevant = {k: v for k, v in params.items() if k not in VOLATILE_PARAMS}
+
+    try:
+        encoded = json.dumps(relevant, sort_keys=True)
+    except TypeError:
+        names = sorted(name for name, value in relevant.items() if not _is_json(value))
+        raise ValueError(
+            f"Parameters cannot be fingerprinted: {', '.join(names)}"
+        ) from None
+
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+def _is_json(value: Any) -> bool:
+    try:
+        json.dumps(value)
+    except TypeError:
+        return False
+
+    return True
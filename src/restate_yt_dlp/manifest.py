@@ -0,0 +1,63 @@
+"""Manifests of persisted files, so consumers do not have to list output locations."""
+
+from __future__ import annotations
+
+import hashlib
+import mimetypes
+from collections.abc import Iterator
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, NotRequired, TypedDict
+
+if TYPE_CHECKING:
+    from .executor import PathFilter
+
+
+class DownloadedFile(TypedDict):
+    path: str
+    size: int
+    content_type: str | None
+    # Only with checksums requested
+    sha256: NotRequired[str]
+
+
+def describe_file(
+    src: Path,
+    path: PurePosixPath,
+    checksum: bool = False,
+) -> DownloadedFile:
+    """
+    Return the manifest entry of a file persisted at path (relative to the output location).
+
+    Args:
+        checksum: Include the SHA-256 digest of the file (reading it entirely).
+    """
+
+    file = DownloadedFile(
+        path=str(path),
+        size=src.stat().st_size,
+        content_type=mimetypes.guess_type(path.name)[0],
+    )
+
+    if checksum:
+        with src.open("rb") as f:
+            file["sha256"] = hashlib.file_digest(f, "sha256").hexdigest()
+
+    return file
+
+
+def list_files(
+    root: Path,
+    filter: PathFilter | None = None,
+) -> Iterator[tuple[Path, PurePosixPath]]:
+    """Yield the files of a directory to persist and their paths relative to it."""
+
+    for file in sorted(root.rglob("*")):
+        if not file.is_file():
+            continue
+
+        path = PurePosixPath(file.relative_to(root).as_posix())
+
+        if filter is not None and not filter.match(path):
+            continue
+
+        yield file, path
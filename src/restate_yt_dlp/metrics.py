@@ -0,0 +1,99 @@
+"""Periodic reporting of the metrics of components."""
+
+from __future__ import annotations
+
+import dataclasses
+import logging
+import threading
+from collections.abc import Mapping
+from typing import Any, Protocol
+
+_logger = logging.getLogger(__name__)
+
+
+class StatsSource(Protocol):
+    """Component exposing a snapshot of its metrics."""
+
+    def stats(self) -> Any: ...
+
+
+def snapshot(sources: Mapping[str, StatsSource]) -> dict[str, Any]:
+    """Return the metrics of every source as plain values (dataclasses are converted to dicts)."""
+
+    return {name: _plain(source.stats()) for name, source in sources.items()}
+
+
+def _plain(value: Any) -> Any:
+    if dataclasses.is_dataclass(value) and not isinstance(value, type):
+        return dataclasses.asdict(value)
+
+    if isinstance(value, Mapping):
+        return {key: _plain(item) for key, item in value.items()}
+
+    return value
+
+
+class StatsReporter:
+    """
+    Logs the metrics of components from a background thread.
+
+    Metrics are cumulative counters and gauges as returned by the stats() of each component,
+    logged under the "metrics" field at every interval and once more on close.
+    """
+
+    def __init__(
+        self,
+        sources: Mapping[str, StatsSource],
+        interval: float = 60.0,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            sources: Components by the name their metrics are reported under.
+            interval: Seconds between reports.
+        """
+
+        self.sources = dict(sources)
+        self.interval = interval
+        self.logger = logger
+
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def start(self):
+        """Start reporting in the background."""
+
+        if self._thread is not None or not self.sources:
+            return
+
+        self._thread = threading.Thread(
+            target=self._run,
+            name="restate-yt-dlp-metrics",
+            daemon=True,
+        )
+        self._thread.start()
+
+    def report(self):
+        """Log the current metrics of every component."""
+
+        try:
+            metrics = snapshot(self.sources)
+        except Exception:
+            self.logger.exception("Failed to collect metrics")
+            return
+
+        self.logger.info("Metrics", extra={"metrics": metrics})
+
+    def close(self):
+        """Stop reporting after a last report."""
+
+        self._stopped.set()
+
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+            self.report()
+
+    def _run(self):
+        while not self._stopped.wait(self.interval):
+            self.report()
@@ -0,0 +1,470 @@
+"""
+Connections and name resolution shared by YoutubeDL instances.
+
+Builds on private yt-dlp internals (the requests handler and request director),
+import it only when sharing connections is enabled and fall back to the default handlers
+if the import fails (ImportError) on an unsupported yt-dlp version.
+"""
+
+from __future__ import annotations
+
+import functools
+import logging
+import queue
+import socket
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any
+
+import requests
+import urllib3
+import urllib3.connection
+import urllib3.util.connection
+import yt_dlp
+from yt_dlp.networking._requests import (
+    RequestsHTTPAdapter,
+    RequestsRH,
+    RequestsSession,
+)
+from yt_dlp.networking.common import _REQUEST_HANDLERS, _RH_PREFERENCES
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class ConnectionPoolStats:
+    """Point-in-time metrics of a shared connection pool."""
+
+    hosts: int
+    requests: int
+    evictions: int
+
+
+class ConnectionPool:
+    """
+    HTTP connection pool shared by every YoutubeDL instance of the process.
+
+    Each YoutubeDL configures its own request handlers, so consecutive executions
+    open new TCP and TLS connections to the same hosts.
+    Installed instances send requests through connections kept per host instead
+    (cookies, headers and proxies remain per instance).
+
+    Connections to hosts not contacted within the idle timeout are closed.
+
+    If the yt-dlp internals it builds on changed, instances keep their own handlers (and a warning is logged).
+    """
+
+    def __init__(
+        self,
+        max_hosts: int = 64,
+        max_connections_per_host: int = 10,
+        idle_timeout: float = 90.0,
+        dns_cache: DNSCache | None = None,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            max_hosts: Maximum number of hosts connections are kept for (least recently used ones are closed).
+            max_connections_per_host: Maximum number of idle connections kept per host.
+            idle_timeout: Seconds after which connections to unused hosts are closed.
+            dns_cache: Resolve the hosts of new connections through this cache.
+        """
+
+        self.max_hosts = max_hosts
+        self.max_connections_per_host = max_connections_per_host
+        self.idle_timeout = idle_timeout
+        self.dns_cache = dns_cache
+        self.logger = logger
+
+        # Adapters by TLS settings (connections are only shared between instances with the same ones)
+        self._adapters: dict[tuple, _SharedHTTPAdapter] = {}
+        # Connection pools by their id (in order of use)
+        self._hosts: OrderedDict[int, tuple[urllib3.HTTPConnectionPool, float]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._requests = 0
+        self._evictions = 0
+        self._unsupported = False
+
+    def install(self, ydl: yt_dlp.YoutubeDL):
+        """Send the requests of a YoutubeDL instance through the shared connections."""
+
+        if self._unsupported:
+            return
+
+        try:
+            self._install(ydl)
+        except AttributeError:
+            self._unsupported = True
+            self.logger.warning(
+                "Sharing connections is not supported by this yt-dlp version",
+                exc_info=True,
+            )
+
+    def _install(self, ydl: yt_dlp.YoutubeDL):
+        director = ydl.__dict__.get("_request_director")
+
+        if director is not None:
+            if any(
+                isinstance(handler, _SharedRequestsRH) and handler.connections is self
+                for handler in director.handlers.values()
+            ):
+                return
+
+            director.close()
+
+        handlers = [
+            functools.partial(_SharedRequestsRH, connections=self)
+            if handler is RequestsRH
+            else handler
+            for handler in _REQUEST_HANDLERS.values()
+        ]
+
+        ydl.__dict__["_request_director"] = ydl.build_request_director(
+            handlers, _RH_PREFERENCES
+        )
+
+    def stats(self) -> ConnectionPoolStats:
+        """Return a snapshot of the pool metrics."""
+
+        with self._lock:
+            return ConnectionPoolStats(
+                hosts=len(self._hosts),
+                requests=self._requests,
+                evictions=self._evictions,
+            )
+
+    def close(self):
+        """Close every connection."""
+
+        with self._lock:
+            adapters = list(self._adapters.values())
+            self._adapters.clear()
+            self._hosts.clear()
+
+        for adapter in adapters:
+            adapter.close()
+
+    def _adapter(self, key: tuple, create: Any) -> _SharedHTTPAdapter:
+        with self._lock:
+            adapter = self._adapters.get(key)
+
+            if adapter is None:
+                adapter = self._adapters[key] = create()
+
+            return adapter
+
+    def _used(self, pool: urllib3.HTTPConnectionPool):
+        now = time.monotonic()
+        idle: list[urllib3.HTTPConnectionPool] = []
+
+        with self._lock:
+            self._requests += 1
+
+            for key, (candidate, used_at) in list(self._hosts.items()):
+                if now - used_at < self.idle_timeout:
+                    # Ordered by use: the rest are more recent
+                    break
+
+                del self._hosts[key]
+                idle.append(candidate)
+                self._evictions += 1
+
+            self._hosts.pop(id(pool), None)
+            self._hosts[id(pool)] = (pool, now)
+
+        for candidate in idle:
+            _close_idle_connections(candidate)
+
+            self.logger.debug("Closed idle connections", extra={"host": candidate.host})
+
+
+class _SharedHTTPAdapter(RequestsHTTPAdapter):
+    def __init__(self, connections: ConnectionPool, **kwargs):
+        self._connections = connections
+
+        super().__init__(
+            pool_connections=connections.max_hosts,
+            pool_maxsize=connections.max_connections_per_host,
+            **kwargs,
+        )
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+
+        dns_cache = self._connections.dns_cache
+
+        if dns_cache is not None:
+            # Only connections of the shared adapters resolve names through the cache
+            self.poolmanager.pool_classes_by_scheme = {
+                "http": functools.partial(
+                    _CachedHTTPConnectionPool, dns_cache=dns_cache
+                ),
+                "https": functools.partial(
+                    _CachedHTTPSConnectionPool, dns_cache=dns_cache
+                ),
+            }
+
+    def get_connection_with_tls_context(self, request, verify, proxies=None, cert=None):
+        pool = super().get_connection_with_tls_context(request, verify, proxies, cert)
+        self._connections._used(pool)
+
+        return pool
+
+
+class _SharedRequestsRH(RequestsRH):
+    def __init__(self, *args, connections: ConnectionPool, **kwargs):
+        self.connections = connections
+
+        super().__init__(*args, **kwargs)
+
+    def _create_instance(self, cookiejar, legacy_ssl_support=None):
+        try:
+            return self._create_shared_instance(cookiejar, legacy_ssl_support)
+        except AttributeError:
+            # Internals of RequestsRH changed: use its own session
+            self.connections.logger.warning(
+                "Sharing connections is not supported by this yt-dlp version",
+                exc_info=True,
+            )
+
+            return super()._create_instance(cookiejar, legacy_ssl_support)
+
+    def _create_shared_instance(self, cookiejar, legacy_ssl_support=None):
+        # Same as RequestsRH, except for the adapter
+        session = RequestsSession()
+        session.adapters.clear()
+        session.headers = requests.models.CaseInsensitiveDict()
+        session.cookies = cookiejar
+        session.trust_env = False
+
+        if legacy_ssl_support is None:
+            legacy_ssl_support = self.legacy_ssl_support
+
+        key = (
+            self.verify,
+            legacy_ssl_support,
+            self.prefer_system_certs,
+            tuple(sorted(self._client_cert.items())),
+            self.source_address,
+        )
+        adapter = self.connections._adapter(
+            key,
+            lambda: _SharedHTTPAdapter(
+                self.connections,
+                ssl_context=self._make_sslcontext(
+                    legacy_ssl_support=legacy_ssl_support
+                ),
+                source_address=self.source_address,
+                max_retries=urllib3.util.retry.Retry(False),
+            ),
+        )
+
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        return session
+
+    def _close_instance(self, instance):
+        if not any(
+            isinstance(adapter, _SharedHTTPAdapter)
+            for adapter in instance.adapters.values()
+        ):
+            instance.close()
+
+        # Sessions otherwise only hold the shared adapters: closing them would close the shared connections
+
+
+class _CachedResolutionMixin:
+    """Connection resolving its host through a DNS cache."""
+
+    def __init__(self, *args, dns_cache: DNSCache, **kwargs):
+        self.dns_cache = dns_cache
+
+        super().__init__(*args, **kwargs)
+
+    def _new_conn(self) -> socket.socket:
+        # Same as urllib3, except for the name resolution
+        conn: Any = self
+
+        try:
+            addresses = self.dns_cache.getaddrinfo(
+                conn._dns_host,
+                conn.port,
+                urllib3.util.connection.allowed_gai_family(),
+                socket.SOCK_STREAM,
+            )
+        except socket.gaierror as err:
+            raise urllib3.exceptions.NameResolutionError(conn.host, conn, err) from err
+
+        error: OSError = OSError("getaddrinfo returns an empty list")
+
+        for *_, sockaddr in addresses:
+            try:
+                # Addresses are not resolved again
+                return urllib3.util.connection.create_connection(
+                    (sockaddr[0], conn.port),
+                    conn.timeout,
+                    source_address=conn.source_address,
+                    socket_options=conn.socket_options,
+                )
+            except OSError as err:
+                error = err
+
+        if isinstance(error, TimeoutError):
+            raise urllib3.exceptions.ConnectTimeoutError(
+                conn,
+                f"Connection to {conn.host} timed out. (connect timeout={conn.timeout})",
+            ) from error
+
+        raise urllib3.exceptions.NewConnectionError(
+            conn, f"Failed to establish a new connection: {error}"
+        ) from error
+
+
+class _CachedHTTPConnection(_CachedResolutionMixin, urllib3.connection.HTTPConnection):
+    pass
+
+
+class _CachedHTTPSConnection(
+    _CachedResolutionMixin, urllib3.connection.HTTPSConnection
+):
+    pass
+
+
+class _CachedHTTPConnectionPool(urllib3.HTTPConnectionPool):
+    ConnectionCls = _CachedHTTPConnection
+
+    def __init__(self, *args, dns_cache: DNSCache, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Passed to every new connection
+        self.conn_kw["dns_cache"] = dns_cache
+
+
+class _CachedHTTPSConnectionPool(urllib3.HTTPSConnectionPool):
+    ConnectionCls = _CachedHTTPSConnection
+
+    def __init__(self, *args, dns_cache: DNSCache, **kwargs):
+        super().__init__(*args, **kwargs)
+
+        # Passed to every new connection
+        self.conn_kw["dns_cache"] = dns_cache
+
+
+def _close_idle_connections(pool: urllib3.HTTPConnectionPool):
+    """
+    Close the idle connections of a pool while keeping it usable.
+
+    Only checked-in connections (the ones in the pool's queue) are closed:
+    connections of requests in flight are checked out and not in the queue.
+    """
+
+    slots = pool.pool
+
+    if slots is None:
+        return
+
+    taken = 0
+
+    while True:
+        try:
+            conn = slots.get_nowait()
+        except queue.Empty:
+            break
+
+        taken += 1
+
+        if conn is not None:
+            conn.close()
+
+    for _ in range(taken):
+        try:
+            # Keep the capacity of the pool (connections checked in meanwhile may have taken the slots)
+            slots.put_nowait(None)
+        except queue.Full:
+            break
+
+
+@dataclass(frozen=True)
+class DNSCacheStats:
+    """Point-in-time metrics of a DNS cache."""
+
+    entries: int
+    hits: int
+    misses: int
+
+
+class DNSCache:
+    """
+    Cache of name resolution results (socket.getaddrinfo) with a fixed time to live.
+
+    Used by the connections of a ConnectionPool (the resolver of the process is left untouched).
+    Failed lookups are not cached.
+    """
+
+    def __init__(
+        self,
+        ttl: float = 60.0,
+        max_entries: int = 1024,
+    ):
+        """
+        Args:
+            ttl: Seconds results are reused for.
+            max_entries: Maximum number of cached results (least recently used ones are dropped).
+        """
+
+        self.ttl = ttl
+        self.max_entries = max_entries
+
+        self._entries: OrderedDict[tuple, tuple[list, float]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+
+    def getaddrinfo(self, host, port, family=0, type=0, proto=0, flags=0):
+        """Resolve like socket.getaddrinfo, reusing recent results."""
+
+        key = (host, port, family, type, proto, flags)
+        now = time.monotonic()
+
+        with self._lock:
+            entry = self._entries.get(key)
+
+            if entry is not None and entry[1] > now:
+                self._entries.move_to_end(key)
+                self._hits += 1
+
+                return list(entry[0])
+
+            self._misses += 1
+
+        result = socket.getaddrinfo(host, port, family, type, proto, flags)
+
+        with self._lock:
+            self._entries[key] = (list(result), now + self.ttl)
+            self._entries.move_to_end(key)
+
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+        return result
+
+    def stats(self) -> DNSCacheStats:
+        """Return a snapshot of the cache metrics."""
+
+        with self._lock:
+            return DNSCacheStats(
+                entries=len(self._entries),
+                hits=self._hits,
+                misses=self._misses,
+            )
+
+    def clear(self):
+        """Drop every cached result."""
+
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,225 @@
+"""Reuse of configured YoutubeDL instances across requests."""
+
+from __future__ import annotations
+
+import logging
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import TYPE_CHECKING, Any
+
+import yt_dlp
+from yt_dlp.utils import YoutubeDLError, is_path_like
+
+from .fingerprint import VOLATILE_PARAMS, params_fingerprint
+
+if TYPE_CHECKING:
+    from yt_dlp import _Params
+
+_logger = logging.getLogger(__name__)
+
+# Parameters swapped in for every request instead of being part of the pool key
+SWAPPED_PARAMS = VOLATILE_PARAMS | {"download_archive"}
+
+
+@dataclass(frozen=True)
+class YoutubeDLPoolStats:
+    """Point-in-time metrics of a YoutubeDL pool."""
+
+    idle: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+class YoutubeDLPool:
+    """
+    Keeps configured YoutubeDL instances for reuse by requests with the same options.
+
+    Constructing a YoutubeDL loads extractors, postprocessors, the cookie jar and HTTP handlers.
+    Instances are keyed by the fingerprint of their parameters and used by one request at a time:
+    per-request parameters (paths, hooks, logger and download archive) are swapped in on acquire.
+    Idle instances expire after the idle timeout; the least recently used ones are closed
+    when more than max_size are idle.
+    """
+
+    def __init__(
+        self,
+        max_size: int = 16,
+        idle_timeout: float = 300.0,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            max_size: Maximum number of idle instances kept.
+            idle_timeout: Seconds after which idle instances are closed.
+        """
+
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.logger = logger
+
+        # Idle instances by their id (in order of use)
+        self._idle: OrderedDict[int, tuple[str, yt_dlp.YoutubeDL, float]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    @contextmanager
+    def acquire(self, params: _Params) -> Iterator[yt_dlp.YoutubeDL]:
+        """
+        Yield an instance configured with params for exclusive use.
+
+        Instances are returned to the pool unless the caller raised an error
+        not reported by yt-dlp itself (their state is unknown).
+        """
+
+        if is_path_like(params.get("download_archive")):
+            # Archive files are loaded on construction
+            with yt_dlp.YoutubeDL(params) as ydl:
+                yield ydl
+
+            return
+
+        key = params_fingerprint(
+            {k: v for k, v in params.items() if k not in SWAPPED_PARAMS}
+        )
+        ydl = self._take(key)
+
+        if ydl is None:
+            ydl = yt_dlp.YoutubeDL(dict(params))  # type: ignore[arg-type]
+        else:
+            _prepare(ydl, params)
+
+        try:
+            yield ydl
+        except YoutubeDLError:
+            # Eg. an unsupported URL: the instance is still usable
+            self._put(key, ydl)
+            raise
+        except BaseException:
+            _close(ydl, self.logger)
+            raise
+
+        self._put(key, ydl)
+
+    def stats(self) -> YoutubeDLPoolStats:
+        """Return a snapshot of the pool metrics."""
+
+        with self._lock:
+            return YoutubeDLPoolStats(
+                idle=len(self._idle),
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+    def clear(self):
+        """Close every idle instance."""
+
+        with self._lock:
+            idle = [ydl for _, ydl, _ in self._idle.values()]
+            self._idle.clear()
+
+        for ydl in idle:
+            _close(ydl, self.logger)
+
+    def _take(self, key: str) -> yt_dlp.YoutubeDL | None:
+        now = time.monotonic()
+
+        with self._lock:
+            expired = self._evict_idle(now)
+
+            # Most recently used first: its connections are the most likely to be alive
+            for id, (candidate_key, ydl, _) in reversed(self._idle.items()):
+                if candidate_key == key:
+                    del self._idle[id]
+                    self._hits += 1
+                    break
+            else:
+                ydl = None
+                self._misses += 1
+
+        for instance in expired:
+            _close(instance, self.logger)
+
+        return ydl
+
+    def _put(self, key: str, ydl: yt_dlp.YoutubeDL):
+        evicted: list[yt_dlp.YoutubeDL] = []
+
+        with self._lock:
+            self._idle[id(ydl)] = (key, ydl, time.monotonic())
+
+            while len(self._idle) > self.max_size:
+                _, (_, instance, _) = self._idle.popitem(last=False)
+                evicted.append(instance)
+                self._evictions += 1
+
+        for instance in evicted:
+            _close(instance, self.logger)
+
+    def _evict_idle(self, now: float) -> list[yt_dlp.YoutubeDL]:
+        expired: list[yt_dlp.YoutubeDL] = []
+
+        for id, (_, ydl, used_at) in list(self._idle.items()):
+            if now - used_at < self.idle_timeout:
+                # Ordered by use: the rest are more recent
+                break
+
+            del self._idle[id]
+            expired.append(ydl)
+            self._evictions += 1
+
+        return expired
+
+
+def _prepare(ydl: yt_dlp.YoutubeDL, params: _Params):
+    """
+    Swap the per-request parameters of params into a pooled instance.
+
+    Relies on private attributes of YoutubeDL (guarded by the pool tests).
+    """
+
+    values: dict[str, Any] = dict(params)
+
+    for name in SWAPPED_PARAMS:
+        if name in values:
+            ydl.params[name] = values[name]
+        else:
+            ydl.params.pop(name, None)
+
+    # Hooks are registered on construction
+    ydl._progress_hooks = list(values.get("progress_hooks", []))
+    ydl._post_hooks = list(values.get("post_hooks", []))
+
+    previous = ydl._postprocessor_hooks
+    ydl._postprocessor_hooks = list(values.get("postprocessor_hooks", []))
+
+    for pps in ydl._pps.values():
+        for pp in pps:
+            pp._progress_hooks = [
+                hook for hook in pp._progress_hooks if hook not in previous
+            ] + ydl._postprocessor_hooks
+
+    # The download archive is loaded on construction
+    ydl.archive = values.get("download_archive") or set()
+
+    # State of the previous run
+    ydl._download_retcode = 0
+    ydl._num_downloads = 0
+    ydl._playlist_level = 0
+    ydl._playlist_urls.clear()
+
+
+def _close(ydl: yt_dlp.YoutubeDL, logger: logging.Logger):
+    try:
+        ydl.close()
+    except Exception:
+        logger.exception("Failed to close YoutubeDL")
@@ -0,0 +1,77 @@
+"""
+Field projection for (potentially huge) yt-dlp info dicts.
+
+Fields are dotted paths (eg. "formats.format_id") selecting nested values.
+Lists are projected element by element, so "formats.format_id" keeps the
+format_id of every format. A single "*" selects everything.
+"""
+
+from collections.abc import Iterable
+from typing import Any
+
+ALL = "*"
+
+# Maps a key to the projection of its value.
+# An empty projection selects the whole value.
+type Projection = dict[str, Projection]
+
+
+def validate_field(field: str) -> str:
+    if field == ALL:
+        return field
+
+    if not field or any(not part for part in field.split(".")):
+        raise ValueError(f"Invalid field path: {field!r}")
+
+    return field
+
+
+def compile_fields(fields: Iterable[str]) -> Projection | None:
+    """
+    Compile field paths into a projection.
+
+    Returns:
+        None if every field is selected.
+    """
+
+    projection: Projection = {}
+
+    for field in fields:
+        if field == ALL:
+            return None
+
+        node = projection
+        *parents, leaf = validate_field(field).split(".")
+
+        for part in parents:
+            child = node.get(part)
+
+            if child == {}:
+                # The whole value is already selected
+                break
+
+            node = node.setdefault(part, {})
+        else:
+            node[leaf] = {}
+
+    return projection
+
+
+def project(value: Any, projection: Projection | None) -> Any:
+    """Return a copy of value holding only the selected fields."""
+
+    if not projection:
+        return value
+
+    if isinstance(value, dict):
+        return {
+            key: project(value[key], child)
+            for key, child in projection.items()
+            if key in value
+        }
+
+    if isinstance(value, (list, tuple)):
+        return [project(item, projection) for item in value]
+
+    # Scalars have no fields to select from
+    return value
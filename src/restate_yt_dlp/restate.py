@@ -1,15 +1,57 @@
+from collections.abc import Callable
+from typing import Any
+
 import restate
 from pydantic import BaseModel, Field
 from pydantic_restate import ServiceHandlerOptions
 from pydantic_restate import ServiceOptions as BaseServiceOptions
+from restate.exceptions import TerminalError
+from restate.handler import handler_from_callable
 
-from .executor import DownloadRequest, Executor, ExtractInfoRequest, ExtractInfoResponse
+from .execution import ExecutionBackend, ExecutionOptions
+from .executor import (
+    DownloadPlaylistRequest,
+    DownloadPlaylistResponse,
+    DownloadRequest,
+    DownloadResponse,
+    Executor,
+    ExtractInfoBatchRequest,
+    ExtractInfoBatchResponse,
+    ExtractInfoRequest,
+    ExtractInfoResponse,
+    ExtractPlaylistResponse,
+    PlaylistEntryResult,
+)
+from .serde import JsonSerde
 
 
 class ServiceOptions(BaseServiceOptions):
     name: str = Field(default="yt-dlp")
 
 
+class ConcurrencyOptions(BaseModel):
+    download: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of concurrent downloads (unlimited if not set)",
+    )
+    extract_info: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of concurrent info extractions (unlimited if not set)",
+    )
+    extract_info_batch: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of concurrent batch info extractions (unlimited if not set)",
+    )
+    extract_playlist: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of concurrent playlist extractions of downloadPlaylist (unlimited if not set)",
+    )
+
+
 class HandlerOptions(BaseModel):
     download: ServiceHandlerOptions = Field(
         default_factory=ServiceHandlerOptions,
@@ -19,20 +61,57 @@ class HandlerOptions(BaseModel):
         default_factory=lambda: ServiceHandlerOptions(name="extractInfo"),
         description="Options for the extract_info handler",
     )
+    extract_info_batch: ServiceHandlerOptions = Field(
+        default_factory=lambda: ServiceHandlerOptions(name="extractInfoBatch"),
+        description="Options for the extract_info_batch handler",
+    )
+    download_playlist: ServiceHandlerOptions = Field(
+        default_factory=lambda: ServiceHandlerOptions(name="downloadPlaylist"),
+        description="Options for the download_playlist handler",
+    )
+    concurrency: ConcurrencyOptions = Field(
+        default_factory=ConcurrencyOptions,
+        description="Per-handler concurrency limits",
+    )
 
 
 class Options(BaseModel):
     service: ServiceOptions = Field(default_factory=ServiceOptions)
     handlers: HandlerOptions = Field(default_factory=HandlerOptions)
+    execution: ExecutionOptions = Field(
+        default_factory=ExecutionOptions,
+        description="Options for the backend running yt-dlp",
+    )
+
+
+def executor_functions(executor: Executor) -> dict[str, Callable[..., Any]]:
+    """
+    Return the executor methods run by the handlers of the service by their names.
+
+    Worker initializers of process mode return these for the executor built in the worker.
+    """
+
+    return {
+        "download": executor.download,
+        "extract_info": executor.extract_info,
+        "extract_info_batch": executor.extract_info_batch,
+        "extract_playlist": executor.extract_playlist,
+    }
 
 
 def create_service(
     downloader: Executor,
     options: Options,
+    backend: ExecutionBackend | None = None,
 ) -> restate.Service:
     service = options.service.new_service()
 
-    register_service(downloader, service, options.handlers)
+    register_service(
+        downloader,
+        service,
+        options.handlers,
+        backend or ExecutionBackend(options.execution),
+    )
 
     return service
 
@@ -41,12 +120,49 @@ def register_service(
     executor: Executor,
     service: restate.Service,
     options: HandlerOptions,
+    backend: ExecutionBackend | None = None,
 ):
+    if backend is None:
+        backend = ExecutionBackend()
+
+    functions = executor_functions(executor)
+
+    run_download = backend.wrap(
+        "download",
+        functions["download"],
+        max_concurrency=options.concurrency.download,
+    )
+    run_extract_info = backend.wrap(
+        "extract_info",
+        functions["extract_info"],
+        max_concurrency=options.concurrency.extract_info,
+    )
+
+    run_extract_info_batch = backend.wrap(
+        "extract_info_batch",
+        functions["extract_info_batch"],
+        max_concurrency=options.concurrency.extract_info_batch,
+    )
+    run_extract_playlist = backend.wrap(
+        "extract_playlist",
+        functions["extract_playlist"],
+        max_concurrency=options.concurrency.extract_playlist,
+    )
+
+    info_serde = JsonSerde[ExtractInfoResponse]()
+    download_serde = JsonSerde[DownloadResponse]()
+    info_batch_serde = JsonSerde[ExtractInfoBatchResponse]()
+    playlist_serde = JsonSerde[ExtractPlaylistResponse]()
+
     @options.download.handler(service)
-    async def download(ctx: restate.Context, request: DownloadRequest):
-        await ctx.run_typed(
+    async def download(
+        ctx: restate.Context,
+        request: DownloadRequest,
+    ) -> DownloadResponse:
+        return await ctx.run_typed(
             "download",
-            executor.download,
+            run_download,
+            restate.RunOptions(serde=download_serde),
             id=ctx.request().id,
             request=request,
         )
@@ -58,7 +174,84 @@ def register_service(
     ) -> ExtractInfoResponse:
         return await ctx.run_typed(
             "extract_info",
-            executor.extract_info,
+            run_extract_info,
+            # Info dicts are large and may contain values the default serde cannot encode
+            restate.RunOptions(serde=info_serde),
+            id=ctx.request().id,
+            request=request,
+        )
+
+    @options.extract_info_batch.handler(service)
+    async def extract_info_batch(
+        ctx: restate.Context,
+        request: ExtractInfoBatchRequest,
+    ) -> ExtractInfoBatchResponse:
+        return await ctx.run_typed(
+            "extract_info_batch",
+            run_extract_info_batch,
+            restate.RunOptions(serde=info_batch_serde),
+            id=ctx.request().id,
+            request=request,
+        )
+
+    @options.download_playlist.handler(service)
+    async def download_playlist(
+        ctx: restate.Context,
+        request: DownloadPlaylistRequest,
+    ) -> DownloadPlaylistResponse:
+        playlist = await ctx.run_typed(
+            "extract_playlist",
+            run_extract_playlist,
+            restate.RunOptions(serde=playlist_serde),
             id=ctx.request().id,
             request=request,
         )
+
+        entries = playlist["entries"]
+        results: list[PlaylistEntryResult] = [
+            PlaylistEntryResult(**entry) for entry in entries
+        ]
+
+        # Every entry is a durable child invocation: failed entries are retried on their own
+        # and entries are spread across workers, at most request.concurrency at a time
+        pending: dict[restate.RestateDurableFuture[DownloadResponse], int] = {}
+        queue = iter(range(len(entries)))
+
+        def dispatch():
+            index = next(queue, None)
+
+            if index is not None:
+                call = ctx.service_call(download, request.entry_request(entries[index]))
+                pending[call] = index
+
+        for _ in range(request.concurrency):
+            dispatch()
+
+        while pending:
+            done, _ = await restate.wait_completed(*pending)
+
+            for call in done:
+                index = pending.pop(call)
+
+                try:
+                    results[index]["download"] = await call
+                except TerminalError as err:
+                    results[index]["error"] = err.message
+
+                dispatch()
+
+        return DownloadPlaylistResponse(
+            id=playlist["id"],
+            title=playlist["title"],
+            entries=results,
+        )
+
+    # Responses are encoded with the same serializer as the journal entries
+    # (the Restate default serde uses the standard library)
+    for handler, serde in (
+        (download, download_serde),
+        (extract_info, info_serde),
+        (extract_info_batch, info_batch_serde),
+        (download_playlist, JsonSerde[DownloadPlaylistResponse]()),
+    ):
+        handler_from_callable(handler).handler_io.output_serde = serde
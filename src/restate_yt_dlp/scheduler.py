@@ -0,0 +1,410 @@
+"""Rate and concurrency limits of requests per site."""
+
+from __future__ import annotations
+
+import logging
+import re
+import threading
+import time
+import uuid
+from collections.abc import Iterator, Mapping
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Protocol
+from urllib.parse import urlsplit
+
+from pydantic import BaseModel, Field
+from yt_dlp.extractor import get_info_extractor
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.networking.exceptions import HTTPError
+
+_logger = logging.getLogger(__name__)
+
+# Statuses of sites asking clients to slow down
+THROTTLED_STATUSES = frozenset({429, 503})
+
+# Upper bound of the backoff multiplier after consecutive throttled requests
+MAX_PENALTY = 1024
+
+_THROTTLED_MESSAGE = re.compile(r"HTTP Error (429|503)\b")
+
+
+class SiteLimit(BaseModel):
+    """Limits of requests to a site."""
+
+    rate: float | None = Field(
+        default=None,
+        gt=0,
+        description="Requests started per second (unlimited if not set)",
+    )
+    burst: int = Field(
+        default=1,
+        ge=1,
+        description="Requests started at once after an idle period",
+    )
+    max_in_flight: int | None = Field(
+        default=None,
+        ge=1,
+        description="Maximum number of requests in flight (unlimited if not set)",
+    )
+    backoff: float = Field(
+        default=1.0,
+        gt=0,
+        description="Seconds requests are paused for after the site throttled a request (doubled for consecutive ones)",
+    )
+    max_backoff: float = Field(
+        default=300.0,
+        gt=0,
+        description="Maximum number of seconds requests are paused for (also caps Retry-After)",
+    )
+
+
+class SiteBusyError(Exception):
+    """Raised when a request could not start within the maximum wait (retryable)."""
+
+
+class SchedulerBackend(Protocol):
+    """State of the limits of sites (shared by the workers using the same backend)."""
+
+    def acquire(self, key: str, limit: SiteLimit, token: str) -> float:
+        """
+        Start a request to a site if its limits allow it.
+
+        Returns:
+            0 if the request started, otherwise the number of seconds to wait before trying again.
+        """
+        ...
+
+    def release(
+        self,
+        key: str,
+        limit: SiteLimit,
+        token: str,
+        throttled: bool = False,
+        retry_after: float | None = None,
+    ):
+        """
+        Finish a request started by acquire.
+
+        Args:
+            throttled: The site throttled the request: pause requests to it
+                (for at least retry_after seconds, up to max_backoff) and lower its rate until requests succeed again.
+        """
+        ...
+
+
+@dataclass(frozen=True)
+class SchedulerStats:
+    """Point-in-time metrics of a scheduler."""
+
+    waiting: int
+    waits: int
+    throttled: int
+    timeouts: int
+
+
+class Scheduler:
+    """
+    Starts requests to sites within their rate limits and maximum number of requests in flight.
+
+    Sites are configured by domain (matching subdomains too) or by extractor key (eg. Youtube).
+    Requests to other sites are subject to the default limit per host (if any).
+
+    When a site responds with HTTP 429 or 503, requests to it are paused and its rate is lowered,
+    so throttling is absorbed instead of amplified by retries.
+    """
+
+    def __init__(
+        self,
+        backend: SchedulerBackend,
+        sites: Mapping[str, SiteLimit] | None = None,
+        default: SiteLimit | None = None,
+        max_wait: float = 60.0,
+        poll_interval: float = 1.0,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            backend: State of the limits.
+            sites: Limits by domain or extractor key.
+            default: Limit of every other host.
+            max_wait: Seconds after which waiting requests fail with a (retryable) SiteBusyError.
+            poll_interval: Maximum number of seconds between attempts to start a waiting request.
+        """
+
+        self.backend = backend
+        self.sites = dict(sites or {})
+        self.default = default
+        self.max_wait = max_wait
+        self.poll_interval = poll_interval
+        self.logger = logger
+
+        self._domains = {
+            key.lower(): limit for key, limit in self.sites.items() if "." in key
+        }
+        self._extractors = [
+            (key, _extractor(key), limit)
+            for key, limit in self.sites.items()
+            if "." not in key
+        ]
+        self._lock = threading.Lock()
+        self._waiting = 0
+        self._waits = 0
+        self._throttled = 0
+        self._timeouts = 0
+
+    def site(self, url: str) -> tuple[str, SiteLimit] | None:
+        """Return the key and limit of the site of url (None if it is not limited)."""
+
+        host = (urlsplit(url).hostname or "").lower().removeprefix("www.")
+        labels = host.split(".")
+
+        for index in range(len(labels) - 1):
+            domain = ".".join(labels[index:])
+
+            if domain in self._domains:
+                return domain, self._domains[domain]
+
+        for key, extractor, limit in self._extractors:
+            if extractor.suitable(url):
+                return key, limit
+
+        if self.default is not None and host:
+            return host, self.default
+
+        return None
+
+    @contextmanager
+    def slot(self, url: str) -> Iterator[None]:
+        """Wait until a request to the site of url can start and hold its slot while it runs."""
+
+        site = self.site(url)
+
+        if site is None:
+            yield
+            return
+
+        key, limit = site
+        token = uuid.uuid4().hex
+
+        self._acquire(key, limit, token)
+
+        try:
+            yield
+        except BaseException as err:
+            throttled, retry_after = throttle_status(err)
+
+            if throttled:
+                with self._lock:
+                    self._throttled += 1
+
+                self.logger.warning(
+                    "Site throttled the request, backing off",
+                    extra={"site": key, "retry_after": retry_after},
+                )
+
+            self._release(key, limit, token, throttled, retry_after)
+
+            raise
+
+        self._release(key, limit, token)
+
+    def stats(self) -> SchedulerStats:
+        """Return a snapshot of the scheduler metrics."""
+
+        with self._lock:
+            return SchedulerStats(
+                waiting=self._waiting,
+                waits=self._waits,
+                throttled=self._throttled,
+                timeouts=self._timeouts,
+            )
+
+    def _acquire(self, key: str, limit: SiteLimit, token: str):
+        deadline = time.monotonic() + self.max_wait
+        waiting = False
+
+        try:
+            while True:
+                wait = self.backend.acquire(key, limit, token)
+
+                if wait <= 0:
+                    return
+
+                remaining = deadline - time.monotonic()
+
+                if remaining <= 0:
+                    with self._lock:
+                        self._timeouts += 1
+
+                    raise SiteBusyError(
+                        f"Requests to {key} are limited, retry later (waited {self.max_wait:g}s)"
+                    )
+
+                if not waiting:
+                    waiting = True
+
+                    with self._lock:
+                        self._waiting += 1
+                        self._waits += 1
+
+                    self.logger.info(
+                        "Waiting for the site limits", extra={"site": key, "wait": wait}
+                    )
+
+                time.sleep(min(wait, self.poll_interval, remaining))
+        finally:
+            if waiting:
+                with self._lock:
+                    self._waiting -= 1
+
+    def _release(
+        self,
+        key: str,
+        limit: SiteLimit,
+        token: str,
+        throttled: bool = False,
+        retry_after: float | None = None,
+    ):
+        try:
+            self.backend.release(key, limit, token, throttled, retry_after)
+        except Exception:
+            # Slots of shared backends expire eventually
+            self.logger.exception("Failed to release site slot", extra={"site": key})
+
+
+def throttle_status(err: BaseException) -> tuple[bool, float | None]:
+    """
+    Determine if a (yt-dlp) error was caused by the site throttling requests.
+
+    Returns:
+        Whether the site throttled the request and the seconds it asked to wait for (Retry-After).
+    """
+
+    seen: set[int] = set()
+    pending: list[BaseException | None] = [err]
+
+    while pending:
+        current = pending.pop()
+
+        if current is None or id(current) in seen:
+            continue
+
+        seen.add(id(current))
+
+        if isinstance(current, HTTPError) and current.status in THROTTLED_STATUSES:
+            return True, _retry_after(current)
+
+        exc_info = getattr(current, "exc_info", None)
+
+        pending += [
+            exc_info[1] if isinstance(exc_info, tuple) else None,
+            getattr(current, "cause", None),
+            current.__cause__,
+            current.__context__,
+        ]
+
+    # Eg. fragment downloads report HTTP errors only in the message
+    return _THROTTLED_MESSAGE.search(str(err)) is not None, None
+
+
+def _extractor(key: str) -> type[InfoExtractor]:
+    try:
+        return get_info_extractor(key)
+    except KeyError:
+        raise ValueError(
+            f"Unknown extractor key: {key} (sites are domains or extractor keys)"
+        ) from None
+
+
+def _retry_after(err: HTTPError) -> float | None:
+    value = err.response.headers.get("Retry-After") if err.response else None
+
+    if value is not None and value.strip().isdigit():
+        return float(value)
+
+    return None
+
+
+class _Bucket:
+    def __init__(self, limit: SiteLimit, now: float):
+        self.tokens = float(limit.burst)
+        self.updated_at = now
+        self.penalty = 1.0
+        self.paused_until = 0.0
+        self.in_flight: set[str] = set()
+
+
+class LocalSchedulerBackend:
+    """Limits requests within a single process."""
+
+    def __init__(self):
+        self._buckets: dict[str, _Bucket] = {}
+        self._lock = threading.Lock()
+
+    def acquire(self, key: str, limit: SiteLimit, token: str) -> float:
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(limit, now)
+
+            if now < bucket.paused_until:
+                return bucket.paused_until - now
+
+            if (
+                limit.max_in_flight is not None
+                and len(bucket.in_flight) >= limit.max_in_flight
+            ):
+                # Released slots are picked up on the next poll
+                return float("inf")
+
+            if limit.rate is not None:
+                rate = limit.rate / bucket.penalty
+                bucket.tokens = min(
+                    limit.burst, bucket.tokens + (now - bucket.updated_at) * rate
+                )
+                bucket.updated_at = now
+
+                if bucket.tokens < 1:
+                    return (1 - bucket.tokens) / rate
+
+                bucket.tokens -= 1
+
+            bucket.in_flight.add(token)
+
+            return 0
+
+    def release(
+        self,
+        key: str,
+        limit: SiteLimit,
+        token: str,
+        throttled: bool = False,
+        retry_after: float | None = None,
+    ):
+        now = time.monotonic()
+
+        with self._lock:
+            bucket = self._buckets.get(key)
+
+            if bucket is None:
+                return
+
+            bucket.in_flight.discard(token)
+
+            if throttled:
+                # Retry-After is capped too: a huge value must not stall the site indefinitely
+                pause = min(
+                    limit.max_backoff,
+                    max(retry_after or 0, limit.backoff * bucket.penalty),
+                )
+                bucket.paused_until = max(bucket.paused_until, now + pause)
+                bucket.penalty = min(bucket.penalty * 2, MAX_PENALTY)
+                bucket.tokens = 0
+                bucket.updated_at = now
+            elif bucket.penalty > 1:
+                # Recover gradually as requests succeed again
+                bucket.penalty = max(1.0, bucket.penalty / 2)
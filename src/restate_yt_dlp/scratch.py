@@ -0,0 +1,234 @@
+from __future__ import annotations
+
+import fcntl
+import logging
+import os
+import re
+import shutil
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from pathlib import Path
+
+from restate.exceptions import TerminalError
+
+_logger = logging.getLogger(__name__)
+
+_UNSAFE_CHARS = re.compile(r"[^A-Za-z0-9_-]")
+
+
+class ScratchDirectories:
+    """
+    Download directories keyed by invocation id that survive retries of the same invocation.
+
+    Directories of failed attempts are kept so that the retry continues partial downloads
+    (.part files and fragments) instead of starting over.
+    They are removed once the download succeeds or fails permanently,
+    abandoned directories are cleaned up in the background by age and to keep the total size within a budget.
+
+    Directories in use are locked (flock), so cleanups of every process sharing the root skip them.
+    """
+
+    def __init__(
+        self,
+        root: Path,
+        max_age: float = 86400.0,
+        max_bytes: int | None = None,
+        cleanup_interval: float = 60.0,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            root: Directory holding the scratch directories.
+            max_age: Seconds after which unused directories are removed.
+            max_bytes: Total size of directories above which the least recently used ones are removed.
+            cleanup_interval: Minimum number of seconds between cleanups.
+        """
+
+        self.root = root
+        self.max_age = max_age
+        self.max_bytes = max_bytes
+        self.cleanup_interval = cleanup_interval
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._cleaned_at = float("-inf")
+        self._cleaner: threading.Thread | None = None
+
+    @contextmanager
+    def open(self, id: str) -> Iterator[Path]:
+        """Provide the scratch directory of an invocation, reusing the one of a previous attempt."""
+
+        path = self.root / _UNSAFE_CHARS.sub("_", id)
+        resumed = path.exists()
+        fd = _lock(path)
+
+        self.maybe_cleanup()
+
+        try:
+            if resumed:
+                self.logger.info(
+                    "Resuming from previous attempt",
+                    extra={"path": str(path)},
+                )
+
+            # Mark the directory as recently used
+            path.touch()
+
+            yield path
+        except TerminalError:
+            # There will be no retry
+            shutil.rmtree(path, ignore_errors=True)
+            raise
+        except BaseException:
+            # Keep the directory around for the retry
+            if path.exists():
+                path.touch()
+
+            raise
+        else:
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            # Releases the lock
+            os.close(fd)
+
+    def maybe_cleanup(self):
+        """Clean up in the background unless it ran recently or is still running."""
+
+        with self._lock:
+            now = time.monotonic()
+
+            if now - self._cleaned_at < self.cleanup_interval or (
+                self._cleaner is not None and self._cleaner.is_alive()
+            ):
+                return
+
+            self._cleaned_at = now
+            self._cleaner = threading.Thread(
+                target=self._run_cleanup,
+                name="restate-yt-dlp-scratch-cleanup",
+                daemon=True,
+            )
+            self._cleaner.start()
+
+    def cleanup(self):
+        """Remove abandoned directories (by age and above the size budget)."""
+
+        if not self.root.exists():
+            return
+
+        now = time.time()
+        directories: list[tuple[float, int, Path]] = []
+
+        for path in self.root.iterdir():
+            try:
+                if not path.is_dir():
+                    continue
+
+                used_at = path.stat().st_mtime
+            except FileNotFoundError:
+                continue
+
+            if now - used_at > self.max_age and self._remove(path, "expired"):
+                continue
+
+            # Directories in use count towards the budget too
+            directories.append((used_at, _size(path), path))
+
+        if self.max_bytes is None:
+            return
+
+        total = sum(size for _, size, _ in directories)
+
+        # Remove the least recently used directories first
+        for _, size, path in sorted(directories):
+            if total <= self.max_bytes:
+                break
+
+            if self._remove(path, "over budget"):
+                total -= size
+
+    def _run_cleanup(self):
+        try:
+            self.cleanup()
+        except Exception:
+            self.logger.exception("Failed to clean up scratch directories")
+
+    def _remove(self, path: Path, reason: str) -> bool:
+        """Remove a directory unless it is in use. Returns whether it was removed."""
+
+        fd = _try_lock(path)
+
+        if fd is None:
+            return False
+
+        try:
+            self.logger.info(
+                "Removing abandoned scratch directory",
+                extra={"path": str(path), "reason": reason},
+            )
+
+            shutil.rmtree(path, ignore_errors=True)
+        finally:
+            os.close(fd)
+
+        return True
+
+
+def _lock(path: Path) -> int:
+    """Create a directory and lock it (waiting for other users). Returns the locked file descriptor."""
+
+    while True:
+        path.mkdir(parents=True, exist_ok=True)
+
+        try:
+            fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+        except FileNotFoundError:
+            # Removed by a cleanup in the meantime
+            continue
+
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+
+            # Still the same directory (not removed by a cleanup while waiting for the lock)
+            if os.path.samestat(os.fstat(fd), os.stat(path)):
+                return fd
+        except FileNotFoundError:
+            pass
+        except BaseException:
+            os.close(fd)
+            raise
+
+        os.close(fd)
+
+
+def _try_lock(path: Path) -> int | None:
+    """Lock a directory unless it is in use. Returns the locked file descriptor."""
+
+    try:
+        fd = os.open(path, os.O_RDONLY | os.O_DIRECTORY)
+    except (FileNotFoundError, NotADirectoryError):
+        return None
+
+    try:
+        fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        os.close(fd)
+        return None
+
+    return fd
+
+
+def _size(path: Path) -> int:
+    size = 0
+
+    for file in path.rglob("*"):
+        try:
+            if file.is_file():
+                size += file.stat().st_size
+        except FileNotFoundError:
+            # Removed while iterating
+            continue
+
+    return size
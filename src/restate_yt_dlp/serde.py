@@ -0,0 +1,142 @@
+"""
+JSON serialization of yt-dlp payloads using the fastest available encoder.
+
+orjson is used when installed, then msgspec (the msgspec extra), falling back to the standard library.
+Values that are not JSON serializable (eg. callables, sets or paths in info dicts)
+are encoded the same way yt-dlp sanitizes info dicts.
+"""
+
+from __future__ import annotations
+
+import datetime
+import json
+from collections.abc import Mapping, Sequence
+from pathlib import PurePath
+from typing import Any, Protocol
+
+from restate.serde import Serde
+
+
+class Serializer(Protocol):
+    name: str
+
+    def dumps(self, obj: Any) -> bytes: ...
+
+    def loads(self, buf: bytes | str) -> Any: ...
+
+
+def encode_default(obj: Any) -> Any:
+    """Convert values the JSON encoders do not support natively."""
+    if isinstance(obj, (set, frozenset, Sequence)) and not isinstance(
+        obj, (str, bytes, bytearray)
+    ):
+        return list(obj)
+
+    if isinstance(obj, Mapping):
+        return dict(obj)
+
+    if isinstance(obj, (bytes, bytearray)):
+        return obj.decode("utf-8", errors="replace")
+
+    if isinstance(obj, PurePath):
+        return str(obj)
+
+    if isinstance(obj, (datetime.datetime, datetime.date, datetime.time)):
+        return obj.isoformat()
+
+    # Same as yt_dlp.YoutubeDL.sanitize_info
+    return repr(obj)
+
+
+class StdlibSerializer:
+    name = "json"
+
+    def dumps(self, obj: Any) -> bytes:
+        return json.dumps(obj, default=encode_default).encode("utf-8")
+
+    def loads(self, buf: bytes | str) -> Any:
+        return json.loads(buf)
+
+
+class MsgspecSerializer:
+    name = "msgspec"
+
+    def __init__(self):
+        import msgspec
+
+        self._encoder = msgspec.json.Encoder(enc_hook=encode_default)
+        self._decoder = msgspec.json.Decoder()
+        self._errors = (msgspec.EncodeError, TypeError, OverflowError)
+        self._fallback = StdlibSerializer()
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return self._encoder.encode(obj)
+        except self._errors:
+            # Eg. dict keys or integers msgspec cannot encode
+            return self._fallback.dumps(obj)
+
+    def loads(self, buf: bytes | str) -> Any:
+        return self._decoder.decode(buf)
+
+
+class OrjsonSerializer:
+    name = "orjson"
+
+    def __init__(self):
+        import orjson
+
+        self._orjson = orjson
+        self._options = orjson.OPT_NON_STR_KEYS | orjson.OPT_SERIALIZE_NUMPY
+        self._fallback = StdlibSerializer()
+
+    def dumps(self, obj: Any) -> bytes:
+        try:
+            return self._orjson.dumps(obj, default=encode_default, option=self._options)
+        except TypeError:
+            # Eg. integers larger than 64 bits
+            return self._fallback.dumps(obj)
+
+    def loads(self, buf: bytes | str) -> Any:
+        return self._orjson.loads(buf)
+
+
+def default_serializer() -> Serializer:
+    """Return the fastest serializer available."""
+    for serializer in (OrjsonSerializer, MsgspecSerializer):
+        try:
+            return serializer()
+        except ImportError:
+            continue
+
+    return StdlibSerializer()
+
+
+_serializer: Serializer = default_serializer()
+
+
+def dumps(obj: Any) -> bytes:
+    return _serializer.dumps(obj)
+
+
+def loads(buf: bytes | str) -> Any:
+    return _serializer.loads(buf)
+
+
+class JsonSerde[I](Serde[I]):
+    """Restate serde for plain JSON payloads (eg. info dicts) using the fastest available encoder."""
+
+    def __init__(self, serializer: Serializer | None = None):
+        self.serializer = serializer or _serializer
+
+    def deserialize(self, buf: bytes) -> I | None:
+        if not buf:
+            return None
+
+        return self.serializer.loads(buf)
+
+    def serialize(self, obj: I | None) -> bytes:
+        if obj is None:
+            return b""
+
+        return self.serializer.dumps(obj)
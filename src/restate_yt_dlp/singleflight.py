@@ -0,0 +1,95 @@
+"""Deduplication of concurrent identical calls."""
+
+from __future__ import annotations
+
+import hashlib
+import logging
+import threading
+import time
+from collections.abc import Callable, Mapping
+from typing import Any, Protocol
+
+from .fingerprint import normalize_url, params_fingerprint
+
+_logger = logging.getLogger(__name__)
+
+
+class SingleFlightBusyError(Exception):
+    """Raised when an identical call in flight did not complete within the maximum wait (retryable)."""
+
+
+class SingleFlight(Protocol):
+    def run[T](self, key: str, fn: Callable[[], T]) -> T:
+        """
+        Call fn unless a call with the same key is already in flight.
+
+        Callers arriving while a call is in flight wait for it to complete and return its result.
+        If it fails, one of them calls fn instead.
+
+        Raises:
+            SingleFlightBusyError: The call in flight did not complete within the maximum wait.
+        """
+        ...
+
+
+def download_key(url: str, params: Mapping[str, Any], output: str) -> str:
+    """Return the key of downloading url with params to output."""
+
+    key = f"{normalize_url(url)}\n{params_fingerprint(params)}\n{output}"
+
+    return hashlib.sha256(key.encode()).hexdigest()
+
+
+class _Call:
+    def __init__(self):
+        self.done = threading.Event()
+        self.ok = False
+        self.result: Any = None
+
+
+class LocalSingleFlight:
+    """Deduplicates calls within a single process."""
+
+    def __init__(self, max_wait: float = 600.0, logger: logging.Logger = _logger):
+        """
+        Args:
+            max_wait: Seconds after which waiting callers fail with a (retryable) SingleFlightBusyError.
+        """
+
+        self.max_wait = max_wait
+        self.logger = logger
+
+        self._calls: dict[str, _Call] = {}
+        self._lock = threading.Lock()
+
+    def run[T](self, key: str, fn: Callable[[], T]) -> T:
+        deadline = time.monotonic() + self.max_wait
+
+        while True:
+            with self._lock:
+                call = self._calls.get(key)
+
+                if call is None:
+                    call = self._calls[key] = _Call()
+                    break
+
+            self.logger.info("Waiting for identical call in flight", extra={"key": key})
+
+            if not call.done.wait(max(0.0, deadline - time.monotonic())):
+                raise SingleFlightBusyError(
+                    f"Identical call still in flight, retry later (waited {self.max_wait:g}s)"
+                )
+
+            if call.ok:
+                return call.result
+
+        try:
+            call.result = fn()
+            call.ok = True
+
+            return call.result
+        finally:
+            with self._lock:
+                del self._calls[key]
+
+            call.done.set()
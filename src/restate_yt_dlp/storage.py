@@ -0,0 +1,633 @@
+"""
+Persisting downloads to object storage using obstore.
+
+Requires the obstore package.
+"""
+
+from __future__ import annotations
+
+import concurrent.futures
+import hashlib
+import json
+import logging
+import re
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from collections.abc import Iterator, Mapping
+from dataclasses import dataclass
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING, Any
+from urllib.parse import urlsplit
+
+import obstore
+import obstore.store
+from obstore.exceptions import (
+    AlreadyExistsError,
+    NotFoundError,
+    NotSupportedError,
+    PreconditionError,
+)
+from pydantic import AnyUrl
+
+if TYPE_CHECKING:
+    from obstore.store import ClientConfig, ObjectStore
+
+    from .checkpoint import FileCheckpoint
+    from .executor import PathFilter
+
+_logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class UploadStats:
+    """Point-in-time upload metrics."""
+
+    files: int
+    bytes: int
+    failed: int
+    seconds: float
+    # Files whose content was already stored (content-addressed uploads only)
+    deduplicated: int = 0
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Average throughput of a single file upload."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+@dataclass(frozen=True)
+class StorePoolStats:
+    """Point-in-time metrics of a store pool."""
+
+    size: int
+    hits: int
+    misses: int
+    evictions: int
+
+
+# Hosts of https URLs naming the bucket (or container) in the first path segment
+_PATH_STYLE_HOST = re.compile(
+    r"s3(\.[^.]+)?\.amazonaws\.com"
+    r"|[^.]+\.r2\.cloudflarestorage\.com"
+    r"|[^.]+\.(blob|dfs)\.core\.windows\.net"
+)
+
+
+def split_url(url: str) -> tuple[str, str]:
+    """
+    Split a location URL into the root of its store (scheme, host and bucket or container)
+    and the key prefix within the store.
+    """
+
+    parts = urlsplit(url)
+    root = f"{parts.scheme}://{parts.netloc}"
+    path = parts.path.strip("/")
+
+    if parts.scheme in ("http", "https") and _PATH_STYLE_HOST.fullmatch(
+        parts.hostname or ""
+    ):
+        bucket, _, path = path.partition("/")
+
+        if parts.hostname == "s3.amazonaws.com":
+            # Legacy global endpoint (not recognized by obstore): the default endpoint
+            root = f"s3://{bucket}"
+        else:
+            root = f"{root}/{bucket}"
+
+    return root, path
+
+
+class StorePool:
+    """
+    Cache of object stores keyed by store root (scheme, host and bucket or container) and configuration.
+
+    Reusing stores keeps their connection pools (and TLS sessions) alive across requests.
+    Least recently used stores are evicted when the pool is full,
+    stores not used for longer than the idle timeout are evicted on the next lookup.
+    """
+
+    def __init__(
+        self,
+        client_options: ClientConfig | None = None,
+        max_size: int = 32,
+        idle_timeout: float = 300.0,
+    ):
+        """
+        Args:
+            client_options: Client options of created stores.
+            max_size: Maximum number of stores kept.
+            idle_timeout: Seconds after which unused stores are evicted.
+        """
+
+        self.client_options = client_options
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+
+        self._stores: OrderedDict[tuple[str, str], tuple[float, ObjectStore]] = (
+            OrderedDict()
+        )
+        self._lock = threading.Lock()
+        self._hits = 0
+        self._misses = 0
+        self._evictions = 0
+
+    def get(self, url: str, config: Mapping[str, Any] | None = None) -> ObjectStore:
+        """Return the store of the bucket (or container) of url (see split_url for the key prefix)."""
+
+        root, _ = split_url(url)
+        key = (root, _fingerprint(config))
+        now = time.monotonic()
+
+        with self._lock:
+            self._evict_idle(now)
+
+            entry = self._stores.get(key)
+
+            if entry is not None:
+                self._hits += 1
+                self._stores[key] = (now, entry[1])
+                self._stores.move_to_end(key)
+
+                return entry[1]
+
+            self._misses += 1
+
+        # Build outside of the lock, it may take a while (eg. fetching credentials)
+        store = obstore.store.from_url(
+            root,
+            config=dict(config) if config else None,
+            client_options=self.client_options,
+        )
+
+        with self._lock:
+            # Keep the store of a concurrent lookup if there is one
+            entry = self._stores.get(key)
+            if entry is not None:
+                store = entry[1]
+
+            self._stores[key] = (now, store)
+            self._stores.move_to_end(key)
+
+            while len(self._stores) > self.max_size:
+                self._stores.popitem(last=False)
+                self._evictions += 1
+
+        return store
+
+    def stats(self) -> StorePoolStats:
+        with self._lock:
+            return StorePoolStats(
+                size=len(self._stores),
+                hits=self._hits,
+                misses=self._misses,
+                evictions=self._evictions,
+            )
+
+    def _evict_idle(self, now: float):
+        while self._stores:
+            key, (used_at, _) = next(iter(self._stores.items()))
+
+            if now - used_at < self.idle_timeout:
+                break
+
+            del self._stores[key]
+            self._evictions += 1
+
+
+def _fingerprint(config: Mapping[str, Any] | None) -> str:
+    """Identify a store configuration (without keeping credentials around)."""
+
+    if not config:
+        return ""
+
+    encoded = json.dumps(config, sort_keys=True, default=repr)
+
+    return hashlib.sha256(encoded.encode()).hexdigest()
+
+
+# Written to locations instead of the files when uploading content-addressed
+BLOB_MANIFEST = PurePosixPath("blobs.json")
+
+
+class ObstorePersister:
+    """
+    Uploads files to object storage.
+
+    Locations are either URLs (eg. s3://bucket/prefix/)
+    or paths relative to the default store.
+    Files of a directory are uploaded concurrently,
+    files larger than the chunk size are uploaded in concurrent parts (multipart upload).
+
+    When uploading content-addressed, every file is stored once per store
+    under the blobs prefix (keyed by its SHA-256 digest)
+    and locations get a manifest (blobs.json) mapping their files to blobs.
+    """
+
+    def __init__(
+        self,
+        store: ObjectStore | None = None,
+        client_options: ClientConfig | None = None,
+        chunk_size: int = 8 * 1024 * 1024,
+        max_concurrency: int = 12,
+        max_files: int = 4,
+        stores: StorePool | None = None,
+        blobs_prefix: str | None = None,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            store: Store of locations without a scheme.
+            client_options: Client options of stores created from location URLs.
+            chunk_size: Part size of multipart uploads in bytes.
+            max_concurrency: Maximum number of parts of a single file uploaded concurrently.
+            max_files: Maximum number of files of a directory uploaded concurrently.
+            stores: Pool of stores created from location URLs (overrides client_options).
+            blobs_prefix: Upload content-addressed under this prefix of the store of each location.
+        """
+
+        self.store = store
+        self.stores = stores or StorePool(client_options)
+        self.chunk_size = chunk_size
+        self.max_concurrency = max_concurrency
+        self.max_files = max_files
+        self.blobs_prefix = blobs_prefix.strip("/") if blobs_prefix else None
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._manifest_lock = threading.Lock()
+        self._files = 0
+        self._bytes = 0
+        self._failed = 0
+        self._seconds = 0.0
+        self._deduplicated = 0
+
+    def persist(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        src: Path,
+        filter: PathFilter | None = None,
+    ):
+        # Filter up front so excluded files are never opened
+        files: list[tuple[Path, PurePosixPath]] = []
+
+        for file in sorted(src.rglob("*")):
+            if not file.is_file():
+                continue
+
+            path = PurePosixPath(file.relative_to(src).as_posix())
+
+            if filter is not None and not filter.match(path):
+                continue
+
+            files.append((file, path))
+
+        if not files:
+            return
+
+        # Resolve once instead of once per file
+        resolved = self._resolve(ref)
+        manifest: dict[str, dict[str, Any]] = {}
+        started_at = time.monotonic()
+
+        with concurrent.futures.ThreadPoolExecutor(
+            max_workers=min(self.max_files, len(files)),
+            thread_name_prefix="restate-yt-dlp-upload",
+        ) as pool:
+            futures = [
+                pool.submit(self._upload, resolved, file, path, manifest)
+                for file, path in files
+            ]
+
+            try:
+                size = sum(
+                    future.result()
+                    for future in concurrent.futures.as_completed(futures)
+                )
+            except BaseException:
+                for future in futures:
+                    future.cancel()
+
+                raise
+
+        if self.blobs_prefix is not None:
+            # Written last: a manifest always refers to stored blobs
+            self.persist_bytes(
+                ref,
+                json.dumps({"files": dict(sorted(manifest.items()))}).encode(),
+                BLOB_MANIFEST,
+            )
+
+        seconds = time.monotonic() - started_at
+
+        self.logger.info(
+            "Directory uploaded",
+            extra={
+                "files": len(files),
+                "bytes": size,
+                "seconds": seconds,
+                "bytes_per_second": size / seconds if seconds else 0.0,
+            },
+        )
+
+    def persist_file(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        src: Path,
+        path: PurePosixPath,
+    ):
+        if self.blobs_prefix is None:
+            self._upload(self._resolve(ref), src, path)
+            return
+
+        entry = self._upload_blob(self._resolve(ref), src, path)
+
+        # Files of a location are uploaded one by one (eg. while downloading):
+        # merge them into its manifest instead of replacing it
+        self._add_to_manifest(ref, {str(path): entry})
+
+    def read_bytes(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        path: PurePosixPath,
+    ) -> bytes | None:
+        store, prefix = self._resolve(ref)
+
+        try:
+            return bytes(obstore.get(store, _join(prefix, path)).bytes())
+        except (NotFoundError, FileNotFoundError):
+            return None
+
+    def persist_bytes(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        data: bytes,
+        path: PurePosixPath,
+    ):
+        store, prefix = self._resolve(ref)
+
+        obstore.put(store, _join(prefix, path), data)
+
+    def stats(self) -> UploadStats:
+        """Return a snapshot of the upload metrics."""
+
+        with self._lock:
+            return UploadStats(
+                files=self._files,
+                bytes=self._bytes,
+                failed=self._failed,
+                seconds=self._seconds,
+                deduplicated=self._deduplicated,
+            )
+
+    def _upload(
+        self,
+        resolved: tuple[ObjectStore, str],
+        src: Path,
+        path: PurePosixPath,
+        manifest: dict[str, dict[str, Any]] | None = None,
+    ) -> int:
+        if self.blobs_prefix is not None:
+            assert manifest is not None
+            manifest[str(path)] = self._upload_blob(resolved, src, path)
+
+            return manifest[str(path)]["size"]
+
+        store, prefix = resolved
+        key = _join(prefix, path)
+        size = src.stat().st_size
+
+        self.logger.debug("Uploading file", extra={"key": key, "size": size})
+
+        started_at = time.monotonic()
+
+        try:
+            obstore.put(
+                store,
+                key,
+                src,
+                chunk_size=self.chunk_size,
+                max_concurrency=self.max_concurrency,
+            )
+        except Exception:
+            with self._lock:
+                self._failed += 1
+
+            raise
+
+        seconds = time.monotonic() - started_at
+
+        with self._lock:
+            self._files += 1
+            self._bytes += size
+            self._seconds += seconds
+
+        return size
+
+    def _upload_blob(
+        self,
+        resolved: tuple[ObjectStore, str],
+        src: Path,
+        path: PurePosixPath,
+    ) -> dict[str, Any]:
+        """Store a file content-addressed and return its manifest entry."""
+
+        store, _ = resolved
+        assert self.blobs_prefix is not None
+
+        # The digest is only known once the file is read:
+        # upload to a staging key while hashing instead of reading the file twice
+        staging = f"{self.blobs_prefix}/staging/{uuid.uuid4().hex}"
+        digest = hashlib.sha256()
+        size = src.stat().st_size
+
+        self.logger.debug("Uploading blob", extra={"path": str(path), "size": size})
+
+        started_at = time.monotonic()
+
+        try:
+            obstore.put(
+                store,
+                staging,
+                _read_hashing(src, digest, self.chunk_size),
+                chunk_size=self.chunk_size,
+                max_concurrency=self.max_concurrency,
+            )
+
+            sha256 = digest.hexdigest()
+            key = f"{self.blobs_prefix}/sha256/{sha256[:2]}/{sha256}"
+
+            try:
+                obstore.head(store, key)
+                deduplicated = True
+            except (NotFoundError, FileNotFoundError):
+                deduplicated = False
+
+            if deduplicated:
+                obstore.delete(store, staging)
+            else:
+                # Concurrent uploads of the same content store identical blobs
+                obstore.rename(store, staging, key)
+        except Exception:
+            with self._lock:
+                self._failed += 1
+
+            raise
+
+        seconds = time.monotonic() - started_at
+
+        with self._lock:
+            self._files += 1
+            self._bytes += size
+            self._seconds += seconds
+            self._deduplicated += deduplicated
+
+        return {"blob": key, "sha256": sha256, "size": size}
+
+    def _add_to_manifest(
+        self,
+        ref: AnyUrl | PurePosixPath,
+        entries: Mapping[str, dict[str, Any]],
+    ):
+        """Merge entries into the manifest of a location."""
+
+        store, prefix = self._resolve(ref)
+        key = _join(prefix, BLOB_MANIFEST)
+
+        # Serializes the updates of this process, conditional puts those of other workers
+        with self._manifest_lock:
+            while True:
+                try:
+                    result = obstore.get(store, key)
+                    files = json.loads(bytes(result.bytes()))["files"]
+                    e_tag = result.meta["e_tag"]
+                    mode: Any = "overwrite" if e_tag is None else {"e_tag": e_tag}
+                except (NotFoundError, FileNotFoundError):
+                    files = {}
+                    mode = "create"
+
+                files.update(entries)
+                data = json.dumps({"files": dict(sorted(files.items()))}).encode()
+
+                try:
+                    obstore.put(store, key, data, mode=mode)
+                    return
+                except (PreconditionError, AlreadyExistsError):
+                    # Updated by another worker in the meantime: merge again
+                    continue
+                except NotSupportedError:
+                    self.logger.warning(
+                        "Store does not support conditional puts, overwriting manifest",
+                        extra={"key": key},
+                    )
+                    obstore.put(store, key, data)
+                    return
+
+    def _resolve(self, ref: AnyUrl | PurePosixPath) -> tuple[ObjectStore, str]:
+        """Return the store and key prefix of a location."""
+
+        if isinstance(ref, AnyUrl):
+            url = str(ref)
+
+            return self.stores.get(url), split_url(url)[1]
+
+        if self.store is None:
+            raise ValueError(f"No store configured for location {ref}")
+
+        prefix = str(ref).strip("/")
+
+        return self.store, "" if prefix == "." else prefix
+
+
+def _join(prefix: str, path: PurePosixPath) -> str:
+    return str(PurePosixPath(prefix, path)) if prefix else str(path)
+
+
+def _read_hashing(file: Path, digest: Any, chunk_size: int) -> Iterator[bytes]:
+    with file.open("rb") as f:
+        while data := f.read(chunk_size):
+            digest.update(data)
+            yield data
+
+
+class ObstoreDownloadArchive:
+    """Download archive storing every key as an empty object under a prefix of an object store."""
+
+    def __init__(self, store: ObjectStore, prefix: str = "archive"):
+        self.store = store
+        self.prefix = prefix.strip("/")
+
+    def __contains__(self, key: str) -> bool:
+        try:
+            obstore.head(self.store, self._key(key))
+        except (NotFoundError, FileNotFoundError):
+            return False
+
+        return True
+
+    def add(self, key: str):
+        obstore.put(self.store, self._key(key), b"")
+
+    def _key(self, key: str) -> str:
+        # Keys contain URLs and arbitrary ids
+        return f"{self.prefix}/{hashlib.sha256(key.encode()).hexdigest()}"
+
+
+class ObstoreCheckpointStore:
+    """
+    Stores checkpoints of partial downloads under a prefix of an object store.
+
+    Partial files are stored incrementally: every checkpoint uploads the bytes
+    appended since the previous one as a new chunk.
+    A manifest per invocation lists the chunks and is written last, so it always
+    describes a consistent state.
+    """
+
+    def __init__(
+        self,
+        store: ObjectStore,
+        prefix: str = "checkpoints",
+        logger: logging.Logger = _logger,
+    ):
+        self.store = store
+        self.prefix = prefix.strip("/")
+        self.logger = logger
+
+    def load(self, id: str) -> dict[str, FileCheckpoint]:
+        try:
+            manifest = obstore.get(self.store, self._key(id, "manifest.json")).bytes()
+        except (NotFoundError, FileNotFoundError):
+            return {}
+
+        return json.loads(bytes(manifest))
+
+    def save(self, id: str, files: dict[str, FileCheckpoint]):
+        obstore.put(
+            self.store,
+            self._key(id, "manifest.json"),
+            json.dumps(files).encode(),
+        )
+
+    def write_chunk(self, id: str, path: str, offset: int, data: Iterator[bytes]):
+        obstore.put(self.store, self._chunk_key(id, path, offset), data)
+
+    def read_chunk(self, id: str, path: str, offset: int) -> Iterator[bytes]:
+        for buffer in obstore.get(self.store, self._chunk_key(id, path, offset)):
+            yield bytes(buffer)
+
+    def delete(self, id: str):
+        keys = [
+            meta["path"]
+            for batch in obstore.list(self.store, self._key(id, ""))
+            for meta in batch
+        ]
+
+        if keys:
+            obstore.delete(self.store, keys)
+
+    def _chunk_key(self, id: str, path: str, offset: int) -> str:
+        return self._key(id, f"chunks/{path}/{offset:020d}")
+
+    def _key(self, id: str, path: str) -> str:
+        return str(PurePosixPath(self.prefix, id, path)) + ("/" if not path else "")
@@ -0,0 +1,116 @@
+from __future__ import annotations
+
+import concurrent.futures
+import logging
+import threading
+from pathlib import Path, PurePosixPath
+from typing import TYPE_CHECKING
+
+from pydantic import AnyUrl
+
+from .manifest import DownloadedFile, describe_file
+
+if TYPE_CHECKING:
+    from .executor import FilePersister, PathFilter
+
+_logger = logging.getLogger(__name__)
+
+
+class StreamingUploader:
+    """
+    Uploads files as soon as yt-dlp finishes them, while the rest of the download continues.
+
+    Register submit as a yt-dlp post hook: it is called with the final path of every video
+    once all postprocessors ran. Uploaded files are deleted to free up local disk space.
+    Call finish once yt-dlp returned to upload remaining files (eg. thumbnails or subtitles).
+    """
+
+    def __init__(
+        self,
+        persister: FilePersister,
+        ref: AnyUrl | PurePosixPath,
+        root: Path,
+        filter: PathFilter | None = None,
+        checksums: bool = False,
+        max_workers: int = 4,
+        logger: logging.Logger | logging.LoggerAdapter = _logger,
+    ):
+        self.persister = persister
+        self.ref = ref
+        self.root = root.resolve()
+        self.filter = filter
+        self.checksums = checksums
+        self.logger = logger
+
+        self._pool = concurrent.futures.ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix="restate-yt-dlp-upload",
+        )
+        self._futures: list[concurrent.futures.Future[None]] = []
+        self._submitted: set[PurePosixPath] = set()
+        self._uploaded: list[DownloadedFile] = []
+        self._lock = threading.Lock()
+
+    @property
+    def files(self) -> list[DownloadedFile]:
+        """Manifest entries of the uploaded files."""
+
+        with self._lock:
+            return list(self._uploaded)
+
+    def submit(self, filepath: str):
+        """Schedule uploading a finished file."""
+
+        src = Path(filepath).resolve()
+
+        try:
+            path = PurePosixPath(src.relative_to(self.root).as_posix())
+        except ValueError:
+            self.logger.warning(
+                "Skipping file outside of the download directory",
+                extra={"path": filepath},
+            )
+            return
+
+        with self._lock:
+            if path in self._submitted:
+                return
+
+            self._submitted.add(path)
+
+        if self.filter is not None and not self.filter.match(path):
+            return
+
+        self._futures.append(self._pool.submit(self._upload, src, path))
+
+    def finish(self):
+        """Upload the remaining files and wait for every upload to complete."""
+
+        try:
+            for file in sorted(self.root.rglob("*")):
+                if file.is_file():
+                    self.submit(str(file))
+
+            for future in concurrent.futures.as_completed(self._futures):
+                future.result()
+        finally:
+            self.abort()
+
+    def abort(self):
+        """Cancel pending uploads (eg. because the download failed)."""
+
+        self._pool.shutdown(wait=True, cancel_futures=True)
+
+    def _upload(self, src: Path, path: PurePosixPath):
+        # Described before uploading: the file is deleted afterwards
+        file = describe_file(src, path, self.checksums)
+
+        self.persister.persist_file(self.ref, src, path)
+
+        self.logger.info("File uploaded", extra={"path": str(path)})
+
+        with self._lock:
+            self._uploaded.append(file)
+
+        # Uploaded files are not needed locally anymore
+        src.unlink(missing_ok=True)
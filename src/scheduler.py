@@ -0,0 +1,163 @@
+from glide_sync import Script, TGlideClient
+
+from .restate_yt_dlp.scheduler import MAX_PENALTY, SiteLimit
+
+# Token bucket refilled at the rate divided by the penalty, plus the slots of requests in flight
+# (scored by their expiry, so slots of crashed workers are freed eventually).
+# Returns the seconds to wait before trying again (as a string: Lua numbers are truncated to integers),
+# 0 if the request started and -1 if every slot is taken.
+_ACQUIRE_SCRIPT = Script(
+    """
+    local time = redis.call("TIME")
+    local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+    local rate = tonumber(ARGV[2])
+    local burst = tonumber(ARGV[3])
+    local max_in_flight = tonumber(ARGV[4])
+
+    local state = redis.call("HMGET", KEYS[1], "tokens", "updated_at", "penalty", "paused_until")
+    local tokens = tonumber(state[1]) or burst
+    local updated_at = tonumber(state[2]) or now
+    local penalty = tonumber(state[3]) or 1
+    local paused_until = tonumber(state[4]) or 0
+
+    if now < paused_until then
+        return tostring(paused_until - now)
+    end
+
+    if max_in_flight > 0 then
+        redis.call("ZREMRANGEBYSCORE", KEYS[2], "-inf", now)
+
+        if redis.call("ZCARD", KEYS[2]) >= max_in_flight then
+            return "-1"
+        end
+    end
+
+    if rate > 0 then
+        tokens = math.min(burst, tokens + (now - updated_at) * rate / penalty)
+
+        if tokens < 1 then
+            redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+            redis.call("EXPIRE", KEYS[1], ARGV[6])
+            return tostring((1 - tokens) * penalty / rate)
+        end
+
+        tokens = tokens - 1
+    end
+
+    redis.call("HSET", KEYS[1], "tokens", tostring(tokens), "updated_at", tostring(now))
+    redis.call("EXPIRE", KEYS[1], ARGV[6])
+
+    if max_in_flight > 0 then
+        redis.call("ZADD", KEYS[2], now + tonumber(ARGV[5]), ARGV[1])
+        redis.call("EXPIRE", KEYS[2], ARGV[6])
+    end
+
+    return "0"
+    """
+)
+
+# Frees the slot and pauses the site (doubling the penalty) if it throttled the request,
+# for the backoff or the Retry-After asked for, at most the maximum backoff
+_RELEASE_SCRIPT = Script(
+    """
+    redis.call("ZREM", KEYS[2], ARGV[1])
+
+    local penalty = tonumber(redis.call("HGET", KEYS[1], "penalty")) or 1
+
+    if ARGV[2] == "1" then
+        local time = redis.call("TIME")
+        local now = tonumber(time[1]) + tonumber(time[2]) / 1000000
+        local paused_until = tonumber(redis.call("HGET", KEYS[1], "paused_until")) or 0
+        local pause = math.min(tonumber(ARGV[5]), math.max(tonumber(ARGV[3]), tonumber(ARGV[4]) * penalty))
+
+        redis.call(
+            "HSET", KEYS[1],
+            "paused_until", tostring(math.max(paused_until, now + pause)),
+            "penalty", tostring(math.min(penalty * 2, tonumber(ARGV[6]))),
+            "tokens", "0",
+            "updated_at", tostring(now)
+        )
+        redis.call("EXPIRE", KEYS[1], ARGV[7])
+    elseif penalty > 1 then
+        redis.call("HSET", KEYS[1], "penalty", tostring(math.max(1, penalty / 2)))
+    end
+
+    return 1
+    """
+)
+
+
+class ValkeySchedulerBackend:
+    """
+    Limits requests across workers sharing a Valkey instance.
+
+    Slots of requests in flight expire after the lease: crashed workers free them eventually
+    (requests running longer than the lease stop counting towards the maximum in flight).
+    """
+
+    KEY_PREFIX = "yt-dlp:scheduler"
+
+    def __init__(
+        self,
+        client: TGlideClient,
+        lease: float = 3600.0,
+        ttl: int = 86400,
+    ):
+        """
+        Args:
+            client: Valkey client.
+            lease: Seconds after which slots of requests in flight expire.
+            ttl: Seconds after which the state of unused sites expires.
+        """
+
+        self.client = client
+        self.lease = lease
+        self.ttl = ttl
+
+    def acquire(self, key: str, limit: SiteLimit, token: str) -> float:
+        wait = float(
+            self.client.invoke_script(
+                _ACQUIRE_SCRIPT,
+                self._keys(key),
+                [
+                    token,
+                    str(limit.rate or 0),
+                    str(limit.burst),
+                    str(limit.max_in_flight or 0),
+                    str(self.lease),
+                    str(self.ttl),
+                ],
+            )  # pyright: ignore[reportArgumentType]
+        )
+
+        # Every slot is taken: released slots are picked up on the next poll
+        return float("inf") if wait < 0 else wait
+
+    def release(
+        self,
+        key: str,
+        limit: SiteLimit,
+        token: str,
+        throttled: bool = False,
+        retry_after: float | None = None,
+    ):
+        self.client.invoke_script(
+            _RELEASE_SCRIPT,
+            self._keys(key),
+            [
+                token,
+                "1" if throttled else "0",
+                str(retry_after or 0),
+                str(limit.backoff),
+                str(limit.max_backoff),
+                str(MAX_PENALTY),
+                str(self.ttl),
+            ],
+        )
+
+    def _keys(self, key: str) -> list[str]:
+        # Same hash slot in cluster mode
+        return [
+            f"{self.KEY_PREFIX}:bucket:{{{key}}}",
+            f"{self.KEY_PREFIX}:in-flight:{{{key}}}",
+        ]
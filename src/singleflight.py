@@ -0,0 +1,170 @@
+import logging
+import threading
+import time
+import uuid
+from collections.abc import Callable
+
+from glide_sync import ConditionalChange, ExpirySet, ExpiryType, Script, TGlideClient
+
+from .restate_yt_dlp import serde
+from .restate_yt_dlp.singleflight import SingleFlightBusyError
+
+_logger = logging.getLogger(__name__)
+
+# Extend or release the lease only if it is still held by the caller
+_RENEW_SCRIPT = Script(
+    """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("PEXPIRE", KEYS[1], ARGV[2])
+    end
+    return 0
+    """
+)
+_RELEASE_SCRIPT = Script(
+    """
+    if redis.call("GET", KEYS[1]) == ARGV[1] then
+        return redis.call("DEL", KEYS[1])
+    end
+    return 0
+    """
+)
+
+
+class ValkeySingleFlight:
+    """
+    Deduplicates calls across workers using leases in Valkey.
+
+    The leader holds a lease (renewed while the call runs) and records its (JSON encoded) result
+    under its lease token when done.
+    Followers poll for the outcome of the lease they waited on and take over when the lease is released
+    without success (the call failed) or expires (eg. the leader crashed).
+    Results are only returned to callers that waited for the call: later calls run again.
+    """
+
+    KEY_PREFIX = "yt-dlp:singleflight"
+
+    def __init__(
+        self,
+        client: TGlideClient,
+        lease: float = 30.0,
+        poll_interval: float = 1.0,
+        result_ttl: int = 60,
+        max_wait: float = 600.0,
+        logger: logging.Logger = _logger,
+    ):
+        """
+        Args:
+            client: Valkey client.
+            lease: Seconds after which the lease of a crashed leader expires.
+            poll_interval: Seconds between checks of followers for the outcome.
+            result_ttl: Seconds the result of a successful call is kept for the followers waiting for it.
+            max_wait: Seconds after which followers fail with a (retryable) SingleFlightBusyError.
+        """
+
+        self.client = client
+        self.lease = lease
+        self.poll_interval = poll_interval
+        self.result_ttl = result_ttl
+        self.max_wait = max_wait
+        self.logger = logger
+
+    def run[T](self, key: str, fn: Callable[[], T]) -> T:
+        lease_key = f"{self.KEY_PREFIX}:lease:{{{key}}}"
+        token = uuid.uuid4().hex
+        deadline = time.monotonic() + self.max_wait
+
+        waiting = False
+
+        # Token of the leader waited on
+        leader: str | None = None
+
+        while True:
+            holder = self.client.get(lease_key)
+
+            if holder is not None:
+                leader = holder.decode() if isinstance(holder, bytes) else str(holder)
+
+            if leader is not None:
+                # Check the outcome first: the leader records it before releasing the lease
+                result = self.client.get(self._result_key(key, leader))
+
+                if result is not None:
+                    return serde.loads(result)
+
+            acquired = self.client.set(
+                lease_key,
+                token,
+                conditional_set=ConditionalChange.ONLY_IF_DOES_NOT_EXIST,
+                expiry=ExpirySet(ExpiryType.MILLSEC, int(self.lease * 1000)),
+            )
+
+            if acquired is not None:
+                break
+
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                raise SingleFlightBusyError(
+                    f"Identical call still in flight, retry later (waited {self.max_wait:g}s)"
+                )
+
+            if not waiting:
+                waiting = True
+                self.logger.info(
+                    "Waiting for identical call in flight",
+                    extra={"key": key},
+                )
+
+            time.sleep(min(self.poll_interval, remaining))
+
+        stop = threading.Event()
+        renewer = threading.Thread(
+            target=self._renew,
+            args=(lease_key, token, stop),
+            name="restate-yt-dlp-singleflight",
+            daemon=True,
+        )
+        renewer.start()
+
+        ok = False
+
+        try:
+            result = fn()
+            ok = True
+
+            return result
+        finally:
+            stop.set()
+            renewer.join()
+
+            try:
+                if ok:
+                    self.client.set(
+                        self._result_key(key, token),
+                        serde.dumps(result),
+                        expiry=ExpirySet(ExpiryType.SEC, self.result_ttl),
+                    )
+
+                self.client.invoke_script(_RELEASE_SCRIPT, [lease_key], [token])
+            except Exception:
+                # Followers take over once the lease expires
+                self.logger.exception("Failed to release lease", extra={"key": key})
+
+    def _result_key(self, key: str, token: str) -> str:
+        return f"{self.KEY_PREFIX}:result:{{{key}}}:{token}"
+
+    def _renew(self, lease_key: str, token: str, stop: threading.Event):
+        while not stop.wait(self.lease / 3):
+            try:
+                renewed = self.client.invoke_script(
+                    _RENEW_SCRIPT,
+                    [lease_key],
+                    [token, str(int(self.lease * 1000))],
+                )
+            except Exception:
+                self.logger.exception("Failed to renew lease")
+                continue
+
+            if not renewed:
+                self.logger.warning("Lease lost", extra={"key": lease_key})
+                return
@@ -0,0 +1,196 @@
+from pathlib import Path, PurePosixPath
+
+import pytest
+from obstore.store import MemoryStore
+
+from restate_yt_dlp import serde
+from restate_yt_dlp.archive import ScopedArchive
+from restate_yt_dlp.executor import DOWNLOAD_MARKER, DownloadRequest, Executor
+from restate_yt_dlp.storage import ObstoreDownloadArchive, ObstorePersister
+
+
+@pytest.fixture
+def downloads(ydl) -> list[str]:
+    """Videos downloaded by yt-dlp (unless recorded in the download archive)."""
+
+    downloads: list[str] = []
+
+    def extract(ydl, url):
+        archive = ydl.params.get("download_archive")
+
+        info = {"id": "abc", "title": "Video", "duration": 10}
+
+        if archive and "youtube abc" in archive:
+            # yt-dlp skips archived videos before extracting them
+            return None
+
+        downloads.append(info["id"])
+        (ydl.home / "abc.mp4").write_bytes(b"video")
+
+        if archive is not None:
+            archive.add("youtube abc")
+
+        return info
+
+    ydl.extract = extract
+
+    return downloads
+
+
+class MarkerPersister:
+    def __init__(self):
+        self.files: dict[PurePosixPath, bytes] = {}
+
+    def persist(self, ref, src, filter=None):
+        for file in Path(src).iterdir():
+            self.files[PurePosixPath(file.name)] = file.read_bytes()
+
+    def read_bytes(self, ref, path):
+        return self.files.get(path)
+
+    def persist_bytes(self, ref, data, path):
+        self.files[path] = data
+
+
+def _request(location: str = "videos/abc", skip_existing: bool = True):
+    return DownloadRequest(
+        url="https://example.com/video",
+        output={"location": location},  # type: ignore[arg-type]
+        skip_existing=skip_existing,
+    )
+
+
+class TestScopedArchive:
+    """Tests for ScopedArchive."""
+
+    def test_records_on_commit(self):
+        """Test that downloaded videos are only recorded once committed."""
+        shared: set[str] = set()
+        archive = ScopedArchive(shared, "videos/abc")
+
+        archive.add("youtube abc")
+
+        assert "youtube abc" in archive
+        assert shared == set()
+
+        archive.commit()
+
+        assert shared == {"videos/abc youtube abc"}
+
+    def test_scoped(self):
+        """Test that videos downloaded to other locations are not skipped."""
+        shared = {"videos/abc youtube abc"}
+
+        assert "youtube abc" in ScopedArchive(shared, "videos/abc")
+        assert "youtube abc" not in ScopedArchive(shared, "videos/other")
+
+    def test_empty_archive_is_checked(self):
+        """Test that yt-dlp checks the archive even if nothing was recorded locally."""
+        assert ScopedArchive(set(), "videos/abc")
+
+
+class TestObstoreDownloadArchive:
+    """Tests for ObstoreDownloadArchive."""
+
+    def test_add(self):
+        """Test that added keys are found by every instance sharing the store."""
+        store = MemoryStore()
+
+        ObstoreDownloadArchive(store).add("videos/abc youtube abc")
+
+        assert "videos/abc youtube abc" in ObstoreDownloadArchive(store)
+        assert "videos/abc youtube def" not in ObstoreDownloadArchive(store)
+
+
+class TestObstorePersisterMarker:
+    """Tests for download markers of ObstorePersister."""
+
+    def test_read_bytes(self):
+        """Test that persisted markers are read back from the location."""
+        persister = ObstorePersister(MemoryStore())
+        location = PurePosixPath("videos/abc")
+
+        assert persister.read_bytes(location, DOWNLOAD_MARKER) is None
+
+        persister.persist_bytes(location, b"{}", DOWNLOAD_MARKER)
+
+        assert persister.read_bytes(location, DOWNLOAD_MARKER) == b"{}"
+        assert (
+            persister.read_bytes(PurePosixPath("videos/def"), DOWNLOAD_MARKER) is None
+        )
+
+
+class TestExecutorSkipExisting:
+    """Tests for skipping existing outputs."""
+
+    def test_marker(self, downloads):
+        """Test that a repeated download returns without running yt-dlp."""
+        persister = MarkerPersister()
+        executor = Executor(persister)
+
+        response = executor.download("inv_1", _request())
+        skipped = executor.download("inv_2", _request())
+
+        assert len(downloads) == 1
+        assert skipped == {**response, "skipped": True}
+
+    def test_opt_in(self, downloads):
+        """Test that outputs are downloaded again unless skipping is requested, but markers are written."""
+        persister = MarkerPersister()
+        executor = Executor(persister, archive=set())
+
+        executor.download("inv_1", _request(skip_existing=False))
+        executor.download("inv_2", _request(skip_existing=False))
+
+        assert len(downloads) == 2
+        assert DOWNLOAD_MARKER in persister.files
+
+        executor.download("inv_3", _request())
+
+        assert len(downloads) == 2
+
+    def test_without_marker_persister(self, downloads, persister, caplog):
+        """Test that skipping without a marker-capable persister is reported."""
+        Executor(persister).download("inv_1", _request())
+
+        assert "does not support download markers" in caplog.text
+
+    def test_archive(self, downloads):
+        """Test that archived videos are skipped by other workers."""
+        archive: set[str] = set()
+        first, second = MarkerPersister(), MarkerPersister()
+
+        response = Executor(first, archive=archive).download("inv_1", _request())
+        skipped = Executor(second, archive=archive).download("inv_2", _request())
+        Executor(MarkerPersister(), archive=archive).download(
+            "inv_3", _request("videos/other")
+        )
+
+        assert len(downloads) == 2
+        assert archive == {"videos/abc youtube abc", "videos/other youtube abc"}
+        assert response["files"][0]["path"] == "abc.mp4"
+        assert skipped == {
+            "id": None,
+            "title": None,
+            "duration": None,
+            "files": [],
+            "skipped": True,
+        }
+        assert serde.loads(first.files[DOWNLOAD_MARKER]) == response
+        assert DOWNLOAD_MARKER not in second.files
+
+    def test_archive_keeps_marker(self, downloads, monkeypatch):
+        """Test that downloads skipped by the archive do not overwrite the marker."""
+        persister = MarkerPersister()
+        archive: set[str] = set()
+
+        response = Executor(persister, archive=archive).download("inv_1", _request())
+
+        # Eg. the marker could not be read: the archive still skips the download
+        monkeypatch.setattr(persister, "read_bytes", lambda ref, path: None)
+
+        skipped = Executor(persister, archive=archive).download("inv_2", _request())
+
+        assert len(downloads) == 1
+        assert skipped["skipped"]
+        assert serde.loads(persister.files[DOWNLOAD_MARKER]) == response
@@ -0,0 +1,116 @@
+import pytest
+from yt_dlp.networking.exceptions import TransportError
+from yt_dlp.utils import DownloadError, ExtractorError
+
+from restate_yt_dlp.cache import MemoryInfoCache
+from restate_yt_dlp.executor import Executor, ExtractInfoBatchRequest
+
+
+def _extract(ydl, url):
+    if url.endswith("/unsupported"):
+        raise ExtractorError("Unsupported URL")
+
+    if url.endswith("/flaky"):
+        raise DownloadError("Connection reset", (None, TransportError("reset"), None))
+
+    return {
+        "id": url.rsplit("/", 1)[-1],
+        "title": "Video",
+        "formats": [{"format_id": "18", "url": "https://media.example.com/v"}],
+    }
+
+
+@pytest.fixture(autouse=True)
+def ydl(ydl):
+    ydl.extract = _extract
+
+    return ydl
+
+
+def _request(urls: list[str], **kwargs) -> ExtractInfoBatchRequest:
+    return ExtractInfoBatchRequest(urls=urls, **kwargs)
+
+
+class TestExtractInfoBatch:
+    """Tests for Executor.extract_info_batch."""
+
+    def test_results_in_order(self, persister):
+        """Test that results are returned in the order of the requested URLs."""
+        urls = [f"https://example.com/{index}" for index in range(20)]
+
+        response = Executor(persister).extract_info_batch(
+            "inv_1", _request(urls, fields=["id"], concurrency=4)
+        )
+
+        assert response["results"] == [
+            {"url": url, "info": {"id": str(index)}} for index, url in enumerate(urls)
+        ]
+
+    def test_reuses_youtube_dl(self, ydl, persister):
+        """Test that every worker configures a single YoutubeDL for the batch."""
+        urls = [f"https://example.com/{index}" for index in range(20)]
+
+        Executor(persister).extract_info_batch("inv_1", _request(urls, concurrency=4))
+
+        assert 1 <= len(ydl.instances) <= 4
+        assert all(instance.closed for instance in ydl.instances)
+        assert sorted(url for y in ydl.instances for url in y.urls) == sorted(urls)
+
+    def test_concurrency_capped(self, ydl, persister):
+        """Test that requests cannot run more workers than the server allows."""
+        urls = [f"https://example.com/{index}" for index in range(20)]
+
+        Executor(persister, max_batch_concurrency=1).extract_info_batch(
+            "inv_1", _request(urls, concurrency=8)
+        )
+
+        assert len(ydl.instances) == 1
+
+    def test_failures_per_url(self, persister):
+        """Test that failures are reported per URL and classified as retryable or not."""
+        response = Executor(persister).extract_info_batch(
+            "inv_1",
+            _request(
+                [
+                    "https://example.com/unsupported",
+                    "https://example.com/flaky",
+                    "https://example.com/ok",
+                ]
+            ),
+        )
+
+        unsupported, flaky, ok = response["results"]
+
+        assert unsupported["retryable"] is False
+        assert "Unsupported URL" in unsupported["error"]
+        assert flaky["retryable"] is True
+        assert ok["info"]["id"] == "ok"
+
+    def test_unexpected_errors(self, ydl, persister, monkeypatch):
+        """Test that errors other than yt-dlp errors are not reported as retryable failures."""
+        monkeypatch.setattr(
+            "restate_yt_dlp.executor.project",
+            lambda info, fields: info["missing"],
+        )
+
+        with pytest.raises(KeyError):
+            Executor(persister).extract_info_batch(
+                "inv_1", _request(["https://example.com/a"])
+            )
+
+        assert all(instance.closed for instance in ydl.instances)
+
+    def test_uses_cache(self, ydl, persister):
+        """Test that cached results are returned without extraction."""
+        executor = Executor(persister, info_cache=MemoryInfoCache())
+        urls = ["https://example.com/a", "https://example.com/b"]
+
+        executor.extract_info_batch("inv_1", _request(urls))
+        executor.extract_info_batch("inv_2", _request(urls))
+
+        assert ydl.calls == 2
+
+    def test_invalid_fields(self):
+        """Test that invalid field paths are rejected."""
+        with pytest.raises(ValueError):
+            _request(["https://example.com/a"], fields=["formats..url"])
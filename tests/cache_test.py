@@ -0,0 +1,214 @@
+import time
+
+import pytest
+
+from restate_yt_dlp.cache import (
+    MemoryInfoCache,
+    TieredInfoCache,
+    cache_key,
+    media_expiry,
+)
+from restate_yt_dlp.executor import DownloadRequest, Executor, ExtractInfoRequest
+from restate_yt_dlp.fingerprint import normalize_url
+
+
+def _download_request(**kwargs) -> DownloadRequest:
+    return DownloadRequest(
+        url="https://example.com/watch?v=abc",
+        output={"location": "s3://bucket/abc/"},  # type: ignore[arg-type]
+        **kwargs,
+    )
+
+
+def _request(**kwargs) -> ExtractInfoRequest:
+    return ExtractInfoRequest(url="https://example.com/watch?v=abc", **kwargs)
+
+
+class TestCacheKey:
+    """Tests for cache keys."""
+
+    def test_normalize_url(self):
+        """Test that equivalent URLs normalize to the same string."""
+        assert normalize_url(
+            "HTTPS://Example.COM:443/watch?v=abc&utm_source=x&a=1#t=10"
+        ) == normalize_url("https://example.com/watch?a=1&v=abc")
+
+    def test_params(self):
+        """Test that keys depend on relevant params only."""
+        url = "https://example.com/watch?v=abc"
+
+        assert cache_key(url, {"format": "best"}) != cache_key(url, {"format": "worst"})
+        assert cache_key(url, {"format": "best", "logger": object()}) == cache_key(
+            url, {"format": "best"}
+        )
+
+    def test_unserializable_params(self):
+        """Test that params influencing results must be serializable to JSON."""
+        with pytest.raises(ValueError, match="match_filter"):
+            cache_key("https://example.com/watch?v=abc", {"match_filter": len})
+
+    def test_media_expiry(self):
+        """Test that the earliest media URL expiry is found."""
+        info = {
+            "formats": [
+                {"url": "https://media.example.com/1?expire=2000"},
+                {"url": "https://media.example.com/2?expire=1000"},
+                {"url": "https://media.example.com/3"},
+            ]
+        }
+
+        assert media_expiry(info) == 1000
+        assert media_expiry({"formats": [{"url": "https://example.com"}]}) is None
+
+
+class TestMemoryInfoCache:
+    """Tests for MemoryInfoCache."""
+
+    def test_lru_eviction(self):
+        """Test that the least recently used entry is evicted."""
+        cache = MemoryInfoCache(max_entries=2)
+
+        cache.set("a", b"1")
+        cache.set("b", b"2")
+        cache.get("a")
+        cache.set("c", b"3")
+
+        assert cache.get("b") is None
+        assert cache.get("a") == b"1"
+        assert cache.stats().evictions == 1
+
+    def test_max_bytes(self):
+        """Test that entries are evicted to stay within the size limit."""
+        cache = MemoryInfoCache(max_bytes=5)
+
+        cache.set("a", b"123")
+        cache.set("b", b"456")
+        cache.set("c", b"123456")
+
+        assert cache.get("a") is None
+        assert cache.get("b") == b"456"
+        assert cache.get("c") is None
+        assert cache.stats().bytes == 3
+
+    def test_ttl(self):
+        """Test that entries expire after the shorter of the cache and entry TTL."""
+        cache = MemoryInfoCache(ttl=60)
+
+        cache.set("a", b"1", ttl=0.01)
+        cache.set("b", b"2", ttl=3600)
+        time.sleep(0.02)
+
+        assert cache.get("a") is None
+        assert cache.get("b") == b"2"
+
+    def test_tiered_backfill(self):
+        """Test that hits in a later tier are copied to earlier tiers."""
+        local = MemoryInfoCache()
+        shared = MemoryInfoCache()
+        cache = TieredInfoCache(local, shared)
+
+        shared.set("a", b"1")
+
+        assert cache.get("a") == b"1"
+        assert local.get("a") == b"1"
+
+    def test_tiered_backfill_ttl(self):
+        """Test that entries copied to earlier tiers expire with the later tier's entry."""
+        local = MemoryInfoCache(ttl=3600)
+        shared = MemoryInfoCache(ttl=3600)
+        cache = TieredInfoCache(local, shared)
+
+        shared.set("a", b"1", ttl=0.05)
+
+        assert cache.get("a") == b"1"
+        assert local.expires_in("a") == pytest.approx(0.05, abs=0.05)
+
+        time.sleep(0.1)
+
+        assert cache.get("a") is None
+
+
+class TestExecutorInfoCache:
+    """Tests for caching extraction results in the executor."""
+
+    def test_cache_modes(self, ydl):
+        """Test that results are cached and the cache can be bypassed or refreshed."""
+        executor = Executor(object(), info_cache=MemoryInfoCache())  # type: ignore[arg-type]
+
+        assert executor.extract_info("1", _request())["title"] == "Video 1"
+        assert executor.extract_info("2", _request())["title"] == "Video 1"
+        assert (
+            executor.extract_info("3", _request(cache="bypass"))["title"] == "Video 2"
+        )
+        assert executor.extract_info("4", _request())["title"] == "Video 1"
+        assert (
+            executor.extract_info("5", _request(cache="refresh"))["title"] == "Video 3"
+        )
+        assert executor.extract_info("6", _request())["title"] == "Video 3"
+        assert ydl.calls == 3
+
+    def test_expiring_media_urls(self, ydl):
+        """Test that results with (nearly) expired media URLs are not served from cache."""
+        cache = MemoryInfoCache()
+        executor = Executor(object(), info_cache=cache, info_cache_margin=60)  # type: ignore[arg-type]
+
+        ydl.media_url += f"?expire={int(time.time() + 30)}"
+        executor.extract_info("1", _request())
+
+        assert cache.stats().entries == 0
+
+        ydl.media_url = (
+            f"https://media.example.com/video.mp4?expire={int(time.time() + 3600)}"
+        )
+        executor.extract_info("2", _request())
+        executor.extract_info("3", _request())
+
+        assert ydl.calls == 2
+
+    def test_undecodable_entry(self, ydl):
+        """Test that undecodable entries are misses and deleted."""
+        cache = MemoryInfoCache()
+        executor = Executor(object(), info_cache=cache)  # type: ignore[arg-type]
+        key = cache_key(_request().url, {})
+        cache.set(key, b"\x00 not json")
+
+        assert executor.extract_info("1", _request())["title"] == "Video 1"
+        assert ydl.calls == 1
+
+
+class TestDownloadInfoReuse:
+    """Tests for downloading from previously extracted info."""
+
+    def test_uses_request_info(self, ydl, persister):
+        """Test that info passed in the request is downloaded without extraction."""
+        executor = Executor(persister)
+        info = {"id": "abc", "formats": [{"url": "https://media.example.com/v"}]}
+
+        executor.download("1", _download_request(info=info))
+
+        assert ydl.calls == 0
+        assert ydl.processed == [info]
+
+    def test_uses_cached_info(self, ydl, persister):
+        """Test that cached extraction results are downloaded without extraction."""
+        executor = Executor(persister, info_cache=MemoryInfoCache())
+
+        executor.extract_info("1", _request())
+        executor.download("2", _download_request())
+
+        assert ydl.calls == 1
+
+        executor.download("3", _download_request(cache="bypass"))
+
+        assert ydl.calls == 2
+
+    def test_expired_info(self, ydl, persister):
+        """Test that info with expired media URLs is extracted again."""
+        executor = Executor(persister)
+        expired = f"https://media.example.com/v?expire={int(time.time())}"
+        info = {"id": "abc", "formats": [{"url": expired}]}
+
+        executor.download("1", _download_request(info=info))
+
+        assert ydl.calls == 1
+        assert ydl.processed[0]["title"] == "Video 1"
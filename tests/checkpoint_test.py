@@ -0,0 +1,172 @@
+from pathlib import Path
+
+import obstore
+import pytest
+from obstore.store import MemoryStore
+
+from restate_yt_dlp.checkpoint import Checkpointer
+from restate_yt_dlp.executor import DownloadRequest, Executor
+from restate_yt_dlp.storage import ObstoreCheckpointStore
+
+
+def _keys(store: MemoryStore) -> list[str]:
+    return sorted(meta["path"] for batch in obstore.list(store) for meta in batch)
+
+
+def _progress(root: Path) -> dict:
+    return {
+        "status": "downloading",
+        "filename": str(root / "video.mp4"),
+        "tmpfilename": str(root / "video.mp4.part"),
+    }
+
+
+@pytest.fixture
+def checkpoints() -> ObstoreCheckpointStore:
+    return ObstoreCheckpointStore(MemoryStore())
+
+
+def _flaky(resumed: list[int]):
+    """Download some fragments, then fail unless resuming from a previous attempt."""
+
+    def extract(ydl, url):
+        part = ydl.home / "video.mp4.part"
+        ytdl = ydl.home / "video.mp4.ytdl"
+
+        if part.exists():
+            resumed.append(part.stat().st_size)
+            part.rename(ydl.home / "video.mp4")
+            ytdl.unlink()
+            return
+
+        part.write_bytes(b"fragment-1")
+        ytdl.write_text('{"downloader": {"current_fragment": {"index": 1}}}')
+
+        for hook in ydl.params["progress_hooks"]:
+            hook(_progress(ydl.home))
+
+        raise OSError("connection reset")
+
+    return extract
+
+
+class TestCheckpointer:
+    """Tests for Checkpointer."""
+
+    def test_incremental_checkpoints(self, checkpoints, tmp_path):
+        """Test that only bytes appended since the last checkpoint are uploaded."""
+        (tmp_path / "a").mkdir()
+        part = tmp_path / "a" / "video.mp4.part"
+
+        checkpointer = Checkpointer(checkpoints, "inv_1", tmp_path / "a", interval=0)
+
+        part.write_bytes(b"x" * 10)
+        checkpointer.progress_hook(_progress(tmp_path / "a"))
+        checkpointer.close()
+
+        checkpointer = Checkpointer(checkpoints, "inv_1", tmp_path / "a", interval=0)
+        checkpointer.restore()
+
+        part.write_bytes(b"x" * 10 + b"y" * 15)
+        (tmp_path / "a" / "video.mp4.ytdl").write_text("state")
+        checkpointer.progress_hook(_progress(tmp_path / "a"))
+        checkpointer.close()
+
+        assert checkpoints.load("inv_1") == {
+            "video.mp4.part": {"chunks": [[0, 10], [10, 15]], "ytdl": "state"}
+        }
+
+    def test_restore(self, checkpoints, tmp_path):
+        """Test that partial files and fragment state are restored on another node."""
+        (tmp_path / "a").mkdir()
+        (tmp_path / "a" / "video.mp4.part").write_bytes(b"partial")
+        (tmp_path / "a" / "video.mp4.ytdl").write_text("state")
+
+        checkpointer = Checkpointer(checkpoints, "inv_1", tmp_path / "a", interval=0)
+        checkpointer.progress_hook(_progress(tmp_path / "a"))
+        checkpointer.close()
+
+        (tmp_path / "b").mkdir()
+        Checkpointer(checkpoints, "inv_1", tmp_path / "b").restore()
+
+        assert (tmp_path / "b" / "video.mp4.part").read_bytes() == b"partial"
+        assert (tmp_path / "b" / "video.mp4.ytdl").read_text() == "state"
+
+    def test_restarted_file(self, checkpoints, tmp_path):
+        """Test that checkpoints start over when yt-dlp truncates the partial file."""
+        part = tmp_path / "video.mp4.part"
+        checkpointer = Checkpointer(checkpoints, "inv_1", tmp_path, interval=0)
+
+        part.write_bytes(b"x" * 10)
+        checkpointer.progress_hook(_progress(tmp_path))
+        checkpointer.close()
+
+        checkpointer = Checkpointer(checkpoints, "inv_1", tmp_path, interval=0)
+        checkpointer.restore()
+
+        part.write_bytes(b"y" * 4)
+        checkpointer.progress_hook(_progress(tmp_path))
+        checkpointer.close()
+
+        assert checkpoints.load("inv_1")["video.mp4.part"]["chunks"] == [[0, 4]]
+
+    def test_shrunk_file(self, checkpoints, tmp_path, monkeypatch):
+        """Test that checkpoints are dropped when the file shrinks while it is uploaded."""
+        part = tmp_path / "video.mp4.part"
+        part.write_bytes(b"x" * 10)
+
+        stat = Path.stat
+
+        def stale_stat(self, *args, **kwargs):
+            # Size of the snapshot, before yt-dlp truncated the file
+            result = stat(self, *args, **kwargs)
+
+            if self == part:
+                part.write_bytes(b"y" * 4)
+
+            return result
+
+        monkeypatch.setattr(Path, "stat", stale_stat)
+
+        checkpointer = Checkpointer(checkpoints, "inv_1", tmp_path, interval=0)
+        checkpointer.progress_hook(_progress(tmp_path))
+        checkpointer.close()
+
+        assert checkpoints.load("inv_1") == {}
+
+    def test_discard(self, checkpoints, tmp_path):
+        """Test that discarding removes every checkpoint object."""
+        (tmp_path / "video.mp4.part").write_bytes(b"x")
+
+        checkpointer = Checkpointer(checkpoints, "inv_1", tmp_path, interval=0)
+        checkpointer.progress_hook(_progress(tmp_path))
+        checkpointer.close()
+
+        assert _keys(checkpoints.store)
+
+        checkpointer.discard()
+
+        assert _keys(checkpoints.store) == []
+
+
+class TestExecutorCheckpoints:
+    """Tests for resuming downloads from checkpoints."""
+
+    def test_resumes_on_another_node(self, checkpoints, ydl, persister):
+        """Test that a retry in a fresh directory resumes from the checkpoint."""
+        resumed: list[int] = []
+        ydl.extract = _flaky(resumed)
+
+        executor = Executor(persister, checkpoints=checkpoints, checkpoint_interval=0)
+        request = DownloadRequest(
+            url="https://example.com/video",
+            output={"location": "videos/abc"},  # type: ignore[arg-type]
+        )
+
+        with pytest.raises(OSError):
+            executor.download("inv_1", request)
+
+        executor.download("inv_1", request)
+
+        assert resumed == [len(b"fragment-1")]
+        assert _keys(checkpoints.store) == []
@@ -0,0 +1,190 @@
+import threading
+from collections.abc import Callable
+from pathlib import Path
+from typing import Any
+
+import pytest
+from glide_shared.protobuf.command_request_pb2 import RequestType
+
+
+def _decode(arg) -> str:
+    return arg.decode() if isinstance(arg, bytes) else str(arg)
+
+
+class FakeValkey:
+    """In-memory stand-in for a Valkey client executing batches."""
+
+    def __init__(self):
+        self.data: dict[str, object] = {}
+        self.ttl: dict[str, int] = {}
+        self.streams: dict[str, list[dict[str, str]]] = {}
+        self.subscribers: dict[str, list[list[str]]] = {}
+        self.batches: list[list[tuple[str, list[str]]]] = []
+        self.bytes_written = 0
+        self.lock = threading.Lock()
+
+    @property
+    def commands(self) -> list[tuple[str, list[str]]]:
+        return [command for batch in self.batches for command in batch]
+
+    def subscribe(self, channel: str) -> list[str]:
+        messages: list[str] = []
+        self.subscribers.setdefault(channel, []).append(messages)
+        return messages
+
+    def exec(self, batch, raise_on_error):
+        commands = [
+            (RequestType.Name(request_type), [_decode(arg) for arg in args])
+            for request_type, args in batch.commands
+        ]
+
+        with self.lock:
+            self.batches.append(commands)
+
+            for name, args in commands:
+                self.bytes_written += sum(len(arg) for arg in args)
+                self._apply(name, args)
+
+        return [None] * len(commands)
+
+    def _apply(self, name: str, args: list[str]):
+        if name == "Set":
+            self.data[args[0]] = args[1]
+            self.ttl.pop(args[0], None)
+
+            if "EX" in args:
+                self.ttl[args[0]] = int(args[args.index("EX") + 1])
+        elif name == "HSet":
+            fields = self.data.setdefault(args[0], {})
+            assert isinstance(fields, dict)
+            fields.update(zip(args[1::2], args[2::2]))
+        elif name == "Expire":
+            self.ttl[args[0]] = int(args[1])
+        elif name == "XAdd":
+            key, rest = args[0], args[1:]
+
+            maxlen = None
+            if rest[0] == "MAXLEN":
+                approximate = rest[1] in ("~", "=")
+                maxlen = int(rest[2] if approximate else rest[1])
+                rest = rest[3:] if approximate else rest[2:]
+
+            assert rest[0] == "*"
+            stream = self.streams.setdefault(key, [])
+            stream.append(dict(zip(rest[1::2], rest[2::2])))
+
+            if maxlen is not None:
+                del stream[:-maxlen]
+        elif name == "Publish":
+            channel, message = args
+            for messages in self.subscribers.get(channel, []):
+                messages.append(message)
+
+
+@pytest.fixture
+def valkey() -> FakeValkey:
+    return FakeValkey()
+
+
+class FakePersister:
+    """Persister discarding the files of downloads."""
+
+    def persist(self, ref, src, filter=None):
+        pass
+
+
+@pytest.fixture
+def persister() -> FakePersister:
+    return FakePersister()
+
+
+type Extract = Callable[["FakeYoutubeDLInstance", str], dict[str, Any] | None]
+
+
+def extract_video(ydl: "FakeYoutubeDLInstance", url: str) -> dict[str, Any]:
+    """Return the info dict of a video (titled after the number of extractions so far)."""
+
+    return {
+        "id": "abc",
+        "title": f"Video {len(ydl.fake.urls)}",
+        "formats": [{"format_id": "18", "url": ydl.fake.media_url}],
+    }
+
+
+class FakeYoutubeDLInstance:
+    """Stand-in for a YoutubeDL instance, extracting with the extract function of its fake."""
+
+    def __init__(self, fake: "FakeYoutubeDL", params: dict[str, Any]):
+        self.fake = fake
+        self.params = params
+        self.urls: list[str] = []
+        self.closed = False
+
+    @property
+    def home(self) -> Path:
+        return Path(self.params["paths"]["home"])
+
+    def extract_info(self, url, download=True, **kwargs):
+        self.urls.append(url)
+
+        with self.fake.lock:
+            self.fake.urls.append(url)
+
+        info = self.fake.extract(self, url)
+
+        if download and info is not None:
+            self.process_ie_result(info, download=True)
+
+        return info
+
+    def process_ie_result(self, info, download=True):
+        with self.fake.lock:
+            self.fake.processed.append(info)
+
+        return info
+
+    def close(self):
+        self.closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FakeYoutubeDL:
+    """
+    Stand-in for the YoutubeDL class used by the executor.
+
+    Records the instances created and the URLs extracted (and info dicts processed) by them.
+    Tests customize extraction by replacing extract.
+    """
+
+    def __init__(self):
+        self.instances: list[FakeYoutubeDLInstance] = []
+        self.urls: list[str] = []
+        self.processed: list[dict[str, Any]] = []
+        self.extract: Extract = extract_video
+        self.media_url = "https://media.example.com/video.mp4"
+        self.lock = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return len(self.urls)
+
+    def __call__(self, params: dict[str, Any]) -> FakeYoutubeDLInstance:
+        instance = FakeYoutubeDLInstance(self, params)
+
+        with self.lock:
+            self.instances.append(instance)
+
+        return instance
+
+
+@pytest.fixture
+def ydl(monkeypatch) -> FakeYoutubeDL:
+    fake = FakeYoutubeDL()
+    monkeypatch.setattr("restate_yt_dlp.executor.yt_dlp.YoutubeDL", fake)
+
+    return fake
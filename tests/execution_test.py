@@ -0,0 +1,111 @@
+import asyncio
+import inspect
+import threading
+import time
+
+import pytest
+
+from restate_yt_dlp.execution import ExecutionBackend, ExecutionOptions
+
+
+def _sleep(seconds: float) -> str:
+    time.sleep(seconds)
+    return threading.current_thread().name
+
+
+def _init_worker():
+    return {"sleep": _sleep}
+
+
+async def _gather(*coros):
+    return await asyncio.gather(*coros)
+
+
+class TestExecutionBackend:
+    """Tests for ExecutionBackend."""
+
+    def test_wrapper_preserves_signature(self):
+        """Test that wrapped functions keep their signature and become coroutine functions."""
+        backend = ExecutionBackend()
+
+        wrapped = backend.wrap("sleep", _sleep)
+
+        assert inspect.iscoroutinefunction(wrapped)
+        assert inspect.signature(wrapped, eval_str=True).return_annotation is str
+
+    def test_runs_in_dedicated_thread_pool(self):
+        """Test that thread mode runs calls on the backend's own threads."""
+        backend = ExecutionBackend(ExecutionOptions(mode="thread", max_workers=2))
+        wrapped = backend.wrap("sleep", _sleep)
+
+        try:
+            name = asyncio.run(wrapped(0))
+        finally:
+            backend.shutdown()
+
+        assert name.startswith("restate-yt-dlp")
+
+    def test_max_concurrency_queues_calls(self):
+        """Test that calls above the concurrency limit wait and are measured."""
+        backend = ExecutionBackend(ExecutionOptions(mode="thread", max_workers=4))
+        wrapped = backend.wrap("sleep", _sleep, max_concurrency=1)
+
+        try:
+            asyncio.run(_gather(wrapped(0.05), wrapped(0.05), wrapped(0.05)))
+        finally:
+            backend.shutdown()
+
+        stats = backend.stats()["sleep"]
+
+        assert stats.max_concurrency == 1
+        assert stats.completed == 3
+        assert stats.running == 0
+        assert stats.queued == 0
+        assert stats.max_queued == 2
+        assert stats.wait_seconds_max >= 0.09
+        assert stats.wait_seconds_avg > 0
+
+    def test_failures_are_counted(self):
+        """Test that failing calls release their slot and are counted."""
+        backend = ExecutionBackend(ExecutionOptions(mode="inline"))
+
+        def fail():
+            raise ValueError("boom")
+
+        wrapped = backend.wrap("fail", fail, max_concurrency=1)
+
+        with pytest.raises(ValueError, match="boom"):
+            asyncio.run(wrapped())
+
+        stats = backend.stats()["fail"]
+        assert stats.failed == 1
+        assert stats.running == 0
+
+    def test_duplicate_registration_raises_error(self):
+        """Test that a function name can only be registered once."""
+        backend = ExecutionBackend()
+        backend.wrap("sleep", _sleep)
+
+        with pytest.raises(ValueError, match="already registered"):
+            backend.wrap("sleep", _sleep)
+
+    def test_process_mode(self):
+        """Test that process mode runs calls in worker processes built by the worker initializer."""
+        backend = ExecutionBackend(
+            ExecutionOptions(mode="process", max_workers=1),
+            worker_initializer=_init_worker,
+        )
+        wrapped = backend.wrap("sleep", _sleep)
+
+        try:
+            name = asyncio.run(wrapped(0))
+        finally:
+            backend.shutdown()
+
+        assert name == "MainThread"
+        assert backend.stats()["sleep"].completed == 1
+
+    def test_process_mode_requires_worker_initializer(self):
+        """Test that process mode cannot be used without a worker initializer."""
+        with pytest.raises(ValueError, match="worker initializer"):
+            ExecutionBackend(ExecutionOptions(mode="process"))
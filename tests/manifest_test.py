@@ -0,0 +1,148 @@
+import hashlib
+import json
+from pathlib import Path, PurePosixPath
+
+import obstore
+import pytest
+from obstore.store import MemoryStore
+
+from restate_yt_dlp.executor import DownloadRequest, Executor
+from restate_yt_dlp.manifest import describe_file
+from restate_yt_dlp.storage import ObstorePersister
+
+
+def _write_video(ydl, url):
+    """Write a video (followed by a post hook call) and its thumbnail."""
+
+    video = ydl.home / "abc.mp4"
+    video.write_bytes(b"video")
+
+    for hook in ydl.params.get("post_hooks", []):
+        hook(str(video))
+
+    (ydl.home / "abc.jpg").write_bytes(b"thumbnail")
+
+    return {"id": "abc", "title": "Video", "duration": 10, "formats": []}
+
+
+class DirectoryPersister:
+    def __init__(self):
+        self.files: dict[str, bytes] = {}
+
+    def persist(self, ref, src, filter=None):
+        for file in Path(src).rglob("*"):
+            self.files[file.relative_to(src).as_posix()] = file.read_bytes()
+
+
+@pytest.fixture(autouse=True)
+def ydl(ydl):
+    ydl.extract = _write_video
+
+    return ydl
+
+
+def _request(**output) -> DownloadRequest:
+    return DownloadRequest(
+        url="https://example.com/video",
+        output={"location": "videos/abc", **output},  # type: ignore[arg-type]
+    )
+
+
+def _file(path: str, data: bytes, content_type: str) -> dict:
+    return {"path": path, "size": len(data), "content_type": content_type}
+
+
+EXPECTED = {
+    "id": "abc",
+    "title": "Video",
+    "duration": 10,
+    "files": [
+        _file("abc.jpg", b"thumbnail", "image/jpeg"),
+        _file("abc.mp4", b"video", "video/mp4"),
+    ],
+}
+
+
+class TestDescribeFile:
+    """Tests for describe_file."""
+
+    def test_unknown_content_type(self, tmp_path):
+        """Test that files of unknown types have no content type."""
+        (tmp_path / "abc.ytdl-unknown").write_bytes(b"x")
+
+        file = describe_file(
+            tmp_path / "abc.ytdl-unknown", PurePosixPath("abc.ytdl-unknown")
+        )
+
+        assert file["content_type"] is None
+        assert file["size"] == 1
+
+    def test_checksum(self, tmp_path):
+        """Test that files are only hashed if requested."""
+        (tmp_path / "abc.mp4").write_bytes(b"video")
+
+        assert "sha256" not in describe_file(
+            tmp_path / "abc.mp4", PurePosixPath("abc.mp4")
+        )
+        assert (
+            describe_file(
+                tmp_path / "abc.mp4", PurePosixPath("abc.mp4"), checksum=True
+            )["sha256"]
+            == hashlib.sha256(b"video").hexdigest()
+        )
+
+
+class TestDownloadManifest:
+    """Tests for the manifest returned by downloads."""
+
+    def test_returned(self):
+        """Test that the download returns the persisted files and video info."""
+        assert Executor(DirectoryPersister()).download("inv_1", _request()) == EXPECTED
+
+    def test_filtered(self):
+        """Test that files excluded from the upload are not listed."""
+        response = Executor(DirectoryPersister()).download(
+            "inv_1", _request(filter={"exclude": ["*.jpg"]})
+        )
+
+        assert [file["path"] for file in response["files"]] == ["abc.mp4"]
+
+    def test_streaming(self):
+        """Test that files uploaded while downloading are listed."""
+        store = MemoryStore()
+        executor = Executor(ObstorePersister(store), stream_uploads=True)
+
+        assert executor.download("inv_1", _request()) == EXPECTED
+
+    @pytest.mark.parametrize("stream_uploads", [False, True])
+    def test_checksums(self, stream_uploads):
+        """Test that files get their checksum if requested."""
+        executor = Executor(
+            ObstorePersister(MemoryStore()), stream_uploads=stream_uploads
+        )
+
+        response = executor.download("inv_1", _request(checksums=True))
+
+        assert [file["sha256"] for file in response["files"]] == [
+            hashlib.sha256(b"thumbnail").hexdigest(),
+            hashlib.sha256(b"video").hexdigest(),
+        ]
+
+    def test_written(self):
+        """Test that the manifest is written alongside the outputs if requested."""
+        store = MemoryStore()
+        executor = Executor(ObstorePersister(store))
+
+        executor.download("inv_1", _request(manifest="manifest.json"))
+
+        manifest = obstore.get(store, "videos/abc/manifest.json").bytes()
+
+        assert json.loads(bytes(manifest)) == EXPECTED
+
+    def test_written_by_directory_persister(self):
+        """Test that persisters without support for single files persist the manifest too."""
+        persister = DirectoryPersister()
+
+        Executor(persister).download("inv_1", _request(manifest="manifest.json"))
+
+        assert json.loads(persister.files["manifest.json"]) == EXPECTED
@@ -0,0 +1,72 @@
+import logging
+from dataclasses import dataclass
+
+from restate_yt_dlp.metrics import StatsReporter, snapshot
+
+
+@dataclass(frozen=True)
+class FakeStats:
+    hits: int
+
+
+class FakeSource:
+    def __init__(self, stats):
+        self._stats = stats
+
+    def stats(self):
+        return self._stats
+
+
+class FailingSource:
+    def stats(self):
+        raise RuntimeError("unavailable")
+
+
+class TestSnapshot:
+    """Tests for snapshot."""
+
+    def test_plain_values(self):
+        """Test that dataclasses, also nested in dicts, are converted to dicts."""
+        metrics = snapshot(
+            {
+                "cache": FakeSource(FakeStats(hits=1)),
+                "backend": FakeSource({"download": FakeStats(hits=2)}),
+            }
+        )
+
+        assert metrics == {
+            "cache": {"hits": 1},
+            "backend": {"download": {"hits": 2}},
+        }
+
+
+class TestStatsReporter:
+    """Tests for StatsReporter."""
+
+    def test_report(self, caplog):
+        """Test that the metrics of every component are logged."""
+        reporter = StatsReporter({"cache": FakeSource(FakeStats(hits=1))})
+
+        with caplog.at_level(logging.INFO, logger="restate_yt_dlp.metrics"):
+            reporter.report()
+
+        assert caplog.records[-1].metrics == {"cache": {"hits": 1}}  # pyright: ignore[reportAttributeAccessIssue]
+
+    def test_failing_source(self, caplog):
+        """Test that failing components do not stop the reporter."""
+        reporter = StatsReporter({"cache": FailingSource()})
+
+        with caplog.at_level(logging.INFO, logger="restate_yt_dlp.metrics"):
+            reporter.report()
+
+        assert caplog.records[-1].levelno == logging.ERROR
+
+    def test_close_reports(self, caplog):
+        """Test that closing stops the thread after a last report."""
+        reporter = StatsReporter({"cache": FakeSource(FakeStats(hits=1))}, interval=60)
+
+        with caplog.at_level(logging.INFO, logger="restate_yt_dlp.metrics"):
+            reporter.start()
+            reporter.close()
+
+        assert [record.message for record in caplog.records] == ["Metrics"]
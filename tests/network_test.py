@@ -0,0 +1,228 @@
+import socket
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import urllib3
+import yt_dlp
+
+from restate_yt_dlp.network import ConnectionPool, DNSCache, _close_idle_connections
+
+
+class KeepAliveHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def do_GET(self):
+        body = b"ok"
+
+        self.send_response(200)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class CountingServer(ThreadingHTTPServer):
+    daemon_threads = True
+    connections = 0
+
+    def process_request(self, request, client_address):
+        self.connections += 1
+        super().process_request(request, client_address)
+
+
+@pytest.fixture
+def server():
+    server = CountingServer(("127.0.0.1", 0), KeepAliveHandler)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+
+    yield server
+
+    server.shutdown()
+    server.server_close()
+
+
+def _get(ydl: yt_dlp.YoutubeDL, server: CountingServer):
+    with ydl.urlopen(f"http://127.0.0.1:{server.server_port}/") as response:
+        assert response.read() == b"ok"
+
+
+class TestConnectionPool:
+    """Tests for ConnectionPool."""
+
+    def test_shared_between_instances(self, server):
+        """Test that instances reuse the connections opened by other instances."""
+        connections = ConnectionPool()
+
+        for _ in range(3):
+            with yt_dlp.YoutubeDL({"quiet": True}) as ydl:
+                connections.install(ydl)
+                _get(ydl, server)
+
+        assert server.connections == 1
+        assert connections.stats().requests == 3
+
+        connections.close()
+
+    def test_not_shared_without_install(self, server):
+        """Test that instances open their own connections by default."""
+        for _ in range(2):
+            with yt_dlp.YoutubeDL({"quiet": True}) as ydl:
+                _get(ydl, server)
+
+        assert server.connections == 2
+
+    def test_idle_eviction(self, server, monkeypatch):
+        """Test that connections to hosts not contacted within the idle timeout are closed."""
+        connections = ConnectionPool(idle_timeout=10)
+        now = 1000.0
+
+        monkeypatch.setattr("restate_yt_dlp.network.time.monotonic", lambda: now)
+
+        ydl = yt_dlp.YoutubeDL({"quiet": True})
+        connections.install(ydl)
+
+        _get(ydl, server)
+        now += 11
+        _get(ydl, server)
+
+        assert server.connections == 2
+        assert connections.stats().evictions == 1
+
+        connections.close()
+
+    def test_install_idempotent(self):
+        """Test that installing twice keeps the request handlers."""
+        connections = ConnectionPool()
+        ydl = yt_dlp.YoutubeDL({"quiet": True})
+
+        connections.install(ydl)
+        director = ydl._request_director
+        connections.install(ydl)
+
+        assert ydl._request_director is director
+
+    def test_unsupported_yt_dlp(self, server, monkeypatch):
+        """Test that instances keep their own handlers if the yt-dlp internals changed."""
+
+        def create_shared_instance(*args, **kwargs):
+            raise AttributeError("'RequestsRH' object has no attribute '_client_cert'")
+
+        monkeypatch.setattr(
+            "restate_yt_dlp.network._SharedRequestsRH._create_shared_instance",
+            create_shared_instance,
+        )
+
+        connections = ConnectionPool()
+
+        with yt_dlp.YoutubeDL({"quiet": True}) as ydl:
+            connections.install(ydl)
+            _get(ydl, server)
+
+        assert connections.stats().requests == 0
+
+    def test_close_idle_connections(self, server):
+        """Test that only checked-in connections are closed."""
+        pool = urllib3.HTTPConnectionPool("127.0.0.1", server.server_port, maxsize=2)
+
+        idle = pool._get_conn()
+        busy = pool._get_conn()
+        idle.connect()
+        busy.connect()
+        pool._put_conn(idle)
+
+        _close_idle_connections(pool)
+
+        assert idle.sock is None
+        assert busy.sock is not None
+
+        busy.close()
+
+
+class TestDNSCache:
+    """Tests for DNSCache."""
+
+    @pytest.fixture
+    def lookups(self, monkeypatch):
+        lookups: list[str] = []
+        resolve = socket.getaddrinfo
+
+        def getaddrinfo(host, port, family=0, type=0, proto=0, flags=0):
+            if host == "127.0.0.1":
+                # Connecting to a resolved address
+                return resolve(host, port, family, type, proto, flags)
+
+            lookups.append(host)
+
+            if host == "unknown.example.com":
+                raise socket.gaierror("not found")
+
+            if host == "video.example.com":
+                return resolve("127.0.0.1", port, family, type, proto, flags)
+
+            return [(socket.AF_INET, socket.SOCK_STREAM, 6, "", ("192.0.2.1", port))]
+
+        monkeypatch.setattr(socket, "getaddrinfo", getaddrinfo)
+
+        return lookups
+
+    def test_cached(self, lookups, monkeypatch):
+        """Test that names are resolved once within the time to live."""
+        cache = DNSCache(ttl=10)
+        now = 1000.0
+
+        monkeypatch.setattr("restate_yt_dlp.network.time.monotonic", lambda: now)
+
+        cache.getaddrinfo("example.com", 443)
+        cache.getaddrinfo("example.com", 443)
+        now += 11
+        cache.getaddrinfo("example.com", 443)
+
+        assert lookups == ["example.com", "example.com"]
+        assert cache.stats().hits == 1
+
+    def test_failures_not_cached(self, lookups):
+        """Test that failed lookups are repeated."""
+        cache = DNSCache()
+
+        for _ in range(2):
+            with pytest.raises(socket.gaierror):
+                cache.getaddrinfo("unknown.example.com", 443)
+
+        assert len(lookups) == 2
+
+    def test_bounded(self, lookups):
+        """Test that the least recently used results are dropped."""
+        cache = DNSCache(max_entries=1)
+
+        cache.getaddrinfo("a.example.com", 443)
+        cache.getaddrinfo("b.example.com", 443)
+        cache.getaddrinfo("a.example.com", 443)
+
+        assert lookups == ["a.example.com", "b.example.com", "a.example.com"]
+        assert cache.stats().entries == 1
+
+    def test_shared_connections(self, lookups, server):
+        """Test that new shared connections resolve their host through the cache only."""
+        cache = DNSCache()
+        connections = ConnectionPool(max_connections_per_host=1, dns_cache=cache)
+        resolver = socket.getaddrinfo
+
+        with yt_dlp.YoutubeDL({"quiet": True}) as ydl:
+            connections.install(ydl)
+
+            url = f"http://video.example.com:{server.server_port}/"
+
+            # Two connections at once
+            with ydl.urlopen(url) as first, ydl.urlopen(url) as second:
+                assert first.read() == second.read() == b"ok"
+
+        connections.close()
+
+        assert server.connections == 2
+        assert lookups == ["video.example.com"]
+        assert cache.stats().hits == 1
+        assert socket.getaddrinfo is resolver
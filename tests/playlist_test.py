@@ -0,0 +1,182 @@
+import asyncio
+from pathlib import PurePosixPath
+
+import pytest
+import restate
+from pydantic import AnyUrl
+from restate.exceptions import TerminalError
+
+from restate_yt_dlp import Executor
+from restate_yt_dlp.execution import ExecutionBackend, ExecutionOptions
+from restate_yt_dlp.executor import DownloadPlaylistRequest, entry_dir
+from restate_yt_dlp.restate import HandlerOptions, register_service
+
+PLAYLIST = {
+    "_type": "playlist",
+    "id": "PL1",
+    "title": "Playlist",
+    "entries": [
+        {"id": f"v{index}", "url": f"https://example.com/v{index}", "title": None}
+        for index in range(5)
+    ],
+}
+
+
+def _extract(ydl, url):
+    if url == "https://example.com/v0":
+        return {"id": "v0", "title": "Video"}
+
+    return PLAYLIST
+
+
+class FakeCall:
+    def __init__(self, result=None, error=None):
+        self.result = result
+        self.error = error
+
+    def __await__(self):
+        if False:
+            yield
+
+        if self.error is not None:
+            raise self.error
+
+        return self.result
+
+
+class FakeRequest:
+    id = "inv_1"
+
+
+class FakeContext:
+    """Runs steps inline and completes child calls in dispatch order."""
+
+    def __init__(self):
+        self.calls: list = []
+        self.in_flight = 0
+        self.max_in_flight = 0
+
+    def request(self):
+        return FakeRequest()
+
+    async def run_typed(self, name, fn, options=None, **kwargs):
+        return await fn(**kwargs)
+
+    def service_call(self, handler, arg):
+        self.calls.append(arg)
+        self.in_flight += 1
+        self.max_in_flight = max(self.max_in_flight, self.in_flight)
+
+        if arg.url.endswith("v3"):
+            return FakeCall(error=TerminalError("unsupported URL"))
+
+        return FakeCall({"id": arg.url[-2:], "files": []})
+
+
+@pytest.fixture
+def ydl(ydl):
+    ydl.extract = _extract
+
+    return ydl
+
+
+@pytest.fixture
+def handler(ydl, persister):
+    service = restate.Service("yt-dlp")
+    register_service(
+        Executor(persister),
+        service,
+        HandlerOptions(),
+        ExecutionBackend(ExecutionOptions(mode="inline")),
+    )
+
+    return service.handlers["downloadPlaylist"].fn
+
+
+def _request(url: str = "https://example.com/playlist", **kwargs):
+    return DownloadPlaylistRequest(
+        url=url,
+        output={"location": "s3://bucket/playlist/"},  # type: ignore[arg-type]
+        **kwargs,
+    )
+
+
+class TestExtractPlaylist:
+    """Tests for Executor.extract_playlist."""
+
+    def test_flat(self, ydl, persister):
+        """Test that entries are listed without extracting them."""
+        response = Executor(persister).extract_playlist("inv_1", _request())
+
+        assert ydl.instances[-1].params["extract_flat"] == "in_playlist"
+        assert [entry["url"] for entry in response["entries"]] == [
+            f"https://example.com/v{index}" for index in range(5)
+        ]
+
+    def test_single_video(self, ydl, persister):
+        """Test that a URL of a single video becomes a single entry."""
+        response = Executor(persister).extract_playlist(
+            "inv_1", _request("https://example.com/v0")
+        )
+
+        assert response["entries"] == [
+            {"id": "v0", "url": "https://example.com/v0", "title": "Video"}
+        ]
+
+
+class TestEntryRequest:
+    """Tests for the download requests of playlist entries."""
+
+    def test_url_location(self):
+        """Test that entries are downloaded to subdirectories of a URL location."""
+        request = _request(skip_existing=True).entry_request(
+            {"id": "v1", "url": "https://example.com/v1", "title": None}
+        )
+
+        assert request.output.location == AnyUrl("s3://bucket/playlist/v1/")
+        assert request.skip_existing
+
+    def test_path_location(self):
+        """Test that entries are downloaded to subdirectories of a path location."""
+        request = DownloadPlaylistRequest(
+            url="https://example.com/playlist",
+            output={"location": "videos"},  # type: ignore[arg-type]
+        ).entry_request({"id": "v1", "url": "https://example.com/v1", "title": None})
+
+        assert request.output.location == PurePosixPath("videos/v1")
+
+    def test_entry_dir(self):
+        """Test that entry ids cannot escape the playlist output."""
+        assert entry_dir({"id": "../x", "url": "u", "title": None}) == "_x"
+        assert len(entry_dir({"id": None, "url": "u", "title": None})) == 16
+
+
+class TestDownloadPlaylistHandler:
+    """Tests for the downloadPlaylist handler."""
+
+    def test_fan_out(self, handler, monkeypatch):
+        """Test that entries are downloaded by child calls within the concurrency window."""
+        ctx = FakeContext()
+
+        async def wait_completed(*futures):
+            # Complete the oldest call
+            ctx.in_flight -= 1
+            return [futures[0]], list(futures[1:])
+
+        monkeypatch.setattr(restate, "wait_completed", wait_completed)
+
+        response = asyncio.run(handler(ctx, _request(concurrency=2)))
+
+        assert len(ctx.calls) == 5
+        assert ctx.max_in_flight == 2
+        assert response["id"] == "PL1"
+        assert [
+            entry.get("download", {}).get("id") for entry in response["entries"]
+        ] == [
+            "v0",
+            "v1",
+            "v2",
+            None,
+            "v4",
+        ]
+        assert response["entries"][3]["error"] == "unsupported URL"
@@ -0,0 +1,196 @@
+import pytest
+import yt_dlp
+from yt_dlp.utils import DownloadError
+
+from restate_yt_dlp.executor import DownloadRequest, Executor
+from restate_yt_dlp.pool import YoutubeDLPool
+
+
+def _hook(progress):
+    pass
+
+
+def _other_hook(progress):
+    pass
+
+
+def _params(home: str = "/tmp/a", **params) -> dict:
+    return {"quiet": True, "paths": {"home": home}, **params}
+
+
+class TestYoutubeDLPool:
+    """Tests for YoutubeDLPool."""
+
+    def test_reused_per_options(self):
+        """Test that instances are reused by requests with the same options only."""
+        pool = YoutubeDLPool()
+
+        with pool.acquire(_params()) as first:
+            pass
+
+        with pool.acquire(_params("/tmp/b")) as second:
+            pass
+
+        with pool.acquire(_params(format="best")) as third:
+            pass
+
+        assert second is first
+        assert third is not first
+        assert pool.stats().hits == 1
+        assert pool.stats().misses == 2
+
+    def test_exclusive(self):
+        """Test that an instance in use is not handed out again."""
+        pool = YoutubeDLPool()
+
+        with pool.acquire(_params()) as first, pool.acquire(_params()) as second:
+            assert second is not first
+
+        assert pool.stats().idle == 2
+
+    def test_per_request_params(self):
+        """Test that paths, hooks and archives of the request are swapped in."""
+        pool = YoutubeDLPool()
+
+        with pool.acquire(
+            _params(progress_hooks=[_hook], download_archive={"youtube abc"})
+        ) as ydl:
+            ydl._download_retcode = 1
+
+        archive = {"youtube def"}
+
+        with pool.acquire(
+            _params(
+                "/tmp/b",
+                progress_hooks=[_other_hook],
+                postprocessor_hooks=[_other_hook],
+                download_archive=archive,
+            )
+        ) as reused:
+            assert reused is ydl
+            assert reused.params["paths"] == {"home": "/tmp/b"}
+            assert reused._progress_hooks == [_other_hook]
+            assert reused._postprocessor_hooks == [_other_hook]
+            assert reused.archive is archive
+            assert reused._download_retcode == 0
+
+        with pool.acquire(_params()) as reused:
+            assert reused._progress_hooks == []
+            assert "download_archive" not in reused.params
+            assert not reused.archive
+
+    def test_lru_eviction(self):
+        """Test that the least recently used instances are closed beyond the maximum size."""
+        pool = YoutubeDLPool(max_size=1)
+
+        with pool.acquire(_params(format="a")) as first:
+            pass
+
+        with pool.acquire(_params(format="b")) as second:
+            pass
+
+        with pool.acquire(_params(format="b")) as ydl:
+            assert ydl is second
+
+        with pool.acquire(_params(format="a")) as ydl:
+            assert ydl is not first
+
+        assert pool.stats().evictions == 2
+
+    def test_idle_timeout(self, monkeypatch):
+        """Test that idle instances expire."""
+        pool = YoutubeDLPool(idle_timeout=10)
+        now = 1000.0
+
+        monkeypatch.setattr("restate_yt_dlp.pool.time.monotonic", lambda: now)
+
+        with pool.acquire(_params()) as first:
+            pass
+
+        now += 11
+
+        with pool.acquire(_params()) as second:
+            assert second is not first
+
+        assert pool.stats().evictions == 1
+
+    def test_discarded_on_unexpected_error(self):
+        """Test that instances are not reused after errors not reported by yt-dlp."""
+        pool = YoutubeDLPool()
+
+        with pytest.raises(DownloadError), pool.acquire(_params()):
+            raise DownloadError("Unsupported URL")
+
+        with pytest.raises(RuntimeError), pool.acquire(_params()):
+            raise RuntimeError("interrupted")
+
+        assert pool.stats().idle == 0
+
+    def test_archive_file_bypasses_pool(self, tmp_path, monkeypatch):
+        """Test that download archive files (loaded on construction) are not pooled."""
+        closed = []
+        monkeypatch.setattr(yt_dlp.YoutubeDL, "close", lambda self: closed.append(self))
+        pool = YoutubeDLPool()
+
+        with pool.acquire(
+            _params(download_archive=str(tmp_path / "archive.txt"))
+        ) as ydl:
+            pass
+
+        assert pool.stats().idle == 0
+        assert closed == [ydl]
+
+    def test_private_attributes(self):
+        """Test that the private YoutubeDL attributes swapped on acquire still exist upstream."""
+        with yt_dlp.YoutubeDL(
+            _params(postprocessors=[{"key": "FFmpegMetadata"}])
+        ) as ydl:
+            assert isinstance(ydl._progress_hooks, list)
+            assert isinstance(ydl._post_hooks, list)
+            assert isinstance(ydl._postprocessor_hooks, list)
+            assert isinstance(ydl._playlist_urls, set)
+            assert isinstance(ydl._download_retcode, int)
+            assert isinstance(ydl._num_downloads, int)
+            assert isinstance(ydl._playlist_level, int)
+            assert hasattr(ydl, "archive")
+            assert all(
+                isinstance(pp._progress_hooks, list)
+                for pps in ydl._pps.values()
+                for pp in pps
+            )
+            assert any(ydl._pps.values())
+
+
+class CountingYoutubeDL(yt_dlp.YoutubeDL):
+    """Real YoutubeDL (pooled instances are prepared through its internals) extracting a fixed video."""
+
+    constructed = 0
+
+    def __init__(self, params):
+        CountingYoutubeDL.constructed += 1
+        super().__init__(params)
+
+    def extract_info(self, url, download=True, *args, **kwargs):
+        return {"id": "abc", "title": "Video", "duration": 10}
+
+
+class TestExecutorPool:
+    """Tests for the executor reusing pooled YoutubeDL instances."""
+
+    def test_downloads_reuse(self, persister, monkeypatch):
+        """Test that consecutive downloads reuse one instance."""
+        monkeypatch.setattr("restate_yt_dlp.pool.yt_dlp.YoutubeDL", CountingYoutubeDL)
+        monkeypatch.setattr(CountingYoutubeDL, "constructed", 0)
+
+        executor = Executor(
+            persister, defaults={"quiet": True}, ydl_pool=YoutubeDLPool()
+        )
+        request = DownloadRequest(
+            url="https://example.com/video",
+            output={"location": "videos/abc"},  # type: ignore[arg-type]
+        )
+
+        executor.download("inv_1", request)
+        executor.download("inv_2", request)
+
+        assert CountingYoutubeDL.constructed == 1
@@ -0,0 +1,361 @@
+import json
+import time
+
+import pytest
+from yt_dlp.utils import DownloadError
+
+from restate_yt_dlp.executor import DownloadRequest, Executor
+from src.progress import KeyTTL, ValkeyProgressHook, ValkeyProgressSink
+
+
+def _progress(status: str, downloaded: int, total: int = 1000) -> dict:
+    return {
+        "status": status,
+        "downloaded_bytes": downloaded,
+        "total_bytes": total,
+        "filename": "/tmp/abc/video.mp4",
+        "info_dict": {"id": "abc", "title": "Video"},
+    }
+
+
+class TestValkeyProgressHook:
+    """Tests for ValkeyProgressHook."""
+
+    def test_writes_every_update(self, valkey):
+        """Test that every update is written when not rate limited."""
+        hook = ValkeyProgressHook(valkey)
+
+        hook("inv", "https://example.com/v", _progress("downloading", 10))
+        hook("inv", "https://example.com/v", _progress("downloading", 20))
+        hook.close()
+
+        assert hook.sink.stats().flushed == 2
+
+        progress = json.loads(
+            valkey.data["yt-dlp:download:progress:by-invocation-id:inv"]
+        )
+        assert progress["downloaded_bytes"] == 20
+        assert valkey.data["yt-dlp:download:downloaded-bytes:by-id:abc"] == {
+            "video.mp4": "20"
+        }
+
+    def test_rate_limited_updates_are_coalesced(self, valkey):
+        """Test that intermediate updates are merged and the final state is flushed."""
+        hook = ValkeyProgressHook(valkey, min_interval=60)
+
+        for downloaded in range(0, 1000, 10):
+            hook("inv", "https://example.com/v", _progress("downloading", downloaded))
+
+        hook("inv", "https://example.com/v", _progress("finished", 1000))
+        hook.close()
+
+        # The first update and the final state (instead of 101 writes)
+        assert len(valkey.batches) <= 2
+
+        progress = json.loads(
+            valkey.data["yt-dlp:download:progress:by-url:https://example.com/v"]
+        )
+        assert progress["status"] == "finished"
+        assert progress["downloaded_bytes"] == 1000
+
+    def test_min_bytes_delta(self, valkey):
+        """Test that updates below the byte delta are held back."""
+        hook = ValkeyProgressHook(valkey, min_interval=0.01, min_bytes=500)
+
+        hook("inv", "https://example.com/v", _progress("downloading", 0))
+        time.sleep(0.1)
+        hook("inv", "https://example.com/v", _progress("downloading", 100))
+        time.sleep(0.1)
+        hook.sink.drain()
+
+        progress = json.loads(valkey.data["yt-dlp:download:progress:by-id:abc"])
+        assert progress["downloaded_bytes"] == 0
+
+        hook("inv", "https://example.com/v", _progress("downloading", 600))
+        time.sleep(0.1)
+        hook.sink.drain()
+
+        progress = json.loads(valkey.data["yt-dlp:download:progress:by-id:abc"])
+        assert progress["downloaded_bytes"] == 600
+
+        hook.close()
+
+    def test_final_state_not_coalesced(self, valkey):
+        """Test that the next file's progress does not replace the final state of the previous one."""
+        hook = ValkeyProgressHook(valkey, min_interval=60)
+
+        hook("inv", "https://example.com/v", _progress("finished", 1000))
+        hook("inv", "https://example.com/v", _progress("downloading", 10))
+        hook.close()
+
+        key = "yt-dlp:download:progress:by-invocation-id:inv"
+        statuses = [
+            json.loads(args[1])["status"]
+            for name, args in valkey.commands
+            if name == "Set" and args[0] == key
+        ]
+
+        assert statuses == ["finished", "downloading"]
+
+    def test_close_invocation(self, valkey):
+        """Test that closing an invocation writes its pending progress and releases its state."""
+        hook = ValkeyProgressHook(valkey, min_interval=60)
+
+        hook("inv", "https://example.com/v", _progress("downloading", 0))
+        hook._flush(force=True)
+        hook("inv", "https://example.com/v", _progress("downloading", 10))
+
+        # Eg. yt-dlp raised a DownloadError without reporting an error status
+        hook.close_invocation("inv")
+        hook.sink.drain()
+
+        progress = json.loads(
+            valkey.data["yt-dlp:download:progress:by-invocation-id:inv"]
+        )
+        assert progress["downloaded_bytes"] == 10
+        assert not hook._pending
+        assert not hook._written
+        assert not hook._info_fingerprints
+
+        hook.close()
+
+    def test_info_written_once_per_download(self, valkey):
+        """Test that the info record is only written when it changes and with the final state."""
+        hook = ValkeyProgressHook(valkey)
+
+        info_dict = {"id": "abc", "title": "Video", "format_id": "137"}
+
+        for downloaded in range(0, 100, 10):
+            progress = _progress("downloading", downloaded)
+            progress["info_dict"] = info_dict
+            hook("inv", "https://example.com/v", progress)
+
+        hook.flush()
+
+        info_key = "yt-dlp:download:info:by-invocation-id:inv"
+        info_writes = [args for name, args in valkey.commands if args[0] == info_key]
+        assert len(info_writes) == 1
+
+        # Progress is written on every tick, without the info dict
+        progress = json.loads(
+            valkey.data["yt-dlp:download:progress:by-invocation-id:inv"]
+        )
+        assert "info_dict" not in progress
+
+        final = _progress("finished", 100)
+        final["info_dict"] = info_dict
+        hook("inv", "https://example.com/v", final)
+        hook.close()
+
+        info_writes = [args for name, args in valkey.commands if args[0] == info_key]
+        assert len(info_writes) == 2
+        assert json.loads(valkey.data[info_key])["status"] == "finished"
+
+    def test_keys_expire(self, valkey):
+        """Test that keys get their family's TTL and the linger TTL once finished."""
+        hook = ValkeyProgressHook(
+            valkey,
+            ttl=KeyTTL(info=3600, progress=600, downloaded_bytes=300, linger=60),
+        )
+
+        hook("inv", "https://example.com/v", _progress("downloading", 10))
+        hook.flush()
+
+        assert valkey.ttl["yt-dlp:download:info:by-invocation-id:inv"] == 3600
+        assert valkey.ttl["yt-dlp:download:progress:by-invocation-id:inv"] == 600
+        assert (
+            valkey.ttl["yt-dlp:download:downloaded-bytes:by-invocation-id:inv"] == 300
+        )
+
+        hook("inv", "https://example.com/v", _progress("finished", 1000))
+        hook.close()
+
+        assert valkey.ttl["yt-dlp:download:info:by-invocation-id:inv"] == 60
+        assert valkey.ttl["yt-dlp:download:progress:by-invocation-id:inv"] == 60
+        assert valkey.ttl["yt-dlp:download:downloaded-bytes:by-invocation-id:inv"] == 60
+
+    def test_info_size_limit(self, valkey):
+        """Test that oversized info records are stripped of heavy fields."""
+        hook = ValkeyProgressHook(valkey, max_info_size=1000)
+
+        progress = _progress("downloading", 10)
+        progress["info_dict"]["formats"] = [{"url": "x" * 100}] * 100
+        hook("inv", "https://example.com/v", progress)
+        hook.close()
+
+        info = json.loads(valkey.data["yt-dlp:download:info:by-invocation-id:inv"])
+        assert info["info_dict"]["_truncated"] is True
+        assert "formats" not in info["info_dict"]
+        assert info["info_dict"]["title"] == "Video"
+
+    def test_stream_events(self, valkey):
+        """Test that compact progress events are appended to a trimmed stream."""
+        hook = ValkeyProgressHook(valkey, events="stream", stream_maxlen=5)
+
+        for downloaded in range(0, 100, 10):
+            hook("inv", "https://example.com/v", _progress("downloading", downloaded))
+
+        hook("inv", "https://example.com/v", _progress("finished", 1000))
+        hook.close()
+
+        stream = valkey.streams["yt-dlp:download:events:by-invocation-id:inv"]
+        assert len(stream) == 5
+
+        event = stream[-1]
+        assert event["invocation_id"] == "inv"
+        assert event["id"] == "abc"
+        assert json.loads(event["progress"])["status"] == "finished"
+        assert "info_dict" not in json.loads(event["progress"])
+
+    def test_pubsub_events(self, valkey):
+        """Test that subscribers receive rate-limited progress events."""
+        messages = valkey.subscribe("yt-dlp:download:events:by-invocation-id:inv")
+
+        hook = ValkeyProgressHook(valkey, events="pubsub", min_interval=60)
+
+        for downloaded in range(0, 100, 10):
+            hook("inv", "https://example.com/v", _progress("downloading", downloaded))
+
+        hook("inv", "https://example.com/v", _progress("finished", 1000))
+        hook.close()
+
+        assert 1 <= len(messages) <= 2
+
+        event = json.loads(messages[-1])
+        assert event["url"] == "https://example.com/v"
+        assert json.loads(event["progress"])["downloaded_bytes"] == 1000
+
+    def test_hash_tags(self, valkey):
+        """Test that every key written by an update is tagged with the invocation id."""
+        hook = ValkeyProgressHook(valkey, hash_tags=True, events="stream")
+
+        hook("inv", "https://example.com/{v}", _progress("downloading", 10))
+        hook.close()
+
+        keys = {args[0] for name, args in valkey.commands}
+
+        assert all(key.split(":", 3)[3].startswith("{inv}:") for key in keys)
+        assert {
+            "yt-dlp:download:progress:{inv}:by-invocation-id:inv",
+            "yt-dlp:download:progress:{inv}:by-url:https://example.com/{v}",
+            "yt-dlp:download:progress:{inv}:by-id:abc",
+            "yt-dlp:download:events:{inv}:by-invocation-id:inv",
+        } <= keys
+
+
+class TestValkeyProgressSink:
+    """Tests for ValkeyProgressSink."""
+
+    def test_batches_updates_into_one_round_trip(self, valkey):
+        """Test that queued updates of different downloads share a pipeline."""
+        hook = ValkeyProgressHook(valkey)
+
+        with valkey.lock:
+            # Hold up the sink so updates pile up in the buffer
+            for index in range(10):
+                hook(
+                    f"inv-{index}", "https://example.com/v", _progress("downloading", 1)
+                )
+
+        hook.close()
+
+        stats = hook.sink.stats()
+        assert stats.flushed == 10
+        assert stats.dropped == 0
+        assert stats.batches < 10
+
+    def test_drops_oldest_updates_when_full(self, valkey):
+        """Test that a full buffer drops the oldest updates instead of blocking."""
+        sink = ValkeyProgressSink(valkey, max_buffer=2)
+
+        written: list[int] = []
+
+        with valkey.lock:
+            for index in range(10):
+                sink.submit(lambda batch, index=index: written.append(index))
+
+            time.sleep(0.05)
+
+        sink.close()
+
+        stats = sink.stats()
+        assert stats.submitted == 10
+        assert stats.dropped > 0
+        assert written[-2:] == [8, 9]
+        assert stats.flushed + stats.dropped == 10
+        assert stats.queued == 0
+
+    def test_keeps_terminal_updates_when_full(self, valkey):
+        """Test that a full buffer drops non-terminal updates but never terminal ones."""
+        sink = ValkeyProgressSink(valkey, max_buffer=2)
+
+        written: list[str] = []
+
+        with valkey.lock:
+            # The sink may already hold the first update: fill the buffer after it
+            sink.submit(lambda batch: written.append("first"))
+            time.sleep(0.05)
+
+            sink.submit(lambda batch: written.append("finished-1"), terminal=True)
+            sink.submit(lambda batch: written.append("downloading"))
+            sink.submit(lambda batch: written.append("finished-2"), terminal=True)
+            sink.submit(lambda batch: written.append("error"), terminal=True)
+            sink.submit(lambda batch: written.append("dropped"))
+
+        sink.close()
+
+        assert [write for write in written if write != "first"] == [
+            "finished-1",
+            "finished-2",
+            "error",
+        ]
+        assert sink.stats().dropped == 2
+
+    def test_failures_are_counted(self, valkey):
+        """Test that a failing Valkey does not break the sink."""
+
+        def fail(batch, raise_on_error):
+            raise ConnectionError("valkey is down")
+
+        valkey.exec = fail
+
+        sink = ValkeyProgressSink(valkey)
+        sink.submit(lambda batch: batch.set("key", "value"))
+        sink.close()
+
+        assert sink.stats().failed == 1
+
+
+def _report_and_fail(ydl, url):
+    """Report progress, then fail without reporting an error status."""
+
+    for hook in ydl.params["progress_hooks"]:
+        hook(_progress("downloading", 10))
+
+    raise DownloadError("Connection reset")
+
+
+class TestExecutorProgress:
+    """Tests for the executor reporting progress."""
+
+    def test_invocation_closed_on_failure(self, valkey, ydl, persister):
+        """Test that the progress state of failed downloads is released."""
+        ydl.extract = _report_and_fail
+
+        hook = ValkeyProgressHook(valkey, min_interval=60)
+        executor = Executor(persister, progress_hook=hook)
+
+        with pytest.raises(DownloadError):
+            executor.download(
+                "inv",
+                DownloadRequest(
+                    url="https://example.com/v",
+                    output={"location": "videos/abc"},  # type: ignore[arg-type]
+                ),
+            )
+
+        assert not hook._pending
+        assert not hook._written
+        assert not hook._info_fingerprints
+
+        hook.close()
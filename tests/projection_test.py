@@ -0,0 +1,55 @@
+import pytest
+
+from restate_yt_dlp.executor import ExtractInfoRequest
+from restate_yt_dlp.projection import compile_fields, project
+
+INFO = {
+    "id": "abc",
+    "title": "Video",
+    "formats": [
+        {"format_id": "18", "url": "https://example.com/18", "fragments": [1, 2]},
+        {"format_id": "137", "url": "https://example.com/137"},
+    ],
+    "automatic_captions": {"en": [{"url": "https://example.com/en"}]},
+}
+
+
+class TestProjection:
+    """Tests for info dict field projection."""
+
+    def test_top_level_fields(self):
+        """Test that only the selected top-level fields are kept."""
+        assert project(INFO, compile_fields(["id", "title", "missing"])) == {
+            "id": "abc",
+            "title": "Video",
+        }
+
+    def test_nested_fields_in_lists(self):
+        """Test that dotted paths are applied to every list element."""
+        assert project(INFO, compile_fields(["formats.format_id"])) == {
+            "formats": [{"format_id": "18"}, {"format_id": "137"}],
+        }
+
+    def test_whole_value_wins(self):
+        """Test that selecting a field includes it entirely regardless of nested paths."""
+        expected = {"formats": INFO["formats"]}
+
+        assert project(INFO, compile_fields(["formats.url", "formats"])) == expected
+        assert project(INFO, compile_fields(["formats", "formats.url"])) == expected
+
+    def test_all_fields(self):
+        """Test that '*' selects the full info dict."""
+        assert compile_fields(["id", "*"]) is None
+        assert project(INFO, None) is INFO
+
+    def test_does_not_mutate(self):
+        """Test that projection returns a copy."""
+        project(INFO, compile_fields(["formats.format_id"]))
+
+        assert "url" in INFO["formats"][0]
+
+    @pytest.mark.parametrize("fields", [[], [""], ["formats."], ["formats..url"]])
+    def test_invalid_fields(self, fields):
+        """Test that invalid field selections are rejected by the request model."""
+        with pytest.raises(ValueError):
+            ExtractInfoRequest(url="https://example.com", fields=fields)
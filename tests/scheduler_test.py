@@ -0,0 +1,274 @@
+import io
+
+import pytest
+from yt_dlp.networking import Response
+from yt_dlp.networking.exceptions import HTTPError
+from yt_dlp.utils import DownloadError, ExtractorError
+
+from restate_yt_dlp.executor import Executor, ExtractInfoRequest
+from restate_yt_dlp.scheduler import (
+    LocalSchedulerBackend,
+    Scheduler,
+    SiteBusyError,
+    SiteLimit,
+    throttle_status,
+)
+
+
+class Clock:
+    """Fake monotonic clock advanced by sleeping."""
+
+    def __init__(self):
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+
+    monkeypatch.setattr("restate_yt_dlp.scheduler.time.monotonic", clock.monotonic)
+    monkeypatch.setattr("restate_yt_dlp.scheduler.time.sleep", clock.sleep)
+
+    return clock
+
+
+def _http_error(status: int, retry_after: str | None = None) -> HTTPError:
+    headers = {"Retry-After": retry_after} if retry_after is not None else {}
+
+    return HTTPError(
+        Response(
+            io.BytesIO(b""), "https://www.youtube.com/watch?v=abc", headers, status
+        )
+    )
+
+
+def _throttled(status: int = 429, retry_after: str | None = None) -> DownloadError:
+    return DownloadError(
+        f"HTTP Error {status}", (None, _http_error(status, retry_after), None)
+    )
+
+
+class TestSite:
+    """Tests for Scheduler.site."""
+
+    def test_domain(self):
+        """Test that sites configured by domain match their subdomains."""
+        limit = SiteLimit(rate=1)
+        scheduler = Scheduler(LocalSchedulerBackend(), sites={"youtube.com": limit})
+
+        assert scheduler.site("https://www.youtube.com/watch?v=abc") == (
+            "youtube.com",
+            limit,
+        )
+        assert scheduler.site("https://m.youtube.com/watch?v=abc") == (
+            "youtube.com",
+            limit,
+        )
+        assert scheduler.site("https://notyoutube.com/watch?v=abc") is None
+
+    def test_extractor(self):
+        """Test that sites configured by extractor key match the URLs of the extractor."""
+        limit = SiteLimit(rate=1)
+        scheduler = Scheduler(LocalSchedulerBackend(), sites={"Youtube": limit})
+
+        assert scheduler.site("https://youtu.be/dQw4w9WgXcQ") == ("Youtube", limit)
+
+    def test_default(self):
+        """Test that other hosts are limited by the default limit."""
+        limit = SiteLimit(max_in_flight=1)
+        scheduler = Scheduler(LocalSchedulerBackend(), default=limit)
+
+        assert scheduler.site("https://www.example.com/video") == ("example.com", limit)
+
+    def test_unknown_extractor(self):
+        """Test that unknown extractor keys are rejected."""
+        with pytest.raises(ValueError):
+            Scheduler(LocalSchedulerBackend(), sites={"Unknown": SiteLimit()})
+
+
+class TestLocalSchedulerBackend:
+    """Tests for LocalSchedulerBackend."""
+
+    def test_rate(self, clock):
+        """Test that requests start at the rate after the burst."""
+        backend = LocalSchedulerBackend()
+        limit = SiteLimit(rate=2, burst=2)
+
+        assert backend.acquire("site", limit, "a") == 0
+        assert backend.acquire("site", limit, "b") == 0
+        assert backend.acquire("site", limit, "c") == pytest.approx(0.5)
+
+        clock.now += 0.5
+
+        assert backend.acquire("site", limit, "c") == 0
+
+    def test_max_in_flight(self):
+        """Test that requests start once requests in flight finish."""
+        backend = LocalSchedulerBackend()
+        limit = SiteLimit(max_in_flight=1)
+
+        assert backend.acquire("site", limit, "a") == 0
+        assert backend.acquire("site", limit, "b") > 0
+
+        backend.release("site", limit, "a")
+
+        assert backend.acquire("site", limit, "b") == 0
+
+    def test_throttled(self, clock):
+        """Test that throttled sites are paused for longer until requests succeed again."""
+        backend = LocalSchedulerBackend()
+        limit = SiteLimit(backoff=1)
+
+        backend.acquire("site", limit, "a")
+        backend.release("site", limit, "a", throttled=True)
+
+        assert backend.acquire("site", limit, "b") == pytest.approx(1)
+
+        clock.now += 1
+        backend.acquire("site", limit, "b")
+        backend.release("site", limit, "b", throttled=True)
+
+        assert backend.acquire("site", limit, "c") == pytest.approx(2)
+
+        clock.now += 2
+        backend.acquire("site", limit, "c")
+        backend.release("site", limit, "c")
+        backend.acquire("site", limit, "d")
+        backend.release("site", limit, "d", throttled=True)
+
+        assert backend.acquire("site", limit, "e") == pytest.approx(2)
+
+    def test_retry_after(self):
+        """Test that throttled sites are paused for at least as long as they ask."""
+        backend = LocalSchedulerBackend()
+        limit = SiteLimit(backoff=1)
+
+        backend.acquire("site", limit, "a")
+        backend.release("site", limit, "a", throttled=True, retry_after=30)
+
+        assert backend.acquire("site", limit, "b") == pytest.approx(30, abs=0.1)
+
+    def test_retry_after_capped(self):
+        """Test that a huge Retry-After does not pause sites for longer than the maximum backoff."""
+        backend = LocalSchedulerBackend()
+        limit = SiteLimit(backoff=1, max_backoff=60)
+
+        backend.acquire("site", limit, "a")
+        backend.release("site", limit, "a", throttled=True, retry_after=86400)
+
+        assert backend.acquire("site", limit, "b") == pytest.approx(60, abs=0.1)
+
+
+class TestThrottleStatus:
+    """Tests for throttle_status."""
+
+    def test_wrapped(self):
+        """Test that HTTP errors wrapped by yt-dlp errors are detected."""
+        assert throttle_status(_throttled(429, "12")) == (True, 12.0)
+        assert throttle_status(_throttled(503)) == (True, None)
+
+    def test_cause(self):
+        """Test that HTTP errors causing extractor errors are detected."""
+        err = ExtractorError("Unable to download webpage", cause=_http_error(429))
+
+        assert throttle_status(err) == (True, None)
+
+    def test_message(self):
+        """Test that HTTP errors only reported in the message are detected."""
+        assert throttle_status(DownloadError("HTTP Error 429: Too Many Requests"))[0]
+
+    def test_other(self):
+        """Test that other errors are not throttling."""
+        assert throttle_status(_throttled(404)) == (False, None)
+        assert throttle_status(OSError("connection reset")) == (False, None)
+
+
+class TestScheduler:
+    """Tests for Scheduler.slot."""
+
+    def test_waits(self, clock):
+        """Test that requests wait for the limits of their site."""
+        scheduler = Scheduler(
+            LocalSchedulerBackend(), sites={"youtube.com": SiteLimit(rate=1)}
+        )
+
+        for _ in range(3):
+            with scheduler.slot("https://www.youtube.com/watch?v=abc"):
+                pass
+
+        assert sum(clock.sleeps) == pytest.approx(2)
+        assert scheduler.stats().waits == 2
+
+    def test_max_wait(self, clock):
+        """Test that requests fail with a retryable error once they waited too long."""
+        scheduler = Scheduler(
+            LocalSchedulerBackend(),
+            sites={"youtube.com": SiteLimit(max_in_flight=1)},
+            max_wait=5,
+        )
+
+        with (
+            scheduler.slot("https://www.youtube.com/watch?v=abc"),
+            pytest.raises(SiteBusyError),
+            scheduler.slot("https://www.youtube.com/watch?v=def"),
+        ):
+            pass
+
+        assert scheduler.stats().timeouts == 1
+
+    def test_backs_off(self, clock):
+        """Test that requests to throttled sites are paused."""
+        scheduler = Scheduler(
+            LocalSchedulerBackend(), sites={"youtube.com": SiteLimit(backoff=10)}
+        )
+
+        with (
+            pytest.raises(DownloadError),
+            scheduler.slot("https://www.youtube.com/watch?v=abc"),
+        ):
+            raise _throttled()
+
+        with scheduler.slot("https://www.youtube.com/watch?v=abc"):
+            pass
+
+        assert sum(clock.sleeps) == pytest.approx(10)
+        assert scheduler.stats().throttled == 1
+
+
+def _throttle(ydl, url):
+    raise _throttled(429, "120")
+
+
+class TestExecutorScheduler:
+    """Tests for the executor starting requests through the scheduler."""
+
+    def test_throttled_requests_absorbed(self, clock, ydl, persister):
+        """Test that retries of throttled requests wait instead of reaching the site."""
+        ydl.extract = _throttle
+
+        executor = Executor(
+            persister,
+            scheduler=Scheduler(
+                LocalSchedulerBackend(),
+                sites={"youtube.com": SiteLimit()},
+                max_wait=60,
+            ),
+        )
+        request = ExtractInfoRequest(url="https://www.youtube.com/watch?v=abc")
+
+        with pytest.raises(DownloadError):
+            executor.extract_info("inv_1", request)
+
+        # Retryable (not a TerminalError): Restate retries it later
+        with pytest.raises(SiteBusyError):
+            executor.extract_info("inv_1", request)
+
+        assert ydl.calls == 1
@@ -0,0 +1,157 @@
+import fcntl
+import os
+import time
+from pathlib import Path
+
+import pytest
+from restate.exceptions import TerminalError
+
+from restate_yt_dlp.executor import DownloadRequest, Executor
+from restate_yt_dlp.scratch import ScratchDirectories
+
+
+def _age(path: Path, seconds: float):
+    used_at = time.time() - seconds
+    os.utime(path, (used_at, used_at))
+
+
+def _flaky(attempts: list[bool]):
+    """Fail the first attempt halfway through the download."""
+
+    def extract(ydl, url):
+        part = ydl.home / "video.mp4.part"
+        attempts.append(part.exists())
+
+        if not part.exists():
+            part.write_bytes(b"x" * 10)
+            raise OSError("connection reset")
+
+        part.rename(ydl.home / "video.mp4")
+
+    return extract
+
+
+class ListingPersister:
+    def __init__(self):
+        self.files: list[str] = []
+
+    def persist(self, ref, src, filter=None):
+        self.files.extend(file.name for file in Path(src).iterdir())
+
+
+class TestScratchDirectories:
+    """Tests for ScratchDirectories."""
+
+    def test_kept_for_retry(self, tmp_path):
+        """Test that the directory of a failed attempt is reused by the next attempt."""
+        scratch = ScratchDirectories(tmp_path)
+
+        with pytest.raises(OSError), scratch.open("inv_1") as path:
+            (path / "video.mp4.part").write_bytes(b"partial")
+            raise OSError("connection reset")
+
+        with scratch.open("inv_1") as retry:
+            assert retry == path
+            assert (retry / "video.mp4.part").read_bytes() == b"partial"
+
+        assert not path.exists()
+
+    def test_removed_on_terminal_error(self, tmp_path):
+        """Test that the directory is removed when the invocation will not be retried."""
+        scratch = ScratchDirectories(tmp_path)
+
+        with pytest.raises(TerminalError), scratch.open("inv_1") as path:
+            raise TerminalError("unsupported URL")
+
+        assert not path.exists()
+
+    def test_cleanup_by_age(self, tmp_path):
+        """Test that abandoned directories are removed after the maximum age."""
+        scratch = ScratchDirectories(tmp_path, max_age=60)
+
+        (tmp_path / "old").mkdir()
+        (tmp_path / "recent").mkdir()
+        _age(tmp_path / "old", 120)
+
+        scratch.cleanup()
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["recent"]
+
+    def test_cleanup_by_budget(self, tmp_path):
+        """Test that the least recently used directories are removed to stay within the budget."""
+        scratch = ScratchDirectories(tmp_path, max_bytes=25)
+
+        for index, name in enumerate(["a", "b", "c"]):
+            (tmp_path / name).mkdir()
+            (tmp_path / name / "video.mp4.part").write_bytes(b"x" * 10)
+            _age(tmp_path / name, 30 - index * 10)
+
+        scratch.cleanup()
+
+        assert sorted(p.name for p in tmp_path.iterdir()) == ["b", "c"]
+
+    def test_cleanup_skips_active(self, tmp_path):
+        """Test that directories in use are never removed."""
+        scratch = ScratchDirectories(tmp_path, max_bytes=1)
+
+        with scratch.open("inv_1") as path:
+            (path / "video.mp4.part").write_bytes(b"x" * 10)
+            scratch.cleanup()
+
+            assert path.exists()
+
+    def test_cleanup_skips_locked(self, tmp_path):
+        """Test that directories locked by other processes sharing the root are never removed."""
+        scratch = ScratchDirectories(tmp_path, max_age=60)
+
+        (tmp_path / "other").mkdir()
+        _age(tmp_path / "other", 120)
+
+        fd = os.open(tmp_path / "other", os.O_RDONLY)
+        fcntl.flock(fd, fcntl.LOCK_EX)
+
+        try:
+            scratch.cleanup()
+        finally:
+            os.close(fd)
+
+        assert (tmp_path / "other").exists()
+
+    def test_cleanup_in_background(self, tmp_path):
+        """Test that opening a directory cleans up in a background thread."""
+        scratch = ScratchDirectories(tmp_path, max_age=60)
+
+        (tmp_path / "old").mkdir()
+        _age(tmp_path / "old", 120)
+
+        with scratch.open("inv_1"):
+            assert scratch._cleaner is not None
+
+            scratch._cleaner.join()
+
+        assert not (tmp_path / "old").exists()
+
+
+class TestExecutorScratch:
+    """Tests for resuming downloads in scratch directories."""
+
+    def test_resumes_partial_download(self, tmp_path, ydl):
+        """Test that a retried download sees the partial file of the failed attempt."""
+        attempts: list[bool] = []
+        ydl.extract = _flaky(attempts)
+
+        persister = ListingPersister()
+        executor = Executor(persister, scratch=ScratchDirectories(tmp_path))
+        request = DownloadRequest(
+            url="https://example.com/video",
+            output={"location": "videos/abc"},  # type: ignore[arg-type]
+        )
+
+        with pytest.raises(OSError):
+            executor.download("inv_1", request)
+
+        executor.download("inv_1", request)
+
+        assert attempts == [False, True]
+        assert persister.files == ["video.mp4"]
+        assert list(tmp_path.iterdir()) == []
@@ -0,0 +1,83 @@
+import json
+from pathlib import Path
+
+import pytest
+import restate
+
+from restate_yt_dlp.executor import Executor
+from restate_yt_dlp.restate import HandlerOptions, register_service
+from restate_yt_dlp.serde import (
+    JsonSerde,
+    MsgspecSerializer,
+    StdlibSerializer,
+    dumps,
+    loads,
+)
+
+
+def _payload() -> dict:
+    return {
+        "id": "abc",
+        "tags": ("a", "b"),
+        "formats": [{"format_id": "137", "filesize": 2**40}],
+        "filename": Path("/tmp/video.mp4"),
+        "categories": {"Music"},
+        "fragments": lambda: None,
+    }
+
+
+class TestSerializers:
+    """Tests for the JSON serializers."""
+
+    @pytest.mark.parametrize("serializer", [StdlibSerializer(), MsgspecSerializer()])
+    def test_encodes_yt_dlp_values(self, serializer):
+        """Test that values yt-dlp puts in info dicts are encoded like sanitize_info does."""
+        decoded = json.loads(serializer.dumps(_payload()))
+
+        assert decoded["tags"] == ["a", "b"]
+        assert decoded["formats"][0]["filesize"] == 2**40
+        assert decoded["filename"] == "/tmp/video.mp4"
+        assert decoded["categories"] == ["Music"]
+        assert decoded["fragments"].startswith("<function")
+
+    def test_falls_back_to_stdlib(self):
+        """Test that payloads the fast encoder rejects are still encoded."""
+        payload = {"view_count": 2**70}
+
+        assert json.loads(MsgspecSerializer().dumps(payload)) == payload
+
+    def test_round_trip(self):
+        """Test that encoded payloads decode to the same value."""
+        payload = {"id": "abc", "duration": 1.5, "formats": [{"format_id": "18"}]}
+
+        assert loads(dumps(payload)) == payload
+
+
+class TestJsonSerde:
+    """Tests for JsonSerde."""
+
+    def test_round_trip(self):
+        """Test that the serde round trips info dicts."""
+        serde = JsonSerde()
+
+        assert serde.deserialize(serde.serialize({"info": {"id": "abc"}})) == {
+            "info": {"id": "abc"}
+        }
+
+    def test_none(self):
+        """Test that None is encoded as an empty payload."""
+        serde = JsonSerde()
+
+        assert serde.serialize(None) == b""
+        assert serde.deserialize(b"") is None
+
+    def test_handler_responses(self, persister):
+        """Test that the responses of every handler are encoded with JsonSerde."""
+        service = restate.Service("yt-dlp")
+        register_service(Executor(persister), service, HandlerOptions())
+
+        assert service.handlers
+        assert all(
+            isinstance(handler.handler_io.output_serde, JsonSerde)
+            for handler in service.handlers.values()
+        )
@@ -0,0 +1,211 @@
+import contextlib
+import threading
+import time
+
+import pytest
+
+from restate_yt_dlp.executor import DownloadRequest, Executor
+from restate_yt_dlp.singleflight import (
+    LocalSingleFlight,
+    SingleFlightBusyError,
+    download_key,
+)
+from src.restate_yt_dlp import singleflight as app_singleflight
+from src.singleflight import ValkeySingleFlight
+
+# The app modules import the package relatively (as src.restate_yt_dlp)
+BUSY_ERRORS = (SingleFlightBusyError, app_singleflight.SingleFlightBusyError)
+
+
+class LeaseValkey:
+    """In-memory stand-in for the Valkey commands used by ValkeySingleFlight."""
+
+    def __init__(self):
+        self.data: dict[str, str] = {}
+        self.lock = threading.Lock()
+
+    def get(self, key):
+        with self.lock:
+            value = self.data.get(key)
+
+        return value.encode() if isinstance(value, str) else value
+
+    def set(self, key, value, conditional_set=None, expiry=None):
+        with self.lock:
+            if conditional_set is not None and key in self.data:
+                return None
+
+            self.data[key] = value
+
+        return "OK"
+
+    def invoke_script(self, script, keys, args):
+        with self.lock:
+            if self.data.get(keys[0]) != args[0]:
+                return 0
+
+            if len(args) == 1:
+                del self.data[keys[0]]
+
+            return 1
+
+
+class Download:
+    """Records calls and blocks until released."""
+
+    def __init__(self, fail: bool = False):
+        self.calls = 0
+        self.started = threading.Event()
+        self.release = threading.Event()
+        self.fail = fail
+
+    def __call__(self):
+        self.calls += 1
+        self.started.set()
+        self.release.wait(5)
+
+        if self.fail:
+            self.fail = False
+            raise OSError("connection reset")
+
+
+def _run(singleflight, download: Download) -> threading.Thread:
+    def run():
+        with contextlib.suppress(OSError):
+            singleflight.run("key", download)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+
+    return thread
+
+
+@pytest.fixture(params=["local", "valkey"])
+def singleflight(request):
+    if request.param == "local":
+        return LocalSingleFlight()
+
+    return ValkeySingleFlight(LeaseValkey(), poll_interval=0.01)
+
+
+class TestSingleFlight:
+    """Tests for LocalSingleFlight and ValkeySingleFlight."""
+
+    def test_deduplicates(self, singleflight):
+        """Test that callers arriving while a call is in flight wait for it."""
+        download = Download()
+
+        leader = _run(singleflight, download)
+        download.started.wait(5)
+
+        followers = [_run(singleflight, download) for _ in range(3)]
+        time.sleep(0.05)
+        download.release.set()
+
+        for thread in [leader, *followers]:
+            thread.join(5)
+
+        assert download.calls == 1
+
+    def test_failure_hands_over(self, singleflight):
+        """Test that a waiting caller takes over when the call in flight fails."""
+        download = Download(fail=True)
+
+        leader = _run(singleflight, download)
+        download.started.wait(5)
+
+        follower = _run(singleflight, download)
+        time.sleep(0.05)
+        download.release.set()
+
+        leader.join(5)
+        follower.join(5)
+
+        assert download.calls == 2
+
+    def test_max_wait(self, singleflight):
+        """Test that waiting callers fail with a retryable error once they waited too long."""
+        singleflight.max_wait = 0.05
+        download = Download()
+
+        leader = _run(singleflight, download)
+        download.started.wait(5)
+
+        with pytest.raises(BUSY_ERRORS):
+            singleflight.run("key", download)
+
+        download.release.set()
+        leader.join(5)
+
+        assert download.calls == 1
+
+    def test_completed_calls_run_again(self, singleflight):
+        """Test that results are only shared with callers waiting for the call in flight."""
+        download = Download()
+        download.release.set()
+
+        singleflight.run("key", download)
+        singleflight.run("key", download)
+
+        assert download.calls == 2
+
+    def test_different_keys(self):
+        """Test that calls with different keys do not wait for each other."""
+        singleflight = LocalSingleFlight()
+        calls = []
+
+        singleflight.run("a", lambda: calls.append("a"))
+        singleflight.run("b", lambda: calls.append("b"))
+
+        assert calls == ["a", "b"]
+
+
+class TestDownloadKey:
+    """Tests for download_key."""
+
+    def test_ignores_volatile_params(self):
+        """Test that hooks and tracking parameters do not change the key."""
+        assert download_key(
+            "https://example.com/video?utm_source=x", {"format": "best"}, "out"
+        ) == download_key(
+            "https://example.com/video",
+            {"format": "best", "progress_hooks": [print]},
+            "out",
+        )
+
+    def test_output(self):
+        """Test that downloads to different locations have different keys."""
+        assert download_key("https://example.com/video", {}, "a") != download_key(
+            "https://example.com/video", {}, "b"
+        )
+
+
+def _slow(ydl, url):
+    time.sleep(0.1)
+
+
+class TestExecutorSingleFlight:
+    """Tests for deduplicating downloads in the executor."""
+
+    def test_concurrent_downloads(self, ydl, persister):
+        """Test that concurrent identical downloads run yt-dlp once."""
+        ydl.extract = _slow
+
+        executor = Executor(persister, singleflight=LocalSingleFlight())
+        request = DownloadRequest(
+            url="https://example.com/video",
+            output={"location": "videos/abc"},  # type: ignore[arg-type]
+        )
+
+        threads = [
+            threading.Thread(target=executor.download, args=(f"inv_{i}", request))
+            for i in range(3)
+        ]
+
+        for thread in threads:
+            thread.start()
+
+        for thread in threads:
+            thread.join(5)
+
+        assert ydl.calls == 1
@@ -0,0 +1,294 @@
+import hashlib
+import json
+import threading
+import time
+from pathlib import Path, PurePosixPath
+
+import obstore
+import pytest
+from obstore.store import MemoryStore
+
+from restate_yt_dlp.executor import IncludeExcludeFilter
+from restate_yt_dlp.storage import ObstorePersister, StorePool, split_url
+
+S3_CONFIG = {"region": "us-east-1", "skip_signature": True}
+
+
+def _keys(store: MemoryStore) -> set[str]:
+    return {meta["path"] for batch in obstore.list(store) for meta in batch}
+
+
+@pytest.fixture
+def store() -> MemoryStore:
+    return MemoryStore()
+
+
+class TestObstorePersister:
+    """Tests for ObstorePersister."""
+
+    def test_persist_directory(self, store, tmp_path):
+        """Test that a directory is uploaded under the location prefix."""
+        (tmp_path / "sub").mkdir()
+        (tmp_path / "a.mp4").write_bytes(b"a")
+        (tmp_path / "sub" / "b.pdf").write_bytes(b"b")
+
+        ObstorePersister(store).persist(
+            PurePosixPath("prefix"),
+            tmp_path,
+            IncludeExcludeFilter(exclude=["**/*.pdf"]),
+        )
+
+        assert _keys(store) == {"prefix/a.mp4"}
+
+    def test_multipart(self, store, tmp_path):
+        """Test that files larger than the chunk size are uploaded intact."""
+        data = bytes(range(256)) * 40_000
+        (tmp_path / "a.mp4").write_bytes(data)
+
+        persister = ObstorePersister(store, chunk_size=5 * 1024 * 1024)
+        persister.persist_file(
+            PurePosixPath("p"), tmp_path / "a.mp4", PurePosixPath("a.mp4")
+        )
+
+        assert bytes(obstore.get(store, "p/a.mp4").bytes()) == data
+
+    def test_concurrent_files(self, store, tmp_path, monkeypatch):
+        """Test that files of a directory are uploaded concurrently up to the limit."""
+        for index in range(6):
+            (tmp_path / f"{index}.mp4").write_bytes(b"x")
+
+        active = 0
+        max_active = 0
+        lock = threading.Lock()
+        put = obstore.put
+
+        def slow_put(*args, **kwargs):
+            nonlocal active, max_active
+
+            with lock:
+                active += 1
+                max_active = max(max_active, active)
+
+            time.sleep(0.05)
+            put(*args, **kwargs)
+
+            with lock:
+                active -= 1
+
+        monkeypatch.setattr("restate_yt_dlp.storage.obstore.put", slow_put)
+
+        persister = ObstorePersister(store, max_files=3)
+        persister.persist(PurePosixPath("p"), tmp_path)
+
+        assert max_active == 3
+        assert len(_keys(store)) == 6
+
+    def test_stats(self, store, tmp_path):
+        """Test that uploaded files and bytes are counted."""
+        (tmp_path / "a.mp4").write_bytes(b"x" * 100)
+        (tmp_path / "b.jpg").write_bytes(b"x" * 20)
+
+        persister = ObstorePersister(store)
+        persister.persist(PurePosixPath("p"), tmp_path)
+
+        stats = persister.stats()
+
+        assert (stats.files, stats.bytes, stats.failed) == (2, 120, 0)
+        assert stats.bytes_per_second > 0
+
+
+class TestStorePool:
+    """Tests for StorePool."""
+
+    def test_reuses_stores(self):
+        """Test that stores are reused per bucket and configuration."""
+        pool = StorePool()
+
+        store = pool.get("s3://bucket/a/", S3_CONFIG)
+
+        assert pool.get("s3://bucket/b/", S3_CONFIG) is store
+        assert pool.get("s3://other/a/", S3_CONFIG) is not store
+        assert (
+            pool.get("s3://bucket/a/", S3_CONFIG | {"region": "eu-west-1"}) is not store
+        )
+
+        stats = pool.stats()
+
+        assert (stats.hits, stats.misses, stats.size) == (1, 3, 3)
+
+    def test_path_style_urls(self):
+        """Test that stores of path-style URLs are keyed by bucket (or container)."""
+        pool = StorePool()
+
+        store = pool.get("https://s3.us-east-1.amazonaws.com/bucket/a/", S3_CONFIG)
+
+        assert (
+            pool.get("https://s3.us-east-1.amazonaws.com/bucket/b/", S3_CONFIG) is store
+        )
+        assert (
+            pool.get("https://s3.us-east-1.amazonaws.com/other/a/", S3_CONFIG)
+            is not store
+        )
+        assert store.config["bucket"] == "bucket"  # pyright: ignore[reportAttributeAccessIssue]
+        assert store.prefix is None  # pyright: ignore[reportAttributeAccessIssue]
+
+    @pytest.mark.parametrize(
+        ("url", "root", "prefix"),
+        [
+            ("s3://bucket/a/b/", "s3://bucket", "a/b"),
+            (
+                "https://bucket.s3.eu-west-1.amazonaws.com/a",
+                "https://bucket.s3.eu-west-1.amazonaws.com",
+                "a",
+            ),
+            (
+                "https://s3.eu-west-1.amazonaws.com/bucket/a",
+                "https://s3.eu-west-1.amazonaws.com/bucket",
+                "a",
+            ),
+            ("https://s3.amazonaws.com/bucket/a", "s3://bucket", "a"),
+            (
+                "https://acct.blob.core.windows.net/container/a/b",
+                "https://acct.blob.core.windows.net/container",
+                "a/b",
+            ),
+            (
+                "https://acct.r2.cloudflarestorage.com/bucket",
+                "https://acct.r2.cloudflarestorage.com/bucket",
+                "",
+            ),
+        ],
+    )
+    def test_split_url(self, url, root, prefix):
+        """Test that location URLs are split into the store root and the key prefix."""
+        assert split_url(url) == (root, prefix)
+
+    def test_lru_eviction(self):
+        """Test that the least recently used store is evicted when the pool is full."""
+        pool = StorePool(max_size=2)
+
+        a = pool.get("s3://a", S3_CONFIG)
+        pool.get("s3://b", S3_CONFIG)
+        pool.get("s3://a", S3_CONFIG)
+        pool.get("s3://c", S3_CONFIG)
+
+        assert pool.get("s3://a", S3_CONFIG) is a
+        assert pool.stats().evictions == 1
+        assert pool.stats().size == 2
+
+    def test_idle_timeout(self):
+        """Test that idle stores are evicted."""
+        pool = StorePool(idle_timeout=0.01)
+
+        store = pool.get("s3://a", S3_CONFIG)
+        time.sleep(0.02)
+
+        assert pool.get("s3://a", S3_CONFIG) is not store
+        assert pool.stats().evictions == 1
+
+
+class TestContentAddressedUploads:
+    """Tests for content-addressed uploads of ObstorePersister."""
+
+    def test_deduplicates(self, store, tmp_path):
+        """Test that identical files are stored once and locations get a manifest."""
+        (tmp_path / "a.mp4").write_bytes(b"video")
+        (tmp_path / "b.mp4").write_bytes(b"video")
+
+        persister = ObstorePersister(store, blobs_prefix="blobs", max_files=1)
+        persister.persist(PurePosixPath("one"), tmp_path)
+        persister.persist(PurePosixPath("two"), tmp_path)
+
+        digest = hashlib.sha256(b"video").hexdigest()
+        blob = f"blobs/sha256/{digest[:2]}/{digest}"
+
+        assert _keys(store) == {blob, "one/blobs.json", "two/blobs.json"}
+        assert bytes(obstore.get(store, blob).bytes()) == b"video"
+        assert json.loads(bytes(obstore.get(store, "two/blobs.json").bytes())) == {
+            "files": {
+                "a.mp4": {"blob": blob, "sha256": digest, "size": 5},
+                "b.mp4": {"blob": blob, "sha256": digest, "size": 5},
+            }
+        }
+        assert persister.stats().deduplicated == 3
+
+    def test_multipart(self, store, tmp_path):
+        """Test that files larger than the chunk size are stored in parts under their digest."""
+        data = bytes(range(256)) * 40_000
+        (tmp_path / "a.mp4").write_bytes(data)
+
+        ObstorePersister(
+            store, chunk_size=5 * 1024 * 1024, blobs_prefix="blobs"
+        ).persist(PurePosixPath("p"), tmp_path)
+
+        digest = hashlib.sha256(data).hexdigest()
+
+        assert (
+            bytes(obstore.get(store, f"blobs/sha256/{digest[:2]}/{digest}").bytes())
+            == data
+        )
+
+    def test_reads_once(self, store, tmp_path, monkeypatch):
+        """Test that files are hashed while being uploaded instead of read beforehand."""
+        (tmp_path / "a.mp4").write_bytes(b"video")
+
+        opened: list[Path] = []
+        open_ = Path.open
+
+        def spy(self, *args, **kwargs):
+            opened.append(self)
+            return open_(self, *args, **kwargs)
+
+        monkeypatch.setattr(Path, "open", spy)
+
+        ObstorePersister(store, blobs_prefix="blobs").persist(
+            PurePosixPath("p"), tmp_path
+        )
+
+        assert opened == [tmp_path / "a.mp4"]
+
+    def test_persist_file(self, store, tmp_path):
+        """Test that files uploaded one by one are merged into the manifest."""
+        (tmp_path / "a.mp4").write_bytes(b"a")
+        (tmp_path / "b.mp4").write_bytes(b"b")
+
+        persister = ObstorePersister(store, blobs_prefix="blobs")
+        persister.persist_file(
+            PurePosixPath("p"), tmp_path / "a.mp4", PurePosixPath("a.mp4")
+        )
+        persister.persist_file(
+            PurePosixPath("p"), tmp_path / "b.mp4", PurePosixPath("b.mp4")
+        )
+
+        manifest = json.loads(bytes(obstore.get(store, "p/blobs.json").bytes()))
+
+        assert manifest["files"].keys() == {"a.mp4", "b.mp4"}
+        assert manifest["files"]["b.mp4"]["sha256"] == hashlib.sha256(b"b").hexdigest()
+
+    def test_persist_file_concurrent_update(self, store, tmp_path, monkeypatch):
+        """Test that manifests updated concurrently by another worker are merged again."""
+        (tmp_path / "a.mp4").write_bytes(b"a")
+        obstore.put(store, "p/blobs.json", json.dumps({"files": {}}).encode())
+
+        get = obstore.get
+        updated = False
+
+        def get_then_update(store, key, *args, **kwargs):
+            nonlocal updated
+            result = get(store, key, *args, **kwargs)
+
+            if key == "p/blobs.json" and not updated:
+                updated = True
+                obstore.put(store, key, json.dumps({"files": {"b.mp4": {}}}).encode())
+
+            return result
+
+        monkeypatch.setattr("restate_yt_dlp.storage.obstore.get", get_then_update)
+
+        ObstorePersister(store, blobs_prefix="blobs").persist_file(
+            PurePosixPath("p"), tmp_path / "a.mp4", PurePosixPath("a.mp4")
+        )
+
+        manifest = json.loads(bytes(get(store, "p/blobs.json").bytes()))
+
+        assert manifest["files"].keys() == {"a.mp4", "b.mp4"}
@@ -0,0 +1,106 @@
+import threading
+
+import obstore
+import pytest
+from obstore.store import MemoryStore
+
+from restate_yt_dlp.executor import DOWNLOAD_MARKER, DownloadRequest, Executor
+from restate_yt_dlp.storage import ObstorePersister
+
+
+def _keys(store: MemoryStore) -> set[str]:
+    return {meta["path"] for batch in obstore.list(store) for meta in batch}
+
+
+def _write_videos(wait_for_upload=lambda: None):
+    """Write two videos (each followed by a post hook call) and a thumbnail."""
+
+    def extract(ydl, url):
+        for index in (1, 2):
+            video = ydl.home / f"video-{index}.mp4"
+            video.write_bytes(b"x" * 1024)
+
+            for hook in ydl.params.get("post_hooks", []):
+                hook(str(video))
+
+            if index == 1:
+                wait_for_upload()
+
+        (ydl.home / "video-1.jpg").write_bytes(b"thumbnail")
+
+    return extract
+
+
+@pytest.fixture
+def store() -> MemoryStore:
+    return MemoryStore()
+
+
+@pytest.fixture
+def ydl(ydl):
+    ydl.extract = _write_videos()
+
+    return ydl
+
+
+def _request(**output) -> DownloadRequest:
+    return DownloadRequest(
+        url="https://example.com/playlist",
+        output={"location": "videos/abc", **output},  # type: ignore[arg-type]
+    )
+
+
+class TestStreamingUploads:
+    """Tests for uploading files while downloading."""
+
+    def test_uploads_while_downloading(self, store, ydl, monkeypatch):
+        """Test that finished videos are uploaded before the download completes."""
+        uploaded = threading.Event()
+        seen: dict[str, object] = {}
+
+        def wait_for_upload():
+            # The first video is uploaded while the second one is still "downloading"
+            assert uploaded.wait(timeout=5)
+            seen["keys"] = _keys(store)
+
+        persister = ObstorePersister(store)
+        persist_file = persister.persist_file
+
+        def persist_and_signal(ref, src, path):
+            persist_file(ref, src, path)
+            uploaded.set()
+
+        monkeypatch.setattr(persister, "persist_file", persist_and_signal)
+        ydl.extract = _write_videos(wait_for_upload)
+
+        executor = Executor(persister, stream_uploads=True)
+        executor.download("1", _request())
+
+        assert "videos/abc/video-1.mp4" in seen["keys"]  # type: ignore[operator]
+        assert _keys(store) == {
+            "videos/abc/video-1.mp4",
+            "videos/abc/video-2.mp4",
+            "videos/abc/video-1.jpg",
+            f"videos/abc/{DOWNLOAD_MARKER}",
+        }
+
+    def test_filter(self, store, ydl):
+        """Test that the output filter applies to streamed uploads."""
+        executor = Executor(ObstorePersister(store), stream_uploads=True)
+        executor.download("1", _request(filter={"include": ["*.mp4"]}))
+
+        assert _keys(store) == {
+            "videos/abc/video-1.mp4",
+            "videos/abc/video-2.mp4",
+            f"videos/abc/{DOWNLOAD_MARKER}",
+        }
+
+    def test_requires_file_persister(self):
+        """Test that streaming uploads are rejected for directory-only persisters."""
+
+        class DirectoryOnly:
+            def persist(self, ref, src, filter=None):
+                pass
+
+        with pytest.raises(TypeError):
+            Executor(DirectoryOnly(), stream_uploads=True)